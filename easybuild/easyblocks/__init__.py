@@ -31,8 +31,14 @@ easybuild.easyblocks package declaration
 @author: Pieter De Baets (Ghent University)
 @author: Jens Timmerman (Ghent University)
 """
+import imp
+import json
 import os
 import pkg_resources
+import re
+import stat
+import sys
+import tempfile
 from distutils.version import LooseVersion
 from pkgutil import extend_path
 
@@ -46,6 +52,7 @@ from pkgutil import extend_path
 # This causes problems further up the dependency chain...
 VERSION = LooseVersion('3.7.0')
 UNKNOWN = 'UNKNOWN'
+GIT_REVISION_STAMP_FILENAME = 'git_revision'
 
 
 def get_git_revision():
@@ -67,19 +74,409 @@ def get_git_revision():
         return UNKNOWN
 
 
-git_rev = get_git_revision()
-if git_rev == UNKNOWN:
-    VERBOSE_VERSION = VERSION
-else:
-    VERBOSE_VERSION = LooseVersion("%s-r%s" % (VERSION, git_rev))
+def read_git_revision_stamp(easyblocks_dir=None):
+    """
+    Determine git revision for this easyblocks installation, avoiding running git as much as possible:
+    if a git working copy is detected, the git revision is obtained via get_git_revision,
+    otherwise the git revision is read from the stamp file that was written at installation time.
+    """
+    if easyblocks_dir is None:
+        easyblocks_dir = os.path.dirname(os.path.abspath(__file__))
+    if os.path.exists(os.path.join(os.path.dirname(os.path.dirname(easyblocks_dir)), '.git')):
+        return get_git_revision()
+
+    try:
+        handle = open(os.path.join(easyblocks_dir, GIT_REVISION_STAMP_FILENAME), 'r')
+        git_rev = handle.read().strip()
+        handle.close()
+    except IOError:
+        git_rev = get_git_revision()
+
+    return git_rev or UNKNOWN
+
+
+def write_git_revision_stamp(git_rev=None, easyblocks_dir=None):
+    """
+    Write stamp file for git revision (defaults to current git revision), cfr. read_git_revision_stamp.
+    An existing stamp file is left untouched if the git revision is unknown (e.g. when building from a source tarball).
+    """
+    if easyblocks_dir is None:
+        easyblocks_dir = os.path.dirname(os.path.abspath(__file__))
+    if git_rev is None:
+        git_rev = get_git_revision()
+
+    stamp_path = os.path.join(easyblocks_dir, GIT_REVISION_STAMP_FILENAME)
+    if git_rev != UNKNOWN or not os.path.exists(stamp_path):
+        handle = open(stamp_path, 'w')
+        handle.write(git_rev + '\n')
+        handle.close()
+
+
+class VerboseVersion(LooseVersion):
+    """
+    Version of easyblocks including the git revision (if known), which is only determined when it is used.
+    """
+
+    def __init__(self, version):
+        """Constructor: only store version, parsing is done lazily."""
+        self._base_version = version
+
+    def __getattr__(self, name):
+        """Determine verbose version on first access of the parsed version."""
+        if name in ['vstring', 'version']:
+            git_rev = read_git_revision_stamp()
+            if git_rev == UNKNOWN:
+                self.parse(str(self._base_version))
+            else:
+                self.parse("%s-r%s" % (self._base_version, git_rev))
+            return getattr(self, name)
+        raise AttributeError(name)
+
+
+VERBOSE_VERSION = VerboseVersion(VERSION)
+
+# version of the format of the easyblocks index, bump this when the structure of the index changes
+EASYBLOCKS_INDEX_VERSION = 3
+EASYBLOCKS_INDEX_FILENAME = 'easyblocks_index.json'
+
+# subpackages in which easyblocks are located
+EASYBLOCKS_SUBDIRS = list(map(chr, range(ord('a'), ord('z') + 1))) + ['0']
+GENERIC_SUBDIR = 'generic'
+
+_EASYBLOCKS_DIR = os.path.dirname(os.path.abspath(__file__))
+# module paths in the index are always absolute, even if this package is imported via another name (cfr. setup.py)
+_EASYBLOCKS_PKG = 'easybuild.easyblocks'
+_CLASS_REGEX = re.compile(r"^class ([A-Za-z0-9_]+)\(", re.M)
+_DECODE_REGEX = re.compile(r"_(minus|plus|period|space|underscore)_")
+_DECODE_MAP = {'minus': '-', 'period': '.', 'plus': '+', 'space': ' ', 'underscore': '_'}
+
+_easyblocks_index = {}
+
+
+def _list_easyblock_files(path):
+    """Return sorted list of names of easyblock module files in specified directory."""
+    try:
+        fns = os.listdir(path)
+    except OSError:
+        return []
+    return sorted(fn for fn in fns if fn.endswith('.py') and not fn.startswith('_'))
+
+
+def build_easyblocks_index(easyblocks_dir=None):
+    """
+    Build index of easyblocks located in specified directory (defaults to the directory of this package),
+    by scanning the easyblock modules for class definitions (without importing them).
+
+    The index maps module names to their location relative to the easyblocks directory,
+    and both (lowercase) software names and easyblock class names to the full module path.
+    """
+    if easyblocks_dir is None:
+        easyblocks_dir = _EASYBLOCKS_DIR
+
+    index = {
+        'index_version': EASYBLOCKS_INDEX_VERSION,
+        'easyblocks_version': str(VERSION),
+        'subdirs': [],
+        'modules': {},
+        'software': {},
+        'classes': {},
+    }
+
+    for subdir in EASYBLOCKS_SUBDIRS + [GENERIC_SUBDIR]:
+        path = os.path.join(easyblocks_dir, subdir)
+        if not os.path.isdir(path):
+            continue
+        if subdir != GENERIC_SUBDIR:
+            index['subdirs'].append(subdir)
+
+        for fn in _list_easyblock_files(path):
+            modname = os.path.splitext(fn)[0]
+
+            if subdir == GENERIC_SUBDIR:
+                modpath = '%s.%s.%s' % (_EASYBLOCKS_PKG, GENERIC_SUBDIR, modname)
+            else:
+                modpath = '%s.%s' % (_EASYBLOCKS_PKG, modname)
+                index['modules'][modname] = os.path.join(subdir, fn)
+
+            handle = open(os.path.join(path, fn), 'r')
+            txt = handle.read()
+            handle.close()
+
+            for class_name in _CLASS_REGEX.findall(txt):
+                index['classes'][class_name] = modpath
+                if class_name.startswith('EB_'):
+                    software = _DECODE_REGEX.sub(lambda m: _DECODE_MAP[m.group(1)], class_name[3:])
+                    index['software'][software.lower()] = modpath
+
+    return index
+
+
+def write_easyblocks_index(easyblocks_dir=None, index=None):
+    """
+    (Re)generate index of easyblocks, and write it to the specified easyblocks directory.
+    This is only done when building or packaging easybuild-easyblocks (see setup.py), never at import time.
+
+    The index is written to a temporary file first and then moved into place,
+    so concurrent EasyBuild sessions never see a partially written index.
+
+    @return: the index that was written
+    """
+    if easyblocks_dir is None:
+        easyblocks_dir = _EASYBLOCKS_DIR
+    if index is None:
+        index = build_easyblocks_index(easyblocks_dir=easyblocks_dir)
+
+    fd, tmp_path = tempfile.mkstemp(prefix='.%s.' % EASYBLOCKS_INDEX_FILENAME, dir=easyblocks_dir)
+    try:
+        handle = os.fdopen(fd, 'w')
+        handle.write(json.dumps(index, indent=1, sort_keys=True))
+        handle.close()
+        os.chmod(tmp_path, stat.S_IRUSR | stat.S_IWUSR | stat.S_IRGRP | stat.S_IROTH)
+        os.rename(tmp_path, os.path.join(easyblocks_dir, EASYBLOCKS_INDEX_FILENAME))
+    except (IOError, OSError):
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return index
+
+
+def _index_is_stale(index):
+    """Check whether specified easyblocks index is outdated."""
+    return index.get('index_version') != EASYBLOCKS_INDEX_VERSION or index.get('easyblocks_version') != str(VERSION)
+
+
+def _read_easyblocks_index(easyblocks_dir):
+    """
+    Read index of easyblocks that was written to the specified easyblocks directory (see write_easyblocks_index).
+
+    @return: tuple with index and its modification time, or (None, None) if it is not available or outdated
+    """
+    index_path = os.path.join(easyblocks_dir, EASYBLOCKS_INDEX_FILENAME)
+    try:
+        index_mtime = os.stat(index_path).st_mtime
+        handle = open(index_path, 'r')
+        index = json.loads(handle.read())
+        handle.close()
+    except (IOError, OSError, ValueError):
+        return (None, None)
+
+    if _index_is_stale(index):
+        return (None, None)
 
-# extend path so python finds our easyblocks in the subdirectories where they are located
-subdirs = [chr(l) for l in range(ord('a'), ord('z') + 1)] + ['0']
-for subdir in subdirs:
-    __path__ = extend_path(__path__, '%s.%s' % (__name__, subdir))
+    return (index, index_mtime)
+
+
+def get_easyblocks_index(easyblocks_dir=None, rebuild=False):
+    """
+    Return index of easyblocks in specified directory (defaults to the directory of this package).
+
+    The index is read from disk if it's available and up-to-date; otherwise (or if a rebuild is requested),
+    it is regenerated and only kept in memory: the index is never written at import time,
+    since the easyblocks may be installed in a read-only or shared location (see write_easyblocks_index).
+    """
+    if easyblocks_dir is None:
+        easyblocks_dir = _EASYBLOCKS_DIR
+
+    if easyblocks_dir in _easyblocks_index and not rebuild:
+        return _easyblocks_index[easyblocks_dir][0]
+
+    index, index_mtime = None, None
+    if not rebuild:
+        (index, index_mtime) = _read_easyblocks_index(easyblocks_dir)
+
+    if index is None:
+        index = build_easyblocks_index(easyblocks_dir=easyblocks_dir)
+        # in-memory index, so always consider individual modules to be up-to-date
+        index_mtime = None
+
+    _easyblocks_index[easyblocks_dir] = (index, index_mtime)
+
+    return index
+
+
+def _index_entry_is_stale(modfile, easyblocks_dir):
+    """Check whether the index entry for the specified easyblock module file is outdated."""
+    index_mtime = _easyblocks_index[easyblocks_dir][1]
+    try:
+        modfile_mtime = os.stat(os.path.join(easyblocks_dir, modfile)).st_mtime
+    except OSError:
+        return True
+    return index_mtime is not None and modfile_mtime > index_mtime
+
+
+def _module_added(modname, easyblocks_dir):
+    """
+    Check whether an easyblock module with specified name was added after the easyblocks index was generated,
+    which only requires checking for the module file in the subdirectory it is expected to be located in.
+    """
+    subdir = modname[0].lower()
+    if subdir not in EASYBLOCKS_SUBDIRS:
+        subdir = '0'
+    return os.path.exists(os.path.join(easyblocks_dir, subdir, modname + '.py'))
+
+
+def det_easyblock_module(software=None, class_name=None):
+    """
+    Determine full module path for easyblock, based on either software name or easyblock class name,
+    using the easyblocks index (so without scanning or importing any modules).
+
+    @return: module path (e.g. easybuild.easyblocks.gcc), or None if no matching easyblock was found
+    """
+    index = get_easyblocks_index()
+    if class_name is not None:
+        return index['classes'].get(class_name)
+    elif software is not None:
+        return index['software'].get(software.lower())
+    return None
+
+
+class EasyblocksIndexImporter(object):
+    """
+    PEP 302 import hook that uses the easyblocks index to locate (non-generic) easyblock modules,
+    so that only the module that is actually requested is looked up on disk,
+    rather than probing every subdirectory in the easyblocks package search path.
+
+    This also covers the easyblock class lookups done by EasyBuild framework (cfr. get_easyblock_class),
+    since those boil down to importing the module for that class, e.g. easybuild.easyblocks.gcc for EB_GCC.
+    """
+
+    def __init__(self, package_name, easyblocks_dir):
+        """Importer constructor."""
+        self.package_name = package_name
+        self.easyblocks_dir = easyblocks_dir
+        self.prefix = package_name + '.'
+
+    def _shadowed(self, modname, path, subdir):
+        """Check whether specified module is provided via a path that takes precedence over ours."""
+        ours = [self.easyblocks_dir, os.path.join(self.easyblocks_dir, subdir)]
+        for entry in [os.path.abspath(p) for p in path]:
+            if entry in ours:
+                if entry == ours[1]:
+                    break
+                continue
+            for cand in [modname + '.py', modname + '.pyc', os.path.join(modname, '__init__.py')]:
+                if os.path.exists(os.path.join(entry, cand)):
+                    return True
+        return False
+
+    def _provided_elsewhere(self, modname, path):
+        """
+        Check whether specified module (which is not included in the easyblocks index) may be provided via a path
+        other than the subdirectories of our easyblocks directory, e.g. a custom easyblocks repository.
+        """
+        ours = [os.path.join(self.easyblocks_dir, subdir) for subdir in EASYBLOCKS_SUBDIRS + [GENERIC_SUBDIR]]
+        for entry in [os.path.abspath(p) for p in path]:
+            if entry in ours:
+                continue
+            for cand in [modname + '.py', modname + '.pyc', os.path.join(modname, '__init__.py')]:
+                if os.path.exists(os.path.join(entry, cand)):
+                    return True
+        return False
+
+    def find_module(self, fullname, path=None):
+        """Find module with specified name, using the easyblocks index."""
+        if not fullname.startswith(self.prefix):
+            return None
+        modname = fullname[len(self.prefix):]
+        if '.' in modname or modname in EASYBLOCKS_SUBDIRS + [GENERIC_SUBDIR]:
+            return None
+
+        if path is None:
+            path = getattr(sys.modules.get(self.package_name), '__path__', [])
+
+        modfile = get_easyblocks_index(self.easyblocks_dir)['modules'].get(modname)
+        if modfile is not None and _index_entry_is_stale(modfile, self.easyblocks_dir):
+            modfile = get_easyblocks_index(self.easyblocks_dir, rebuild=True)['modules'].get(modname)
+        elif modfile is None and _module_added(modname, self.easyblocks_dir):
+            modfile = get_easyblocks_index(self.easyblocks_dir, rebuild=True)['modules'].get(modname)
+
+        if modfile is None:
+            if self._provided_elsewhere(modname, path):
+                # let the default import machinery handle it
+                return None
+            # module is not available in any of our subdirectories according to the index, so there's no need
+            # to let the default import machinery probe all of them; raising an ImportError here indicates that
+            # the module was not found (implicit relative imports then fall back to an absolute import)
+            raise ImportError("No module named %s" % fullname)
+
+        if self._shadowed(modname, path, os.path.dirname(modfile)):
+            # let the default import machinery handle it
+            return None
+
+        return self
+
+    def load_module(self, fullname):
+        """Load module with specified name, from the location specified in the easyblocks index."""
+        if fullname in sys.modules:
+            return sys.modules[fullname]
+
+        modname = fullname[len(self.prefix):]
+        modfile = get_easyblocks_index(self.easyblocks_dir)['modules'][modname]
+        subdir_path = os.path.join(self.easyblocks_dir, os.path.dirname(modfile))
+
+        fh, filename, descr = imp.find_module(modname, [subdir_path])
+        try:
+            return imp.load_module(fullname, fh, filename, descr)
+        finally:
+            if fh is not None:
+                fh.close()
+
+
+def _det_easyblocks_path(path, index):
+    """
+    Extend package search path so Python finds our easyblocks in the subdirectories where they are located.
+
+    Our own subdirectories are known via the easyblocks index; only for other easybuild/easyblocks directories
+    (e.g. custom easyblocks repositories) we need to check which subdirectories are available.
+    """
+    easyblocks_dirs = []
+    for entry in path:
+        if os.path.isdir(entry) and entry not in easyblocks_dirs:
+            easyblocks_dirs.append(entry)
+
+    res = path[:]
+    for subdir in EASYBLOCKS_SUBDIRS:
+        for easyblocks_dir in easyblocks_dirs:
+            subdir_path = os.path.join(easyblocks_dir, subdir)
+            if subdir_path in res:
+                continue
+            if os.path.abspath(easyblocks_dir) == _EASYBLOCKS_DIR:
+                if subdir in index['subdirs']:
+                    res.append(subdir_path)
+            elif os.path.isdir(subdir_path):
+                res.append(subdir_path)
+    return res
+
+
+def _init_easyblocks_path(path, package_name, easyblocks_dir):
+    """
+    Determine package search path for easyblocks, and install import hook that uses the easyblocks index.
+
+    This is only done if an up-to-date easyblocks index is available in the specified easyblocks directory.
+    The index is only generated when building or packaging easybuild-easyblocks (see setup.py), so it is usually
+    not available in a git working copy; in that case all subdirectories are simply added to the search path
+    (cfr. pkgutil.extend_path), which avoids scanning all easyblock modules at import time.
+
+    @return: package search path
+    """
+    (index, index_mtime) = _read_easyblocks_index(easyblocks_dir)
+    if index is None:
+        for subdir in EASYBLOCKS_SUBDIRS:
+            path = extend_path(path, '%s.%s' % (package_name, subdir))
+    else:
+        _easyblocks_index[easyblocks_dir] = (index, index_mtime)
+        path = _det_easyblocks_path(path, index)
+
+        importers = [x for x in sys.meta_path if isinstance(x, EasyblocksIndexImporter)]
+        if not [x for x in importers if x.package_name == package_name]:
+            sys.meta_path.insert(0, EasyblocksIndexImporter(package_name, easyblocks_dir))
+
+    return path
 
-del subdir, subdirs, l, git_rev
 
 # let python know this is not the only place to look for easyblocks, so we can have multiple
 # easybuild/easyblocks paths in the Python search path, next to the official easyblocks distribution
 pkg_resources.declare_namespace(__name__)
+
+__path__[:] = _init_easyblocks_path(__path__, __name__, _EASYBLOCKS_DIR)
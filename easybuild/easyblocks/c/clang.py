@@ -39,6 +39,7 @@ import shutil
 from distutils.version import LooseVersion
 
 from easybuild.easyblocks.generic.cmakemake import CMakeMake
+from easybuild.easyblocks.tools.memory import det_memory_aware_parallelism
 from easybuild.framework.easyconfig import CUSTOM
 from easybuild.tools import run
 from easybuild.tools.build_log import EasyBuildError
@@ -73,6 +74,8 @@ class EB_Clang(CMakeMake):
             'build_targets': [None, "Build targets for LLVM (host architecture if None). Possible values: " +
                                     ', '.join(CLANG_TARGETS), CUSTOM],
             'bootstrap': [True, "Bootstrap Clang using GCC", CUSTOM],
+            'memory_per_job': [2048, "Amount of memory (in MiB) required per build job, used to limit the number "
+                                     "of parallel jobs (None to disable)", CUSTOM],
             'usepolly': [False, "Build Clang with polly", CUSTOM],
             'static_analyzer': [True, "Install the static analyser of Clang", CUSTOM],
             # The sanitizer tests often fail on HPC systems due to the 'weird' environment.
@@ -238,7 +241,10 @@ class EB_Clang(CMakeMake):
 
         self.cfg['configopts'] += '-DLLVM_TARGETS_TO_BUILD="%s" ' % ';'.join(self.cfg['build_targets'])
 
+        # limit parallelism based on available memory (for all stages), since linking LLVM requires lots of memory
         if self.cfg['parallel']:
+            self.cfg['parallel'] = det_memory_aware_parallelism(self.cfg['parallel'], self.cfg['memory_per_job'],
+                                                                log=self.log)
             self.make_parallel_opts = "-j %s" % self.cfg['parallel']
 
         self.log.info("Configuring")
@@ -288,19 +294,30 @@ class EB_Clang(CMakeMake):
         options = "-DCMAKE_INSTALL_PREFIX=%s " % self.installdir
         options += "-DCMAKE_C_COMPILER='%s' " % CC
         options += "-DCMAKE_CXX_COMPILER='%s' " % CXX
+        if self.use_ninja():
+            options += ' '.join(self.generator_options()) + ' '
         options += self.cfg['configopts']
 
         self.log.info("Configuring")
         run_cmd("cmake %s %s" % (options, self.llvm_src_dir), log_all=True)
 
         self.log.info("Building")
-        run_cmd("make %s" % self.make_parallel_opts, log_all=True)
+        run_cmd(self.compose_make_cmd(), log_all=True)
+
+    def compose_make_cmd(self, target=''):
+        """Compose command to build specified target, with ninja when Ninja generator is used, with make otherwise."""
+        if self.use_ninja():
+            # ninja runs in parallel by default, so explicitly specify number of jobs
+            cmd = "ninja -v %s %s" % (self.make_parallel_opts or '-j 1', target)
+        else:
+            cmd = "make %s %s" % (self.make_parallel_opts, target)
+        return cmd.strip()
 
     def run_clang_tests(self, obj_dir):
         os.chdir(obj_dir)
 
         self.log.info("Running tests")
-        run_cmd("make %s check-all" % self.make_parallel_opts, log_all=True)
+        run_cmd(self.compose_make_cmd('check-all'), log_all=True)
 
     def build_step(self):
         """Build Clang stage 1, 2, 3"""
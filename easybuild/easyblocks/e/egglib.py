@@ -38,6 +38,12 @@ from easybuild.tools.build_log import EasyBuildError
 class EB_EggLib(PythonPackage, ConfigureMake):
     """Support for building/installing EggLib."""
 
+    def __init__(self, *args, **kwargs):
+        """Initialize EggLib easyblock."""
+        super(EB_EggLib, self).__init__(*args, **kwargs)
+        # ConfigureMake.__init__ is not called via PythonPackage.__init__, but ConfigureMake.build_step is used
+        self.ccache_launcher = False
+
     def configure_step(self):
         """Configure EggLib build/install procedure."""
         # only need to configure Python library here, configuration of C++ library is done in install step
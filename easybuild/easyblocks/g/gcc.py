@@ -42,7 +42,8 @@ from distutils.version import LooseVersion
 from vsc.utils.missing import any
 
 import easybuild.tools.environment as env
-from easybuild.easyblocks.generic.configuremake import ConfigureMake
+from easybuild.easyblocks.generic.configuremake import ConfigureMake, det_build_triplet
+from easybuild.easyblocks.tools.memory import det_memory_aware_parallelism
 from easybuild.framework.easyconfig import CUSTOM
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.config import build_option
@@ -74,6 +75,8 @@ class EB_GCC(ConfigureMake):
             'languages': [[], "List of languages to build GCC for (--enable-languages)", CUSTOM],
             'withlibiberty': [False, "Enable installing of libiberty", CUSTOM],
             'withlto': [True, "Enable LTO support", CUSTOM],
+            'memory_per_job': [2048, "Amount of memory (in MiB) required per build job when LTO support is enabled, "
+                                     "used to limit the number of parallel jobs (None to disable)", CUSTOM],
             'withcloog': [False, "Build GCC with CLooG support", CUSTOM],
             'withppl': [False, "Build GCC with PPL support", CUSTOM],
             'withisl': [False, "Build GCC with ISL support", CUSTOM],
@@ -372,10 +375,10 @@ class EB_GCC(ConfigureMake):
         cmd = "../configure  %s %s" % (self.configopts, configopts)
 
         # instead of relying on uname, we run the same command GCC uses to
-        # determine the platform
-        out, ec = run_cmd("../config.guess", simple=False)
-        if ec == 0:
-            self.platform_lib = out.rstrip()
+        # determine the platform (result is cached, since this is done for every stage)
+        platform_lib = det_build_triplet(os.path.abspath(os.path.join('..', 'config.guess')), self.log)
+        if platform_lib:
+            self.platform_lib = platform_lib
 
         self.run_configure_cmd(cmd)
 
@@ -383,6 +386,11 @@ class EB_GCC(ConfigureMake):
 
     def build_step(self):
 
+        # limit parallelism based on available memory, since building with LTO requires lots of memory
+        if self.cfg['withlto'] and self.cfg['parallel']:
+            self.cfg['parallel'] = det_memory_aware_parallelism(self.cfg['parallel'], self.cfg['memory_per_job'],
+                                                                log=self.log)
+
         if self.stagedbuild:
 
             # make and install stage 1 build of GCC
@@ -34,10 +34,12 @@ EasyBuild support for installing a bundle of modules, implemented as a generic e
 import os
 
 import easybuild.tools.environment as env
+from easybuild.easyblocks.tools.dag import det_critical_path, det_dag_width, run_dag
 from easybuild.framework.easyblock import EasyBlock
 from easybuild.framework.easyconfig import CUSTOM
 from easybuild.framework.easyconfig.easyconfig import get_easyblock_class
 from easybuild.tools.build_log import EasyBuildError, print_msg
+from easybuild.tools.filetools import mkdir
 from easybuild.tools.modules import get_software_root, get_software_version
 
 
@@ -53,7 +55,20 @@ class Bundle(EasyBlock):
             'altversion': [None, "Software name of dependency to use to define $EBVERSION for this bundle", CUSTOM],
             'default_component_specs': [{}, "Default specs to use for every component", CUSTOM],
             'components': [(), "List of components to install: tuples w/ name, version and easyblock to use", CUSTOM],
+            'components_parallel_install': [False, "Install independent components concurrently, in separate "
+                                                   "processes; dependencies can be specified via 'depends_on' in "
+                                                   "component specs (if not, a component depends on all preceding "
+                                                   "components)", CUSTOM],
+            'configure_cache': [False, "Use shared autoconf cache file for components that are configured with "
+                                       "the same toolchain and environment (only for ConfigureMake components)",
+                                CUSTOM],
             'default_easyblock': [None, "Default easyblock to use for components", CUSTOM],
+            'exts_batch_install': [False, "Install compatible extensions in batch (only supported for some types of "
+                                          "extensions, e.g. Python packages installed with pip)", CUSTOM],
+            'exts_batch_sanity_check': [False, "Perform sanity check for extensions in batch (only supported for some "
+                                               "types of extensions, e.g. Python packages)", CUSTOM],
+            'exts_parallel_install': [False, "Install independent extensions in parallel (only supported for some "
+                                             "types of extensions, e.g. Python packages installed with pip)", CUSTOM],
         }
         return EasyBlock.extra_options(extra_vars)
 
@@ -65,6 +80,8 @@ class Bundle(EasyBlock):
 
         # list of EasyConfig instances for components
         self.comp_cfgs = []
+        # list of names of components on which each component depends (None if not specified)
+        self.comp_deps = []
 
         # list of sources for bundle itself *must* be empty
         if self.cfg['sources']:
@@ -79,7 +96,12 @@ class Bundle(EasyBlock):
         for comp in self.cfg['components']:
             comp_name, comp_version, comp_specs = comp[0], comp[1], {}
             if len(comp) == 3:
-                comp_specs = comp[2]
+                comp_specs = dict(comp[2])
+
+            # 'depends_on' is not an easyconfig parameter, only relevant when installing components in parallel
+            comp_deps = comp_specs.pop('depends_on', None)
+            if isinstance(comp_deps, basestring):
+                comp_deps = [comp_deps]
 
             cfg = self.cfg.copy()
 
@@ -123,6 +145,7 @@ class Bundle(EasyBlock):
                 checksums_patches.extend(cfg['checksums'][src_cnt:])
 
             self.comp_cfgs.append(cfg)
+            self.comp_deps.append(comp_deps)
 
         self.cfg.update('checksums', checksums_patches)
 
@@ -157,52 +180,169 @@ class Bundle(EasyBlock):
 
     def install_step(self):
         """Install components, if specified."""
-        comp_cnt = len(self.cfg['components'])
-        for idx, cfg in enumerate(self.comp_cfgs):
-            easyblock = cfg.get('easyblock') or self.cfg['default_easyblock']
-            if easyblock is None:
-                raise EasyBuildError("No easyblock specified for component %s v%s", cfg['name'], cfg['version'])
-            elif easyblock == 'Bundle':
-                raise EasyBuildError("The '%s' easyblock can not be used to install components in a bundle", easyblock)
-
-            print_msg("installing bundle component %s v%s (%d/%d)..." % (cfg['name'], cfg['version'], idx+1, comp_cnt))
-            self.log.info("Installing component %s v%s using easyblock %s", cfg['name'], cfg['version'], easyblock)
-
-            comp = get_easyblock_class(easyblock, name=cfg['name'])(cfg)
-
-            # correct build/install dirs
-            comp.builddir = self.builddir
-            comp.install_subdir, comp.installdir = self.install_subdir, self.installdir
-
-            # figure out correct start directory
-            comp.guess_start_dir()
-
-            # need to run fetch_patches to ensure per-component patches are applied
-            comp.fetch_patches()
-            # location of first unpacked source is used to determine where to apply patch(es)
-            comp.src = [{'finalpath': comp.cfg['start_dir']}]
-
-            # run relevant steps
-            for step_name in ['patch', 'configure', 'build', 'install']:
-                if step_name in cfg['skipsteps']:
-                    comp.log.info("Skipping '%s' step for component %s v%s", step_name, cfg['name'], cfg['version'])
-                else:
-                    comp.run_step(step_name, [lambda x: getattr(x, '%s_step' % step_name)])
-
-            # update environment to ensure stuff provided by former components can be picked up by latter components
-            # once the installation is finalised, this is handled by the generated module
-            reqs = comp.make_module_req_guess()
-            for envvar in reqs:
-                curr_val = os.getenv(envvar, '')
-                curr_paths = curr_val.split(os.pathsep)
-                for subdir in reqs[envvar]:
-                    path = os.path.join(self.installdir, subdir)
-                    if path not in curr_paths:
-                        if curr_val:
-                            new_val = '%s:%s' % (path, curr_val)
-                        else:
-                            new_val = path
-                        env.setvar(envvar, new_val)
+        if self.cfg['components_parallel_install'] and len(self.comp_cfgs) > 1:
+            self.install_components_parallel()
+        else:
+            comp_cnt = len(self.cfg['components'])
+            for idx, cfg in enumerate(self.comp_cfgs):
+                tup = (cfg['name'], cfg['version'], idx + 1, comp_cnt)
+                print_msg("installing bundle component %s v%s (%d/%d)..." % tup)
+                reqs = self.install_component(cfg)
+
+                # update environment to ensure stuff provided by former components can be picked up by latter ones
+                # once the installation is finalised, this is handled by the generated module
+                self.update_env_for_component(reqs)
+
+    def install_component(self, cfg, builddir=None):
+        """
+        Install specified component, by running the patch/configure/build/install steps using the component easyblock.
+
+        :param cfg: EasyConfig instance for component
+        :param builddir: separate build directory to use for component (sources are still located in build directory
+                         of the bundle)
+        :return: dict with subdirectories of installation directory to add to environment variables (cfr.
+                 make_module_req_guess)
+        """
+        easyblock = cfg.get('easyblock') or self.cfg['default_easyblock']
+        if easyblock is None:
+            raise EasyBuildError("No easyblock specified for component %s v%s", cfg['name'], cfg['version'])
+        elif easyblock == 'Bundle':
+            raise EasyBuildError("The '%s' easyblock can not be used to install components in a bundle", easyblock)
+
+        self.log.info("Installing component %s v%s using easyblock %s", cfg['name'], cfg['version'], easyblock)
+
+        comp = get_easyblock_class(easyblock, name=cfg['name'])(cfg)
+
+        # correct build/install dirs
+        comp.builddir = self.builddir
+        comp.install_subdir, comp.installdir = self.install_subdir, self.installdir
+
+        # figure out correct start directory
+        comp.guess_start_dir()
+
+        if builddir:
+            mkdir(builddir, parents=True)
+            comp.builddir = builddir
+            # keep sharing the autoconf cache file across components (cfr. 'configure_cache' in ConfigureMake)
+            comp.configure_cache_dir = self.builddir
+
+        # need to run fetch_patches to ensure per-component patches are applied
+        comp.fetch_patches()
+        # location of first unpacked source is used to determine where to apply patch(es)
+        comp.src = [{'finalpath': comp.cfg['start_dir']}]
+
+        # run relevant steps
+        for step_name in ['patch', 'configure', 'build', 'install']:
+            if step_name in cfg['skipsteps']:
+                comp.log.info("Skipping '%s' step for component %s v%s", step_name, cfg['name'], cfg['version'])
+            else:
+                comp.run_step(step_name, [lambda x: getattr(x, '%s_step' % step_name)])
+
+        return comp.make_module_req_guess()
+
+    def update_env_for_component(self, reqs):
+        """
+        Update environment with subdirectories of installation directory for a component (cfr. make_module_req_guess).
+        """
+        for envvar in reqs:
+            curr_val = os.getenv(envvar, '')
+            curr_paths = curr_val.split(os.pathsep)
+            for subdir in reqs[envvar]:
+                path = os.path.join(self.installdir, subdir)
+                if path not in curr_paths:
+                    if curr_val:
+                        new_val = '%s:%s' % (path, curr_val)
+                    else:
+                        new_val = path
+                    env.setvar(envvar, new_val)
+
+    def det_component_deps(self):
+        """
+        Determine dependencies between components, as specified via 'depends_on' in the component specs;
+        components for which no dependencies are specified are assumed to depend on all preceding components.
+
+        :return: dict with list of names of components on which each component depends
+        """
+        names = [cfg['name'] for cfg in self.comp_cfgs]
+        if len(set(names)) < len(names):
+            raise EasyBuildError("Names of components must be unique to install components in parallel: %s", names)
+
+        deps = {}
+        for idx, name in enumerate(names):
+            comp_deps = self.comp_deps[idx]
+            if comp_deps is None:
+                comp_deps = names[:idx]
+            deps[name] = list(comp_deps)
+
+        self.log.info("Dependencies between components: %s", deps)
+        return deps
+
+    def install_components_parallel(self):
+        """
+        Install independent components concurrently, each in a separate process and build directory.
+
+        Each component is installed in an isolated environment, which only includes the changes for the components
+        it (directly or indirectly) depends on; the environment is updated for all components once they are installed.
+
+        The available cores are split across the components that are installed concurrently,
+        to avoid oversubscribing the system; the number of components that can actually be installed at the same time
+        is determined by the dependencies between them (width of dependency graph).
+        """
+        names = [cfg['name'] for cfg in self.comp_cfgs]
+        deps = self.det_component_deps()
+
+        parallel = max(1, self.cfg['parallel'] or 1)
+        n_concurrent = min(parallel, det_dag_width(names, deps))
+        comp_parallel = max(1, parallel // n_concurrent)
+        for cfg in self.comp_cfgs:
+            cfg['parallel'] = comp_parallel
+
+        def all_deps(name):
+            """Determine all (direct and indirect) dependencies of specified component."""
+            res = set(deps[name])
+            for dep in deps[name]:
+                res.update(all_deps(dep))
+            return res
+
+        comps_builddir = os.path.join(self.builddir, 'easybuild_components')
+        mkdir(comps_builddir, parents=True)
+        comp_reqs = {}
+
+        def run_job(name):
+            """Install specified component (in a separate process)."""
+            cfg = self.comp_cfgs[names.index(name)]
+            print_msg("installing bundle component %s v%s..." % (cfg['name'], cfg['version']))
+            # include environment changes for dependencies of this component, in the order they were specified
+            comp_deps = all_deps(name)
+            for dep in names:
+                if dep in comp_deps:
+                    self.update_env_for_component(comp_reqs[dep])
+            # use separate build directory, to avoid clashes with components being built concurrently
+            return self.install_component(cfg, builddir=os.path.join(comps_builddir, name))
+
+        def job_done(name, reqs):
+            """Keep track of environment changes for installed component."""
+            comp_reqs[name] = reqs
+            self.log.info("Installed component %s", name)
+
+        self.log.info("Installing %d components in parallel (max. %d at the same time, using %d cores each)",
+                      len(names), n_concurrent, comp_parallel)
+        res = run_dag(names, deps, run_job, n_concurrent, job_done=job_done, processes=True)
+
+        timings = res['timings']
+        (path, duration) = det_critical_path(deps, timings)
+        durations = ["%s (%.1fs)" % (name, timings[name][1] - timings[name][0]) for name in path]
+        self.log.info("Critical path for parallel installation of components (%.1fs in total): %s",
+                      duration, ' -> '.join(durations))
+
+        if res['errors'] or res['skipped']:
+            errors = ["%s: %s" % (name, res['errors'][name]) for name in names if name in res['errors']]
+            raise EasyBuildError("Failed to install component(s) in parallel: %s (skipped: %s)",
+                                 '; '.join(errors), ', '.join(res['skipped']) or 'none')
+
+        # update environment for all installed components, in the same order as for a sequential installation
+        for name in names:
+            self.update_env_for_component(comp_reqs[name])
 
     def make_module_extra(self, *args, **kwargs):
         """Set extra stuff in module file, e.g. $EBROOT*, $EBVERSION*, etc."""
@@ -35,10 +35,12 @@ EasyBuild support for software that is configured with CMake, implemented as an
 import os
 
 from easybuild.easyblocks.generic.configuremake import ConfigureMake
+from easybuild.easyblocks.tools.cache import get_ccache_stats, log_ccache_stats
+from easybuild.easyblocks.tools.memory import det_memory_aware_parallelism
 from easybuild.framework.easyconfig import CUSTOM
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.config import build_option
-from easybuild.tools.filetools import change_dir, mkdir
+from easybuild.tools.filetools import change_dir, mkdir, which
 from easybuild.tools.environment import setvar
 from easybuild.tools.run import run_cmd
 from vsc.utils.missing import nub
@@ -52,11 +54,47 @@ class CMakeMake(ConfigureMake):
         """Define extra easyconfig parameters specific to CMakeMake."""
         extra_vars = ConfigureMake.extra_options(extra_vars)
         extra_vars.update({
+            'generator': [None, "Build system generator to use with CMake, e.g. 'Ninja' "
+                                "(default CMake generator, i.e. 'Unix Makefiles', if None)", CUSTOM],
+            'link_job_memory': [4096, "Amount of memory (in MiB) to take into account per link job, to determine "
+                                      "size of link job pool (only with Ninja generator)", CUSTOM],
             'srcdir': [None, "Source directory location to provide to cmake command", CUSTOM],
             'separate_build_dir': [False, "Perform build in a separate directory", CUSTOM],
         })
         return extra_vars
 
+    def use_ninja(self):
+        """Check whether Ninja is used as build system generator."""
+        return (self.cfg.get('generator') or '').lower() == 'ninja'
+
+    def det_link_pool_size(self):
+        """
+        Determine size of pool for link jobs, based on available memory and (estimated) memory required per link job,
+        such that linking in parallel (e.g. with link-time optimization) does not run out of memory.
+        """
+        max_jobs = det_memory_aware_parallelism(self.cfg['parallel'], self.cfg['link_job_memory'], log=self.log)
+        self.log.info("Size of link job pool: %d", max_jobs)
+        return max_jobs
+
+    def generator_options(self):
+        """Determine list of CMake options for build system generator."""
+        options = []
+        if self.use_ninja():
+            if which('ninja') is None:
+                raise EasyBuildError("Ninja generator is used, but 'ninja' command is not available "
+                                     "(Ninja should be included as build dependency)")
+            options.append('-G Ninja')
+            # limit number of concurrent link jobs, taking into account available memory
+            options.append('-DCMAKE_JOB_POOLS=link_pool=%d' % self.det_link_pool_size())
+            options.append('-DCMAKE_JOB_POOL_LINK=link_pool')
+        else:
+            if self.cfg.get('generator'):
+                options.append("-G '%s'" % self.cfg['generator'])
+            # show what CMake is doing by default
+            options.append('-DCMAKE_VERBOSE_MAKEFILE=ON')
+
+        return options
+
     def configure_step(self, srcdir=None, builddir=None):
         """Configure build using cmake"""
 
@@ -100,17 +138,80 @@ class CMakeMake(ConfigureMake):
             if value is not None:
                 options.append("-D%s='%s'" % (option, value))
 
+        ccache, ccache_env = self.prepare_ccache()
+        if ccache:
+            # compiler launchers are supported since CMake 3.4
+            for lang in ['C', 'CXX']:
+                options.append("-DCMAKE_%s_COMPILER_LAUNCHER=%s" % (lang, ccache))
+            self.ccache_launcher = True
+
         if build_option('rpath'):
             # instruct CMake not to fiddle with RPATH when --rpath is used, since it will undo stuff on install...
             # https://github.com/LLNL/spack/blob/0f6a5cd38538e8969d11bd2167f11060b1f53b43/lib/spack/spack/build_environment.py#L416
             options.append('-DCMAKE_SKIP_RPATH=ON')
 
-        # show what CMake is doing by default
-        options.append('-DCMAKE_VERBOSE_MAKEFILE=ON')
+        options.extend(self.generator_options())
 
         options_string = ' '.join(options)
 
-        command = "%s cmake %s %s %s" % (self.cfg['preconfigopts'], srcdir, options_string, self.cfg['configopts'])
+        command = "%s%s cmake %s %s %s" % (ccache_env, self.cfg['preconfigopts'], srcdir, options_string,
+                                           self.cfg['configopts'])
         (out, _) = run_cmd(command, log_all=True, simple=False)
 
         return out
+
+    def build_step(self, verbose=False, path=None):
+        """Build with ninja when Ninja generator is used, with make otherwise."""
+        if not self.use_ninja():
+            return super(CMakeMake, self).build_step(verbose=verbose, path=path)
+
+        paracmd = ''
+        if self.cfg['parallel']:
+            paracmd = "-j %s" % self.cfg['parallel']
+
+        # show what is being done via -v, cfr. CMAKE_VERBOSE_MAKEFILE for Makefiles
+        cmd = "%s ninja -v %s %s" % (self.cfg['prebuildopts'], paracmd, self.cfg['buildopts'])
+
+        # compiler commands are already wrapped with ccache via CMAKE_<LANG>_COMPILER_LAUNCHER (if enabled)
+        ccache, ccache_env = self.prepare_ccache()
+        if ccache:
+            ccache_stats = get_ccache_stats(ccache, ccache_env=ccache_env)
+            cmd = ccache_env + cmd
+
+        (out, _) = run_cmd(cmd, path=path, log_all=True, simple=False, log_output=verbose)
+
+        if ccache:
+            log_ccache_stats(ccache, ccache_stats, self.log, ccache_env=ccache_env)
+
+        return out
+
+    def test_step(self):
+        """Run tests with ninja when Ninja generator is used, with make otherwise."""
+        if self.cfg['runtest']:
+            paracmd = self.det_parallel_opt('parallel_test')
+
+            cmd = ''
+            if paracmd:
+                # tests are run via ctest, which only runs tests in parallel if $CTEST_PARALLEL_LEVEL is set
+                cmd = "CTEST_PARALLEL_LEVEL=%s " % self.cfg['parallel']
+
+            if self.use_ninja():
+                cmd += "ninja %s %s" % (paracmd or '-j 1', self.cfg['runtest'])
+            else:
+                cmd += "make %s %s" % (paracmd, self.cfg['runtest'])
+
+            (out, _) = run_cmd(cmd, log_all=True, simple=False)
+
+            return out
+
+    def install_step(self):
+        """Install with ninja when Ninja generator is used, with make otherwise."""
+        if not self.use_ninja():
+            return super(CMakeMake, self).install_step()
+
+        # ninja runs in parallel by default, so explicitly specify number of jobs
+        paracmd = self.det_parallel_opt('parallel_install') or '-j 1'
+        cmd = "%s ninja %s install %s" % (self.cfg['preinstallopts'], paracmd, self.cfg['installopts'])
+        (out, _) = run_cmd(cmd, log_all=True, simple=False)
+
+        return out
@@ -34,18 +34,25 @@ i.e. configure/make/make install, implemented as an easyblock.
 @author: Toon Willems (Ghent University)
 @author: Alan O'Cais (Juelich Supercomputing Centre)
 """
+import ctypes
+import hashlib
 import os
 import re
 import stat
+import tempfile
 from datetime import datetime
+from vsc.utils.missing import nub
 
 from easybuild.easyblocks import VERSION as EASYBLOCKS_VERSION
+from easybuild.easyblocks.tools.cache import create_ccache_wrappers, det_cache_dir, get_ccache_stats, log_ccache_stats
+from easybuild.easyblocks.tools.cache import lookup_cached_files, read_json_cache, setup_ccache, store_cached_files
+from easybuild.easyblocks.tools.cache import update_json_cache
 from easybuild.framework.easyblock import EasyBlock
 from easybuild.framework.easyconfig import CUSTOM
-from easybuild.tools.build_log import print_warning
+from easybuild.tools.build_log import EasyBuildError, print_warning
 from easybuild.tools.config import source_paths
-from easybuild.tools.filetools import CHECKSUM_TYPE_SHA256, adjust_permissions, compute_checksum, download_file
-from easybuild.tools.filetools import read_file, remove_file, verify_checksum
+from easybuild.tools.filetools import CHECKSUM_TYPE_SHA256, adjust_permissions, compute_checksum, copy_file
+from easybuild.tools.filetools import download_file, read_file, remove_file, verify_checksum, which, write_file
 from easybuild.tools.run import run_cmd
 
 # string that indicates that a configure script was generated by Autoconf
@@ -58,6 +65,106 @@ CONFIG_GUESS_URL_STUB = "https://git.savannah.gnu.org/gitweb/?p=config.git;a=blo
 CONFIG_GUESS_COMMIT_ID = "59e2ce0e6b46bb47ef81b68b600ed087e14fdaad"
 CONFIG_GUESS_SHA256 = "c02eb9cc55c86cfd1e9a794e548d25db5c9539e7b2154beb649bc6e2cbffc74c"
 
+# in-memory cache for location of (verified) config.guess script, config.guess scripts that were already checked,
+# and build triplets produced by config.guess scripts; see also obtain_config_guess and det_build_triplet
+_config_guess_cache = {
+    'path': None,
+    'checked': set(),
+    'triplets': {},
+}
+
+# environment variables that are taken into account in the fingerprint for the shared autoconf cache file
+CONFIGURE_CACHE_ENV_VARS = ['CC', 'CXX', 'F77', 'FC', 'CPP', 'CFLAGS', 'CXXFLAGS', 'FFLAGS', 'FCFLAGS', 'CPPFLAGS',
+                            'LDFLAGS', 'LIBS']
+# compiler commands for which the location & timestamp are taken into account in the fingerprint,
+# so the shared autoconf cache file is invalidated when the compiler changes
+CONFIGURE_CACHE_COMPILER_VARS = ['CC', 'CXX', 'F77', 'FC']
+# autoconf cache variables that are not safe to share across configure runs, since they
+# record the environment of a particular run ('precious' variables), or locations of commands & pkg-config results
+# (which may be provided by components/extensions that were installed in the meantime)
+CONFIGURE_CACHE_UNSAFE_VARS_REGEX = re.compile(r'^(ac_cv_env_|ac_cv_path_|ac_cv_prog_|am_cv_|pkg_cv_|lt_cv_path_)')
+# negative results for header/library/function checks may also change as components/extensions are installed
+CONFIGURE_CACHE_NEGATIVE_RESULT_REGEX = re.compile(r"^ac_cv_(func|header|lib|search)_\w+=\$\{\w+='?no'?\}$")
+CONFIGURE_CACHE_VAR_REGEX = re.compile(r'^(test "\$\{)?(?P<var>[A-Za-z_][A-Za-z0-9_]*)')
+
+
+def sanitize_configure_cache(path, unsafe_strings=None):
+    """
+    Sanitize autoconf cache file at specified path, so it can be safely used for other configure runs:
+    remove unsafe entries, and entries that include any of the specified (unsafe) strings, e.g. source locations.
+
+    :return: list of names of removed cache variables
+    """
+    lines, removed = [], []
+    for line in read_file(path).split('\n'):
+        res = CONFIGURE_CACHE_VAR_REGEX.match(line)
+        if res and (CONFIGURE_CACHE_UNSAFE_VARS_REGEX.match(res.group('var')) or
+                    CONFIGURE_CACHE_NEGATIVE_RESULT_REGEX.match(line) or
+                    any(x in line for x in unsafe_strings or [])):
+            removed.append(res.group('var'))
+        else:
+            lines.append(line)
+
+    write_file(path, '\n'.join(lines))
+
+    return removed
+
+
+def det_libc_version():
+    """
+    Determine name & version of C library (e.g. 'glibc 2.17'), without running a command.
+
+    :return: name & version of C library, or empty string if it could not be determined
+    """
+    try:
+        libc_version = os.confstr('CS_GNU_LIBC_VERSION') or ''
+    except (AttributeError, OSError, ValueError):
+        # not all Python builds know about CS_GNU_LIBC_VERSION, so ask glibc directly
+        try:
+            gnu_get_libc_version = ctypes.CDLL(None).gnu_get_libc_version
+            gnu_get_libc_version.restype = ctypes.c_char_p
+            libc_version = 'glibc %s' % gnu_get_libc_version()
+        except (AttributeError, OSError):
+            libc_version = ''
+
+    return libc_version
+
+
+def det_build_triplet(config_guess, log):
+    """
+    Determine build triplet (e.g. x86_64-pc-linux-gnu) by running specified config.guess script.
+
+    Produced triplets are cached (both in memory and in a node-local cache file),
+    keyed by the SHA256 checksum of the config.guess script, the host architecture & kernel and the C library,
+    so config.guess is only run once for each host. Failures are never cached.
+
+    :return: build triplet, or None if running config.guess failed
+    """
+    (sysname, _, release, _, machine) = os.uname()
+    checksum = compute_checksum(config_guess, checksum_type=CHECKSUM_TYPE_SHA256)
+    key = '-'.join([checksum, machine, sysname, release, det_libc_version()])
+
+    triplet = _config_guess_cache['triplets'].get(key)
+    if triplet is None:
+        cache_file = os.path.join(det_cache_dir('config_guess'), 'triplets.json')
+        triplet = read_json_cache(cache_file).get(key)
+        if triplet is None:
+            # also run config.guess in dry run mode, to avoid that an empty triplet is reported (or cached)
+            (out, ec) = run_cmd(config_guess, log_all=False, log_ok=False, simple=False, force_in_dry_run=True)
+            triplet = out.strip()
+            if ec or not triplet:
+                log.warning("Running %s failed (exit code %s), output: %s", config_guess, ec, out)
+                return None
+            update_json_cache(cache_file, key, triplet)
+        else:
+            log.info("Found cached build triplet for %s in %s", config_guess, cache_file)
+
+        _config_guess_cache['triplets'][key] = triplet
+
+    log.info("%s returned a build type %s", config_guess, triplet)
+
+    return triplet
+
 
 class ConfigureMake(EasyBlock):
     """
@@ -67,21 +174,41 @@ class ConfigureMake(EasyBlock):
     @staticmethod
     def extra_options(extra_vars=None):
         """Extra easyconfig parameters specific to ConfigureMake."""
-        extra_vars = EasyBlock.extra_options(extra=extra_vars)
-        extra_vars.update({
+        extra = {
             'configure_cmd_prefix': ['', "Prefix to be glued before ./configure", CUSTOM],
             'prefix_opt': [None, "Prefix command line option for configure script ('--prefix=' if None)", CUSTOM],
             'tar_config_opts': [False, "Override tar settings as determined by configure.", CUSTOM],
+            'use_ccache': [False, "Use ccache as compiler cache for C/C++ compilers (if available)", CUSTOM],
             'build_type': [None, "Type of system package is being configured for, e.g., x86_64-pc-linux-gnu "
                                  "(determined by config.guess shipped with EasyBuild if None)", CUSTOM],
-        })
-        return extra_vars
+            'ccache_dir': [None, "Location of ccache directory (default: ccache subdirectory of cache directory)",
+                           CUSTOM],
+            'ccache_max_size': [10240, "Maximum size of ccache directory (in MiB)", CUSTOM],
+            'parallel_install': [False, "Run 'make install' in parallel (using 'parallel' jobs); "
+                                        "only enable for software with an install target that is parallel-safe",
+                                 CUSTOM],
+            'parallel_test': [False, "Run tests in parallel (using 'parallel' jobs); "
+                                     "only enable for software with tests that can be run in parallel", CUSTOM],
+            'configure_cache': [False, "Use autoconf cache file (--cache-file) that is shared with other "
+                                       "components/extensions configured with the same toolchain and environment",
+                                CUSTOM],
+        }
+        # values specified by easyblocks that derive from ConfigureMake take precedence (cfr. MakeCp.extra_options),
+        # so they can specify different defaults, e.g. to run 'make install' in parallel
+        if extra_vars is None:
+            extra_vars = {}
+        extra.update(extra_vars)
+        return EasyBlock.extra_options(extra=extra)
 
     def __init__(self, *args, **kwargs):
         """Initialize easyblock."""
         super(ConfigureMake, self).__init__(*args, **kwargs)
 
         self.config_guess = None
+        # set to True when compiler commands are already wrapped with ccache, e.g. via CMAKE_<LANG>_COMPILER_LAUNCHER
+        self.ccache_launcher = False
+        # directory for shared autoconf cache file (cfr. det_configure_cache_file), build directory if None
+        self.configure_cache_dir = None
 
     def obtain_config_guess(self, download_source_path=None, search_source_paths=None):
         """
@@ -91,13 +218,21 @@ class ConfigureMake(EasyBlock):
         :param search_source_paths: Paths to search for config.guess
         :return: Path to config.guess or None
         """
+        config_guess = 'config.guess'
+
+        # only consider (node-local) cache of verified config.guess when default locations are used
+        use_cache = download_source_path is None and search_source_paths is None
+        if use_cache:
+            config_guess_path = self.lookup_cached_config_guess()
+            if config_guess_path:
+                return config_guess_path
+
         eb_source_paths = source_paths()
         if download_source_path is None:
             download_source_path = eb_source_paths[0]
         if search_source_paths is None:
             search_source_paths = eb_source_paths
 
-        config_guess = 'config.guess'
         sourcepath_subdir = os.path.join('generic', 'eb_v%s' % EASYBLOCKS_VERSION, 'ConfigureMake')
 
         config_guess_path = None
@@ -129,12 +264,58 @@ class ConfigureMake(EasyBlock):
                 self.log.warning("Failed to download recent %s to %s for use with ConfigureMake easyblock (if needed)",
                                  config_guess, cand_config_guess_path)
 
+        if use_cache and config_guess_path and verify_checksum(config_guess_path, CONFIG_GUESS_SHA256):
+            config_guess_path = self.store_cached_config_guess(config_guess_path)
+
+        return config_guess_path
+
+    def lookup_cached_config_guess(self):
+        """
+        Look up verified copy of config.guess, first in memory, next in node-local cache.
+
+        :return: path to cached copy of config.guess, or None if none is available
+        """
+        config_guess_path = _config_guess_cache['path']
+
+        if config_guess_path is None or not os.path.isfile(config_guess_path):
+            config_guess_path = None
+            cache_dir = det_cache_dir('config_guess')
+            for path in lookup_cached_files(cache_dir, CONFIG_GUESS_SHA256) or []:
+                if os.path.basename(path) == 'config.guess' and verify_checksum(path, CONFIG_GUESS_SHA256):
+                    config_guess_path = path
+                    _config_guess_cache['path'] = config_guess_path
+
+        if config_guess_path:
+            self.log.info("Found verified copy of config.guess in cache: %s", config_guess_path)
+
+        return config_guess_path
+
+    def store_cached_config_guess(self, config_guess_path):
+        """
+        Store (verified) copy of specified config.guess in node-local cache.
+
+        :return: path to cached copy of config.guess, or specified path if storing it in the cache failed
+        """
+        cache_dir = det_cache_dir('config_guess')
+        try:
+            cached_paths = store_cached_files(cache_dir, CONFIG_GUESS_SHA256, [config_guess_path])
+            cached_config_guess = os.path.join(cache_dir, CONFIG_GUESS_SHA256, 'config.guess')
+            if cached_config_guess in (cached_paths or []):
+                self.log.info("Stored verified copy of %s in cache: %s", config_guess_path, cached_config_guess)
+                config_guess_path = cached_config_guess
+                _config_guess_cache['path'] = config_guess_path
+        except EasyBuildError, err:
+            self.log.warning("Failed to store copy of %s in cache: %s", config_guess_path, err)
+
         return config_guess_path
 
     def check_config_guess(self):
         """Check timestamp & SHA256 checksum of config.guess script."""
         # log version, timestamp & SHA256 checksum of config.guess that was found (if any)
-        if self.config_guess:
+        # (only once for each config.guess)
+        if self.config_guess and self.config_guess not in _config_guess_cache['checked']:
+            _config_guess_cache['checked'].add(self.config_guess)
+
             # config.guess includes a "timestamp='...'" indicating the version
             config_guess_version = None
             version_regex = re.compile("^timestamp='(.*)'", re.M)
@@ -202,7 +383,10 @@ class ConfigureMake(EasyBlock):
         # it is possible that the configure script is generated using preconfigopts...
         # if so, we're at the mercy of the gods
         build_type_option = ''
-        if os.path.exists(configure_command) and AUTOCONF_GENERATED_MSG in read_file(configure_command):
+        autoconf_generated = False
+        if os.path.exists(configure_command):
+            autoconf_generated = AUTOCONF_GENERATED_MSG in read_file(configure_command)
+        if autoconf_generated:
             build_type = self.cfg.get('build_type')
 
             if build_type is None:
@@ -217,9 +401,9 @@ class ConfigureMake(EasyBlock):
                                   "EasyBuild attempts to download a recent config.guess but seems to have failed!")
                 else:
                     self.check_config_guess()
-                    build_type, _ = run_cmd(self.config_guess, log_all=True)
-                    build_type = build_type.strip()
-                    self.log.info("%s returned a build type %s", self.config_guess, build_type)
+                    build_type = det_build_triplet(self.config_guess, self.log)
+                    if build_type is None:
+                        raise EasyBuildError("Failed to determine build type using %s", self.config_guess)
 
             if build_type is not None:
                 build_type_option = '--build=' + build_type
@@ -232,10 +416,65 @@ class ConfigureMake(EasyBlock):
             self.cfg['configopts'],
         ])
 
-        (out, _) = run_cmd(cmd, log_all=True, simple=False)
+        out = None
+        if self.cfg.get('configure_cache') and autoconf_generated:
+            shared_cache_file = self.det_configure_cache_file()
+            # configure with a private copy of the shared cache file, which is moved into place afterwards,
+            # so concurrent configure runs (e.g. for components of a bundle installed in parallel) do not clash
+            fd, cache_file = tempfile.mkstemp(prefix='.%s.' % os.path.basename(shared_cache_file),
+                                              dir=os.path.dirname(shared_cache_file))
+            os.close(fd)
+            if os.path.exists(shared_cache_file):
+                copy_file(shared_cache_file, cache_file)
+
+            (out, ec) = run_cmd(cmd + ' --cache-file=%s' % cache_file, log_all=False, log_ok=False, simple=False)
+            if ec:
+                self.log.warning("Configuring with shared autoconf cache file %s failed, "
+                                 "configuring again without it; output: %s", shared_cache_file, out)
+                remove_file(cache_file)
+                remove_file(shared_cache_file)
+                out = None
+            else:
+                unsafe_strings = nub([self.builddir, os.path.dirname(shared_cache_file), os.getcwd()])
+                removed = sanitize_configure_cache(cache_file, unsafe_strings=unsafe_strings)
+                self.log.info("Removed %d unsafe entries from shared autoconf cache file %s: %s",
+                              len(removed), shared_cache_file, ', '.join(removed))
+                try:
+                    os.rename(cache_file, shared_cache_file)
+                except OSError, err:
+                    # failing to update the shared cache file is not fatal, it only affects performance
+                    self.log.warning("Failed to update shared autoconf cache file %s: %s", shared_cache_file, err)
+
+        if out is None:
+            (out, _) = run_cmd(cmd, log_all=True, simple=False)
 
         return out
 
+    def det_configure_cache_file(self):
+        """
+        Determine location of autoconf cache file to share with other components/extensions configured with
+        the same toolchain and environment (i.e., in the same build directory, or in the directory specified via
+        the configure_cache_dir class variable), based on a fingerprint of the toolchain,
+        compilers (incl. their location & timestamp) & compiler flags.
+        """
+        fingerprint = [self.toolchain.name, self.toolchain.version]
+        fingerprint.extend('%s=%s' % (var, os.getenv(var, '')) for var in CONFIGURE_CACHE_ENV_VARS)
+
+        for var in CONFIGURE_CACHE_COMPILER_VARS:
+            compiler = os.getenv(var, '').split(' ')[0]
+            compiler_path = compiler and which(compiler)
+            if compiler_path:
+                compiler_path = os.path.realpath(compiler_path)
+                fingerprint.append('%s:%s' % (compiler_path, os.stat(compiler_path).st_mtime))
+
+        self.log.debug("Fingerprint for shared autoconf cache file: %s", fingerprint)
+        key = hashlib.sha256('\n'.join(fingerprint)).hexdigest()[:16]
+
+        cache_file = os.path.join(self.configure_cache_dir or self.builddir, 'config.cache.%s' % key)
+        self.log.info("Using shared autoconf cache file %s", cache_file)
+
+        return cache_file
+
     def build_step(self, verbose=False, path=None):
         """
         Start the actual build
@@ -248,10 +487,37 @@ class ConfigureMake(EasyBlock):
 
         cmd = "%s make %s %s" % (self.cfg['prebuildopts'], paracmd, self.cfg['buildopts'])
 
+        ccache, ccache_env = self.prepare_ccache()
+        if ccache:
+            ccache_stats = get_ccache_stats(ccache, ccache_env=ccache_env)
+            if not self.ccache_launcher:
+                # wrap compiler commands with ccache, by prepending directory with symlinks to ccache to $PATH
+                wrappers_dir = os.path.join(self.builddir, 'easybuild_ccache')
+                compilers = create_ccache_wrappers(ccache, wrappers_dir)
+                self.log.info("Using ccache for compiler commands %s", ', '.join(compilers))
+                cmd = "export PATH=%s:$PATH && %s" % (wrappers_dir, cmd)
+            cmd = ccache_env + cmd
+
         (out, _) = run_cmd(cmd, path=path, log_all=True, simple=False, log_output=verbose)
 
+        if ccache:
+            log_ccache_stats(ccache, ccache_stats, self.log, ccache_env=ccache_env)
+
         return out
 
+    def prepare_ccache(self):
+        """
+        Set up for using ccache as compiler cache, if enabled.
+
+        :return: tuple with path to ccache command and prefix for commands that use ccache (cfr. setup_ccache),
+                 or (None, '') if ccache should not (or can not) be used
+        """
+        if not self.cfg.get('use_ccache', False) or self.dry_run:
+            return (None, '')
+
+        return setup_ccache(ccache_dir=self.cfg.get('ccache_dir'), max_size=self.cfg.get('ccache_max_size'),
+                            basedir=self.builddir)
+
     def test_step(self):
         """
         Test the compilation
@@ -259,7 +525,7 @@ class ConfigureMake(EasyBlock):
         """
 
         if self.cfg['runtest']:
-            cmd = "make %s" % (self.cfg['runtest'])
+            cmd = "make %s %s" % (self.det_parallel_opt('parallel_test'), self.cfg['runtest'])
             (out, _) = run_cmd(cmd, log_all=True, simple=False)
 
             return out
@@ -270,8 +536,21 @@ class ConfigureMake(EasyBlock):
         - typical: make install
         """
 
-        cmd = "%s make install %s" % (self.cfg['preinstallopts'], self.cfg['installopts'])
+        paracmd = self.det_parallel_opt('parallel_install')
+        cmd = "%s make %s install %s" % (self.cfg['preinstallopts'], paracmd, self.cfg['installopts'])
 
         (out, _) = run_cmd(cmd, log_all=True, simple=False)
 
         return out
+
+    def det_parallel_opt(self, param):
+        """
+        Determine option to run in parallel in test/install step (like in build step),
+        if enabled via the specified easyconfig parameter (parallel_test, parallel_install).
+        """
+        paracmd = ''
+        if self.cfg['parallel'] and self.cfg.get(param, False):
+            paracmd = "-j %s" % self.cfg['parallel']
+        else:
+            self.log.info("Not running in parallel (%s: %s)", param, self.cfg.get(param, False))
+        return paracmd
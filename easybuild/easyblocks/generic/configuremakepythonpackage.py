@@ -51,6 +51,8 @@ class ConfigureMakePythonPackage(ConfigureMake, PythonPackage):
     def __init__(self, *args, **kwargs):
         """Initialize with PythonPackage."""
         PythonPackage.__init__(self, *args, **kwargs)
+        # ConfigureMake.__init__ is not called, but ConfigureMake.build_step is used
+        self.ccache_launcher = False
 
     def configure_step(self, *args, **kwargs):
         """Configure build using 'python configure'."""
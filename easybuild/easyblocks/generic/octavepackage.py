@@ -29,37 +29,47 @@ EasyBuild support for building and installing Octave, implemented as an easybloc
 @author: Kenneth Hoste (Ghent University)
 """
 import os
-import tempfile
 
+from easybuild.easyblocks.tools.batch import BatchInstallMixin
 from easybuild.framework.extensioneasyblock import ExtensionEasyBlock
 from easybuild.tools.build_log import EasyBuildError
-from easybuild.tools.filetools import change_dir
 from easybuild.tools.run import run_cmd
 
 
-class OctavePackage(ExtensionEasyBlock):
+class OctavePackage(BatchInstallMixin, ExtensionEasyBlock):
     """Builds and installs Octave extension toolboxes."""
 
+    BATCH_ATTR = 'octave_exts_batch'
+    BATCH_EASYBLOCK = 'OctavePackage'
+
     def configure_step(self):
         """Raise error when configure step is run: installing Octave toolboxes stand-alone is not supported (yet)"""
         raise EasyBuildError("Installing Octave toolboxes stand-alone is not supported (yet)")
 
     def run(self):
         """Perform Octave package installation (as extension)."""
+        batch_install = self.prepare_batch_install()
 
         # if patches are specified, we need to unpack the source tarball, apply the patch,
-        # and create a temporary tarball to use for installation
+        # and create a tarball to use for installation ('pkg install' only accepts tarballs);
+        # an uncompressed tarball in the build directory is sufficient, since it is unpacked again right away
         if self.patches:
             # call out to ExtensionEasyBlock to unpack & apply patches
             super(OctavePackage, self).run(unpack_src=True)
 
-            # create temporary tarball from unpacked & patched source
-            src = os.path.join(tempfile.gettempdir(), '%s-%s-patched.tar.gz' % (self.name, self.version))
-            cwd = change_dir(os.path.dirname(self.ext_dir))
-            run_cmd("tar cfvz %s %s" % (src, os.path.basename(self.ext_dir)))
-            change_dir(cwd)
+            self.pkg_src = os.path.join(self.builddir, '%s-%s-patched.tar' % (self.name, self.version))
+            cmd = "tar cf %s -C %s %s" % (self.pkg_src, os.path.dirname(self.ext_dir), os.path.basename(self.ext_dir))
+            run_cmd(cmd, log_all=True, simple=True)
+        else:
+            self.pkg_src = self.src
+
+        if batch_install:
+            self.queue_for_batch_install()
         else:
-            src = self.src
+            self.install_pkgs([self.pkg_src])
+
+    def install_pkgs(self, srcs):
+        """Install Octave package(s) from specified source tarballs, in a single Octave session."""
 
         # need to specify two install locations, to avoid that $HOME/octave is abused;
         # one general package installation prefix, one for architecture-dependent files
@@ -67,6 +77,40 @@ class OctavePackage(ExtensionEasyBlock):
         pkg_arch_dep_prefix = pkg_prefix + '-arch-dep'
         octave_cmd = "pkg prefix %s %s; " % (pkg_prefix, pkg_arch_dep_prefix)
 
-        octave_cmd += "pkg install -global %s" % src
+        octave_cmd += "pkg install -global %s" % ' '.join(srcs)
+
+        return run_cmd("octave --eval '%s'" % octave_cmd, log_all=len(srcs) == 1, log_ok=len(srcs) == 1,
+                       simple=False)
+
+    def batch_install_ok(self):
+        """
+        Check whether this extension can be installed in batch with other Octave packages, using a single 'pkg install'
+        (only if enabled via 'exts_batch_install' in parent easyconfig).
+        """
+        if not self.cfg.get('exts_batch_install', False):
+            return False
 
-        run_cmd("octave --eval '%s'" % octave_cmd)
+        if type(self).run != OctavePackage.run:
+            self.log.info("Not installing extension %s in batch: custom installation procedure is used by %s",
+                          self.name, type(self).__name__)
+            return False
+
+        return True
+
+    def install_batch_exts(self, batch):
+        """
+        Install specified batch of Octave packages, using a single 'pkg install' in a single Octave session.
+
+        If installing the batch fails, the packages are installed one by one,
+        so the failure is attributed to the right extension.
+        """
+        self.log.info("Installing batch of %d Octave packages: %s", len(batch), ', '.join(ext.name for ext in batch))
+        (out, ec) = self.install_pkgs([ext.pkg_src for ext in batch])
+
+        if ec:
+            self.log.warning("Installing batch of Octave packages failed (exit code %s), "
+                             "falling back to installing them one by one: %s", ec, out)
+            for ext in batch:
+                ext.install_pkgs([ext.pkg_src])
+        else:
+            self.log.info("Output of batch installation of Octave packages:\n%s", out)
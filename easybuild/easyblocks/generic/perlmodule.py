@@ -45,6 +45,8 @@ class PerlModule(ExtensionEasyBlock, ConfigureMake):
     def extra_options():
         """Easyconfig parameters specific to Perl modules."""
         extra_vars = {
+            # same definition as for ConfigureMake, which is used when installing as an extension for Perl
+            'parallel_test': ConfigureMake.extra_options()['parallel_test'],
             'runtest': ['test', "Run unit tests.", CUSTOM],  # overrides default
         }
         return ExtensionEasyBlock.extra_options(extra_vars)
@@ -53,6 +55,8 @@ class PerlModule(ExtensionEasyBlock, ConfigureMake):
         """Initialize custom class variables."""
         super(PerlModule, self).__init__(*args, **kwargs)
         self.testcmd = None
+        # ConfigureMake.__init__ is not called via ExtensionEasyBlock.__init__, but ConfigureMake.build_step is used
+        self.ccache_launcher = False
 
         # Environment variables PERL_MM_OPT and PERL_MB_OPT cause installations to fail. 
         # Therefore it is better to unset these variables.
@@ -64,16 +68,31 @@ class PerlModule(ExtensionEasyBlock, ConfigureMake):
         # configure, build, test, install
         if os.path.exists('Makefile.PL'):
             run_cmd('%s perl Makefile.PL PREFIX=%s %s' % (self.cfg['preconfigopts'], self.installdir, self.cfg['configopts']))
+            # building is done in parallel via 'make -j'
             ConfigureMake.build_step(self)
-            ConfigureMake.test_step(self)
+            if self.cfg['runtest']:
+                # $HARNESS_OPTIONS is picked up by Test::Harness, which is used by 'make test'
+                harness_opts = ''
+                if self.parallel_test_jobs():
+                    harness_opts = 'HARNESS_OPTIONS=j%s' % self.parallel_test_jobs()
+                run_cmd('%s make %s' % (harness_opts, self.cfg['runtest']), log_all=True, simple=False)
             ConfigureMake.install_step(self)
         elif os.path.exists('Build.PL'):
             run_cmd('%s perl Build.PL --prefix %s %s' % (self.cfg['preconfigopts'], self.installdir, self.cfg['configopts']))
             run_cmd('%s perl Build build %s' % (self.cfg['prebuildopts'], self.cfg['buildopts']))
             if self.cfg['runtest']:
-                run_cmd('perl Build %s' % self.cfg['runtest'])
+                jobs_opt = ''
+                if self.parallel_test_jobs():
+                    jobs_opt = '--jobs %s' % self.parallel_test_jobs()
+                run_cmd('perl Build %s %s' % (self.cfg['runtest'], jobs_opt))
             run_cmd('%s perl Build install %s' % (self.cfg['preinstallopts'], self.cfg['installopts']))
 
+    def parallel_test_jobs(self):
+        """Determine number of jobs to use for running tests in parallel (None if tests should be run serially)."""
+        if self.cfg['parallel_test'] and self.cfg['parallel'] > 1:
+            return self.cfg['parallel']
+        return None
+
     def run(self):
         """Perform the actual Perl module build/installation procedure"""
 
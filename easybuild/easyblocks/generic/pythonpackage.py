@@ -31,20 +31,29 @@ EasyBuild support for Python packages, implemented as an easyblock
 @author: Pieter De Baets (Ghent University)
 @author: Jens Timmerman (Ghent University)
 """
+import glob
+import hashlib
+import json
 import os
 import re
+import shutil
 import sys
 import tempfile
+from ConfigParser import Error as ConfigParserError, RawConfigParser
 from distutils.version import LooseVersion
 from vsc.utils import fancylogger
 from vsc.utils.missing import nub
 
 import easybuild.tools.environment as env
-from easybuild.easyblocks.python import EXTS_FILTER_PYTHON_PACKAGES
+from easybuild.easyblocks.python import EXTS_FILTER_PYTHON_PACKAGES, precompile_bytecode
+from easybuild.easyblocks.tools.batch import BatchInstallMixin
+from easybuild.easyblocks.tools.cache import det_cache_dir, evict_lru, lookup_cached_files, read_json_cache
+from easybuild.easyblocks.tools.cache import store_cached_files, update_json_cache
+from easybuild.easyblocks.tools.dag import run_dag
 from easybuild.framework.easyconfig import CUSTOM
 from easybuild.framework.extensioneasyblock import ExtensionEasyBlock
 from easybuild.tools.build_log import EasyBuildError
-from easybuild.tools.filetools import mkdir, rmtree2, which
+from easybuild.tools.filetools import change_dir, compute_checksum, mkdir, read_file, rmtree2, which, write_file
 from easybuild.tools.modules import get_software_root
 from easybuild.tools.run import run_cmd
 
@@ -58,6 +67,161 @@ SETUP_PY_INSTALL_CMD = "%(python)s setup.py %(install_target)s --prefix=%(prefix
 SETUP_PY_DEVELOP_CMD = "%(python)s setup.py develop --prefix=%(prefix)s %(installopts)s"
 UNKNOWN = 'UNKNOWN'
 
+# Python code used to probe a Python interpreter, should work with both Python 2 and 3;
+# bump the version when the probe is changed, to avoid that outdated cache entries are used
+PYTHON_PROBE_VERSION = 1
+PYTHON_PROBE_PREFIX = '/tmp/'
+PYTHON_PROBE_CODE = '; '.join([
+    "import json, sys",
+    "from distutils.sysconfig import get_python_lib",
+    "print(json.dumps({'version': '%%s.%%s.%%s' %% sys.version_info[:3], "
+    "'purelib': get_python_lib(prefix='%(prefix)s'), "
+    "'platlib': get_python_lib(plat_specific=True, prefix='%(prefix)s')}))",
+]) % {'prefix': PYTHON_PROBE_PREFIX}
+PYTHON_PROBE_CACHE = 'python_interpreters.json'
+
+# in-memory cache for facts on Python interpreters
+_python_probe_cache = {}
+# in-memory cache for pip versions, cfr. det_pip_version
+_pip_version_cache = {}
+
+# easyconfig parameters for extensions that prevent them from being installed in batch with other extensions
+BATCH_INSTALL_INCOMPATIBLE_OPTIONS = ['preinstallopts', 'use_pip_editable', 'zipped_egg']
+
+PIP_WHEEL_CMD = "pip wheel --no-deps --wheel-dir=%(wheel_dir)s %(loc)s"
+# environment variables that are taken into account in the key for the wheel cache
+WHEEL_CACHE_KEY_ENV_VARS = ['CFLAGS', 'CPPFLAGS', 'CXXFLAGS', 'F90FLAGS', 'FFLAGS', 'LDFLAGS', 'LIBS']
+
+# setup.py commands for which extensions can be built in parallel
+PARALLEL_BUILD_EXT_CMDS = ['build', 'build_ext']
+# environment variable that controls number of parallel build jobs for numpy.distutils
+NPY_NUM_BUILD_JOBS = 'NPY_NUM_BUILD_JOBS'
+
+# size of chunks (in bytes) in which files are scanned when relocating an installation
+RELOCATE_CHUNK_SIZE = 1024 * 1024
+
+# script used to check whether a list of Python modules can be imported, all in the same interpreter
+# (should work with both Python 2 and 3)
+IMPORT_CHECK_CHUNK_SIZE = 50
+IMPORT_CHECK_PREFIX = 'EB_IMPORT_CHECK '
+IMPORT_CHECK_SCRIPT = '\n'.join([
+    "import json, sys, time, traceback",
+    "for name in sys.argv[1:]:",
+    "    start = time.time()",
+    "    try:",
+    "        __import__(name)",
+    "        res = {'name': name, 'ok': True}",
+    "    except BaseException:",
+    "        res = {'name': name, 'ok': False, 'traceback': traceback.format_exc()}",
+    "    res['time'] = time.time() - start",
+    "    sys.stdout.write('\\n%s' + json.dumps(res) + '\\n')" % IMPORT_CHECK_PREFIX,
+    "    sys.stdout.flush()",
+])
+
+
+def det_cache_key(cmd):
+    """
+    Determine cache key for specified command, based on resolved path and modification time/inode of the command.
+    Returns None if specified command is not available.
+    """
+    if os.path.isabs(cmd):
+        cmd_path = cmd
+    else:
+        cmd_path = which(cmd)
+
+    if cmd_path is None or not os.path.isfile(cmd_path):
+        return None
+
+    cmd_path = os.path.realpath(cmd_path)
+    cmd_stat = os.stat(cmd_path)
+    return '%s:%s:%s:%s' % (cmd_path, cmd_stat.st_mtime, cmd_stat.st_ino, PYTHON_PROBE_VERSION)
+
+
+def _cached_probe(cmd, probe):
+    """
+    Return result of probing specified command using provided function,
+    using an in-memory cache and a persistent on-disk cache.
+    The probe function should return None if probing failed, to avoid that the result is cached.
+    """
+    log = fancylogger.getLogger('python_probe', fname=False)
+
+    key = det_cache_key(cmd)
+    if key is None:
+        return probe(cmd)
+
+    if key not in _python_probe_cache:
+        try:
+            cache_path = os.path.join(det_cache_dir(), PYTHON_PROBE_CACHE)
+        except EasyBuildError, err:
+            log.warning("Failed to determine location of cache for probing %s: %s", cmd, err)
+            cache_path = None
+
+        if cache_path:
+            _python_probe_cache.update(read_json_cache(cache_path))
+
+        if key in _python_probe_cache:
+            log.debug("Found cached result for probing %s: %s", cmd, _python_probe_cache[key])
+        else:
+            res = probe(cmd)
+            if res is None:
+                return None
+
+            _python_probe_cache[key] = res
+            if cache_path:
+                update_json_cache(cache_path, key, res)
+
+    return _python_probe_cache[key]
+
+
+def det_python_facts(python_cmd):
+    """
+    Determine facts for specified Python command: version, and (prefix-relative) pure/platform-specific library dirs.
+    Results are cached (also on disk), based on the resolved path to the Python command.
+    """
+    def probe_python(python_cmd):
+        """Run Python probe for specified Python command."""
+        cmd = "%s -c \"%s\"" % (python_cmd, PYTHON_PROBE_CODE)
+        out, ec = run_cmd(cmd, simple=False, force_in_dry_run=True, trace=False, log_ok=False)
+
+        try:
+            # only consider last line, warning messages may precede it
+            facts = json.loads(out.strip().split('\n')[-1])
+        except ValueError:
+            raise EasyBuildError("Failed to probe Python command %s: %s (exit code %s)", python_cmd, out, ec)
+
+        # values obtained should start with specified prefix, otherwise something is very wrong
+        for key in ['purelib', 'platlib']:
+            if not facts[key].startswith(PYTHON_PROBE_PREFIX):
+                raise EasyBuildError("Python lib dir obtained using %s does not start with specified prefix %s: %s",
+                                     cmd, PYTHON_PROBE_PREFIX, facts[key])
+            facts[key] = facts[key][len(PYTHON_PROBE_PREFIX):]
+
+        return facts
+
+    return _cached_probe(python_cmd, probe_python)
+
+
+def det_pip_version(pip_cmd='pip'):
+    """
+    Determine version of specified pip command, or None if it could not be determined.
+
+    Results are only cached in memory (not on disk), since the pip version depends on which pip package is picked up
+    by the pip command, which is determined by $PYTHONPATH (and hence by which modules are loaded) as well.
+    """
+    key = (det_cache_key(pip_cmd), os.getenv('PYTHONPATH'))
+    if key in _pip_version_cache:
+        return _pip_version_cache[key]
+
+    out, _ = run_cmd("%s --version" % pip_cmd, verbose=False, simple=False, trace=False, log_ok=False)
+    res = re.search('^pip ([0-9.]+)', out)
+    if res is None:
+        return None
+
+    if key[0] is not None:
+        _pip_version_cache[key] = res.group(1)
+
+    return res.group(1)
+
 
 def pick_python_cmd(req_maj_ver=None, req_min_ver=None):
     """
@@ -93,9 +257,12 @@ def pick_python_cmd(req_maj_ver=None, req_min_ver=None):
             else:
                 req_majmin_ver = '%s.%s' % (req_maj_ver, req_min_ver)
 
-            pycode = 'import sys; print("%s.%s" % sys.version_info[:2])'
-            out, _ = run_cmd("%s -c '%s'" % (python_cmd, pycode), simple=False, trace=False)
-            out = out.strip()
+            try:
+                out = '.'.join(det_python_facts(python_cmd)['version'].split('.')[:2])
+            except EasyBuildError, err:
+                # probe may fail for Python commands that are not fully functional (e.g. missing json/distutils)
+                log.debug("Failed to determine version of Python command '%s': %s", python_cmd, err)
+                return False
 
             # (strict) check for major version
             maj_ver = out.split('.')[0]
@@ -147,31 +314,320 @@ def det_pylibdir(plat_specific=False, python_cmd=None):
         # use 'python' that is listed first in $PATH if none was specified
         python_cmd = 'python'
 
-    # determine Python lib dir via distutils
-    # use run_cmd, we can to talk to the active Python, not the system Python running EasyBuild
-    prefix = '/tmp/'
-    args = 'plat_specific=%s, prefix="%s"' % (plat_specific, prefix)
-    pycode = "import distutils.sysconfig; print(distutils.sysconfig.get_python_lib(%s))" % args
-    cmd = "%s -c '%s'" % (python_cmd, pycode)
+    # determine Python lib dir via distutils, by probing the active Python (not the system Python running EasyBuild)
+    facts = det_python_facts(python_cmd)
+    if plat_specific:
+        pylibdir = facts['platlib']
+    else:
+        pylibdir = facts['purelib']
 
-    log.debug("Determining Python library directory using command '%s'", cmd)
+    log.debug("Determined pylibdir for %s (plat_specific: %s): %s", python_cmd, plat_specific, pylibdir)
+    return pylibdir
 
-    out, ec = run_cmd(cmd, simple=False, force_in_dry_run=True, trace=False)
-    txt = out.strip().split('\n')[-1]
 
-    # value obtained should start with specified prefix, otherwise something is very wrong
-    if not txt.startswith(prefix):
-        raise EasyBuildError("Last line of output of %s does not start with specified prefix %s: %s (exit code %s)",
-                             cmd, prefix, out, ec)
+def normalize_pkg_name(name):
+    """Normalize Python package name, cfr. PEP 503."""
+    return re.sub(r'[-_.]+', '-', name).lower()
 
-    pylibdir = txt[len(prefix):]
-    log.debug("Determined pylibdir using '%s': %s", cmd, pylibdir)
-    return pylibdir
+
+def det_install_requires(path):
+    """
+    Determine names of packages required by the Python package unpacked at the specified location (best effort),
+    based on the metadata in the *.egg-info directory, setup.cfg or setup.py (in that order of preference).
+    """
+    log = fancylogger.getLogger('det_install_requires', fname=False)
+
+    reqs = []
+    requires_txt = glob.glob(os.path.join(path, '*.egg-info', 'requires.txt'))
+    setup_cfg = os.path.join(path, 'setup.cfg')
+    setup_py = os.path.join(path, 'setup.py')
+
+    if requires_txt:
+        for line in read_file(requires_txt[0]).split('\n'):
+            # stop at first section (extras, or requirements that only apply under specific conditions)
+            if line.startswith('['):
+                break
+            reqs.append(line)
+        log.debug("Requirements found in %s: %s", requires_txt[0], reqs)
+
+    if not reqs and os.path.exists(setup_cfg):
+        parser = RawConfigParser()
+        try:
+            parser.read(setup_cfg)
+            if parser.has_option('options', 'install_requires'):
+                reqs = parser.get('options', 'install_requires').split('\n')
+                log.debug("Requirements found in %s: %s", setup_cfg, reqs)
+        except ConfigParserError, err:
+            log.debug("Failed to parse %s: %s", setup_cfg, err)
+
+    if not reqs and os.path.exists(setup_py):
+        res = re.search(r'install_requires\s*=\s*\[([^\]]*)\]', read_file(setup_py))
+        if res:
+            reqs = re.findall(r'[\'"]([^\'"]+)[\'"]', res.group(1))
+            log.debug("Requirements found in %s: %s", setup_py, reqs)
+
+    return det_requirement_names(reqs)
+
+
+def det_setup_requires(path):
+    """
+    Determine names of packages required at build time by the Python package unpacked at the specified location
+    (best effort), based on pyproject.toml, setup.cfg and setup.py.
+    """
+    log = fancylogger.getLogger('det_setup_requires', fname=False)
+
+    reqs = []
+    pyproject_toml = os.path.join(path, 'pyproject.toml')
+    setup_cfg = os.path.join(path, 'setup.cfg')
+    setup_py = os.path.join(path, 'setup.py')
+
+    if os.path.exists(pyproject_toml):
+        build_system_regex = re.compile(r'^\[build-system\][^\[]*?^requires\s*=\s*\[([^\]]*)\]', re.M | re.S)
+        res = build_system_regex.search(read_file(pyproject_toml))
+        if res:
+            reqs.extend(re.findall(r'[\'"]([^\'"]+)[\'"]', res.group(1)))
+            log.debug("Build requirements found in %s: %s", pyproject_toml, reqs)
+
+    if os.path.exists(setup_cfg):
+        parser = RawConfigParser()
+        try:
+            parser.read(setup_cfg)
+            if parser.has_option('options', 'setup_requires'):
+                setup_cfg_reqs = parser.get('options', 'setup_requires').split('\n')
+                log.debug("Build requirements found in %s: %s", setup_cfg, setup_cfg_reqs)
+                reqs.extend(setup_cfg_reqs)
+        except ConfigParserError, err:
+            log.debug("Failed to parse %s: %s", setup_cfg, err)
+
+    if os.path.exists(setup_py):
+        res = re.search(r'setup_requires\s*=\s*\[([^\]]*)\]', read_file(setup_py))
+        if res:
+            setup_py_reqs = re.findall(r'[\'"]([^\'"]+)[\'"]', res.group(1))
+            log.debug("Build requirements found in %s: %s", setup_py, setup_py_reqs)
+            reqs.extend(setup_py_reqs)
+
+    return det_requirement_names(reqs)
+
+
+def det_requirement_names(reqs):
+    """Determine (normalized) package names for specified list of requirements (e.g. 'numpy>=1.10')."""
+    names = []
+    for req in reqs:
+        res = re.match(r'^\s*([A-Za-z0-9][A-Za-z0-9._-]*)', req)
+        if res:
+            names.append(normalize_pkg_name(res.group(1)))
+
+    return nub(names)
+
+
+def split_batch(batch):
+    """
+    Split specified batch of Python extensions into consecutive parts, such that extensions that are required
+    at build time by another extension in the batch (cfr. ext_setup_deps) are installed in an earlier part.
+    """
+    parts, part_names = [[]], []
+    for ext in batch:
+        if any(dep in part_names for dep in ext.ext_setup_deps):
+            parts.append([])
+            part_names = []
+        parts[-1].append(ext)
+        part_names.append(normalize_pkg_name(ext.name))
+
+    return parts
+
+
+def merge_staged_install(staging_dir, target_dir):
+    """
+    Merge installation in specified staging directory into target directory.
+    *.pth files that are present in both are merged, other files are overwritten.
+    """
+    for dirpath, dirnames, filenames in os.walk(staging_dir):
+        target_path = os.path.join(target_dir, os.path.relpath(dirpath, staging_dir))
+        mkdir(target_path, parents=True)
+
+        # symlinks to directories are included in list of directories, but are not walked into
+        for name in [d for d in dirnames if os.path.islink(os.path.join(dirpath, d))] + filenames:
+            src, dest = os.path.join(dirpath, name), os.path.join(target_path, name)
+            if os.path.islink(src):
+                if os.path.lexists(dest):
+                    os.remove(dest)
+                os.symlink(os.readlink(src), dest)
+            elif name.endswith('.pth') and os.path.exists(dest):
+                lines = read_file(dest).splitlines()
+                new_lines = [line for line in read_file(src).splitlines() if line not in lines]
+                write_file(dest, '\n'.join(lines + new_lines) + '\n')
+            else:
+                shutil.copy2(src, dest)
+
+
+def check_python_imports(python_cmd, modnames, chunk_size=IMPORT_CHECK_CHUNK_SIZE):
+    """
+    Check whether specified Python modules can be imported, using a single Python interpreter per chunk of modules,
+    so a crash (segmentation fault) when importing a particular module only affects the other modules in that chunk.
+
+    :return: dict with result for each module (with 'ok', 'time' and 'traceback' keys);
+             no result is included for modules that were not checked because the interpreter crashed
+    """
+    log = fancylogger.getLogger('check_python_imports', fname=False)
+
+    # use a dedicated directory for the script, since it will be included in the Python search path
+    tmpdir = tempfile.mkdtemp(prefix='eb-import-check-')
+    script = os.path.join(tmpdir, 'import_check.py')
+    write_file(script, IMPORT_CHECK_SCRIPT)
+
+    res = {}
+    for idx in range(0, len(modnames), chunk_size):
+        chunk = modnames[idx:idx + chunk_size]
+        cmd = ' '.join([python_cmd, script] + chunk)
+        (out, ec) = run_cmd(cmd, log_all=False, log_ok=False, simple=False, trace=False)
+
+        for line in out.split('\n'):
+            if line.startswith(IMPORT_CHECK_PREFIX):
+                try:
+                    mod_res = json.loads(line[len(IMPORT_CHECK_PREFIX):])
+                except ValueError:
+                    log.debug("Failed to parse output line of import check: %s", line)
+                else:
+                    res[mod_res['name']] = mod_res
+
+        unchecked = [m for m in chunk if m not in res]
+        if unchecked:
+            log.warning("Python interpreter crashed during import check (exit code %s), modules not checked: %s",
+                        ec, ', '.join(unchecked))
+
+    rmtree2(tmpdir)
+
+    return res
+
+
+def scan_file(path, txt, chunk_size=RELOCATE_CHUNK_SIZE):
+    """
+    Scan specified file for specified text, in chunks (so large files are never read into memory entirely).
+
+    :return: tuple with boolean indicating whether text was found, and boolean indicating whether file is binary
+    """
+    found, binary = False, False
+    try:
+        handle = open(path, 'rb')
+        tail = ''
+        chunk = handle.read(chunk_size)
+        # only first chunk is considered to determine whether file is binary
+        binary = '\0' in chunk
+        while chunk and not found:
+            # take into account that text may span multiple chunks
+            data = tail + chunk
+            found = txt in data
+            tail = data[-len(txt) + 1:] if len(txt) > 1 else ''
+            chunk = handle.read(chunk_size)
+        handle.close()
+    except IOError, err:
+        raise EasyBuildError("Failed to scan %s: %s", path, err)
+
+    return (found, binary)
+
+
+def relocate_install(path, old_prefix, new_prefix):
+    """
+    Relocate installation at specified path from old to new prefix:
+    replace occurrences of old prefix in text files (e.g. shebangs of scripts, *.pth files),
+    and remove byte-compiled Python files that refer to the old prefix.
+
+    Binary files that refer to the old prefix (e.g. via RPATH) can not be relocated;
+    if there are any, an error is raised before anything is changed.
+
+    :return: list of removed byte-compiled Python files
+    """
+    log = fancylogger.getLogger('relocate_install', fname=False)
+
+    pyc_files, text_files, binary_files = [], [], []
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            filepath = os.path.join(dirpath, filename)
+            if os.path.islink(filepath):
+                continue
+
+            found, binary = scan_file(filepath, old_prefix)
+            if not found:
+                continue
+
+            if filename.endswith('.pyc') or filename.endswith('.pyo'):
+                pyc_files.append(filepath)
+            elif binary:
+                binary_files.append(filepath)
+            else:
+                text_files.append(filepath)
+
+    if binary_files:
+        raise EasyBuildError("Binary files that refer to %s can not be relocated: %s",
+                             old_prefix, ', '.join(binary_files))
+
+    for filepath in text_files:
+        log.debug("Replacing %s with %s in %s", old_prefix, new_prefix, filepath)
+        write_file(filepath, read_file(filepath).replace(old_prefix, new_prefix))
+
+    for filepath in pyc_files:
+        os.remove(filepath)
+
+    return pyc_files
 
 
-class PythonPackage(ExtensionEasyBlock):
+def split_pip_output(out, locations, names):
+    """
+    Split output of 'pip install' command for multiple packages into parts per package.
+
+    Lines are attributed to a package based on 'Processing <location>' lines (preparation phase)
+    and '... for <name>' lines (build/install phase); lines that are not related to a particular package
+    (e.g. 'Installing collected packages: ...') are included in every part.
+
+    :param out: output of 'pip install' command
+    :param locations: list of locations that were passed to 'pip install'
+    :param names: list of package names, in the same order as the list of locations
+    :return: list of output parts, in the same order as the list of locations
+    """
+    locations = [loc.rstrip(os.path.sep) for loc in locations]
+    names = [normalize_pkg_name(name) for name in names]
+    for_name_regex = re.compile(r'\sfor ([A-Za-z0-9_.-]+)')
+    shared_headers = ['Building wheels for collected packages', 'Installing collected packages', 'Successfully']
+
+    parts = [[] for _ in locations]
+    curr = None
+    for line in out.split('\n'):
+        if line.startswith('Processing '):
+            path = line.split(' ', 1)[1].strip().rstrip(os.path.sep)
+            curr = locations.index(path) if path in locations else None
+        elif any(line.startswith(header) for header in shared_headers):
+            curr = None
+        else:
+            res = for_name_regex.search(line)
+            if res and normalize_pkg_name(res.group(1)) in names:
+                curr = names.index(normalize_pkg_name(res.group(1)))
+
+        if curr is None:
+            for part in parts:
+                part.append(line)
+        else:
+            parts[curr].append(line)
+
+    return ['\n'.join(part) for part in parts]
+
+
+class PythonPackage(BatchInstallMixin, ExtensionEasyBlock):
     """Builds and installs a Python package, and provides a dedicated module file."""
 
+    BATCH_ATTR = 'python_exts_batch'
+    BATCH_EASYBLOCK = 'PythonPackage'
+    BATCH_INSTALL_INCOMPATIBLE_OPTIONS = BATCH_INSTALL_INCOMPATIBLE_OPTIONS
+
+    @classmethod
+    def is_batch_install_candidate(cls, ext, exts_defaultclass):
+        """
+        Check whether specified extension (as specified in the exts list of the parent) is a candidate
+        for being installed in batch with other Python extensions (only extensions installed with pip are).
+        """
+        if not ext.get('options', {}).get('use_pip', False):
+            return False
+        return super(PythonPackage, cls).is_batch_install_candidate(ext, exts_defaultclass)
+
     @staticmethod
     def extra_options(extra_vars=None):
         """Easyconfig parameters specific to Python packages."""
@@ -180,7 +636,17 @@ class PythonPackage(ExtensionEasyBlock):
         extra_vars.update({
             'buildcmd': ['build', "Command to pass to setup.py to build the extension", CUSTOM],
             'download_dep_fail': [None, "Fail if downloaded dependencies are detected", CUSTOM],
+            'ext_deps': [None, "List of names of packages this extension depends on, only relevant when installing "
+                               "extensions in parallel (default: derived from install_requires metadata)", CUSTOM],
             'install_target': ['install', "Option to pass to setup.py", CUSTOM],
+            'parallel_build_ext': [True, "Build C/C++/Fortran extensions in parallel, if supported by setup.py "
+                                         "(with pip, only for packages that use numpy.distutils)", CUSTOM],
+            'precompile_bytecode': [False, "Precompile Python modules in parallel at the end of the installation "
+                                           "(not relevant for extensions, see precompile_bytecode for Python)", CUSTOM],
+            'precompile_bytecode_optimized': [False, "Also generate optimized byte-compiled Python modules "
+                                                     "(only relevant when precompile_bytecode is enabled)", CUSTOM],
+            'reuse_test_install': [False, "Promote installation done for testing (see testinstall) to installation "
+                                          "directory, rather than installing again", CUSTOM],
             'req_py_majver': [2, "Required major Python version (only relevant when using system Python)", CUSTOM],
             'req_py_minver': [6, "Required minor Python version (only relevant when using system Python)", CUSTOM],
             'runtest': [True, "Run unit tests.", CUSTOM],  # overrides default
@@ -190,6 +656,11 @@ class PythonPackage(ExtensionEasyBlock):
             'use_pip_editable': [False, "Install using 'pip install --editable'", CUSTOM],
             'use_pip_for_deps': [False, "Install dependencies using '%s'" % PIP_INSTALL_CMD, CUSTOM],
             'use_setup_py_develop': [False, "Install using '%s' (deprecated)" % SETUP_PY_DEVELOP_CMD, CUSTOM],
+            'use_wheel_cache': [False, "Use cache of wheels built for this package (only when installing with pip)",
+                                CUSTOM],
+            'wheel_cache_dir': [None, "Location of wheel cache (default: wheels subdirectory of cache directory)",
+                                CUSTOM],
+            'wheel_cache_max_size': [10240, "Maximum size of wheel cache (in MiB)", CUSTOM],
             'zipped_egg': [False, "Install as a zipped eggs (requires use_easy_install)", CUSTOM],
         })
         return ExtensionEasyBlock.extra_options(extra_vars=extra_vars)
@@ -204,6 +675,8 @@ class PythonPackage(ExtensionEasyBlock):
         self.sitecfgincdir = None
         self.testinstall = False
         self.testcmd = None
+        # test installation that can be promoted to installation directory (see reuse_test_install)
+        self.reusable_test_install = None
         self.unpack_options = self.cfg['unpack_options']
 
         self.python_cmd = None
@@ -212,6 +685,11 @@ class PythonPackage(ExtensionEasyBlock):
 
         self.install_cmd_output = ''
 
+        # path to (cached) wheel to install from
+        self.wheel_path = None
+        # environment variable definitions to build extensions in parallel when installing with pip
+        self.parallel_build_env = ''
+
         # make sure there's no site.cfg in $HOME, because setup.py will find it and use it
         home = os.path.expanduser('~')
         if os.path.exists(os.path.join(home, 'site.cfg')):
@@ -328,43 +806,30 @@ class PythonPackage(ExtensionEasyBlock):
         # set Python lib directories
         self.set_pylibdirs()
 
-    def compose_install_command(self, prefix, extrapath=None, installopts=None):
+    def compose_install_command(self, prefix, extrapath=None, installopts=None, loc=None, env_opts=None):
         """Compose full install command."""
 
         # mainly for debugging
         if self.install_cmd.startswith(EASY_INSTALL_INSTALL_CMD):
             run_cmd("%s setup.py easy_install --version" % self.python_cmd, verbose=False, trace=False)
         if self.install_cmd.startswith(PIP_INSTALL_CMD):
-            out, _ = run_cmd("pip --version", verbose=False, simple=False, trace=False)
-
             # pip 8.x or newer required, because of --prefix option being used
-            pip_version_regex = re.compile('^pip ([0-9.]+)')
-            res = pip_version_regex.search(out)
-            if res:
-                pip_version = res.group(1)
+            pip_version = det_pip_version()
+            if pip_version:
                 if LooseVersion(pip_version) >= LooseVersion('8.0'):
                     self.log.info("Found pip version %s, OK", pip_version)
                 else:
                     raise EasyBuildError("Need pip version 8.0 or newer, found version %s", pip_version)
 
             elif not self.dry_run:
-                raise EasyBuildError("Could not determine pip version from \"%s\" using pattern '%s'",
-                                     out, pip_version_regex.pattern)
+                raise EasyBuildError("Could not determine pip version using 'pip --version'")
 
         cmd = []
         if extrapath:
             cmd.append(extrapath)
 
-        if self.cfg.get('unpack_sources', True):
-            # specify current directory
-            loc = '.'
-        else:
-            # for extensions, self.src specifies the location of the source file
-            # otherwise, self.src is a list of dicts, one element per source file
-            if isinstance(self.src, basestring):
-                loc = self.src
-            else:
-                loc = self.src[0]['path']
+        if loc is None:
+            loc = self.det_install_location()
 
         if installopts is None:
             installopts = self.cfg['installopts']
@@ -373,8 +838,12 @@ class PythonPackage(ExtensionEasyBlock):
             # add --editable option when requested, in the right place (i.e. right before the location specification)
             loc = "--editable %s" % loc
 
+        if env_opts is None:
+            env_opts = self.parallel_build_env
+
         cmd.extend([
             self.cfg['preinstallopts'],
+            env_opts,
             self.install_cmd % {
                 'installopts': installopts,
                 'install_target': self.cfg['install_target'],
@@ -386,6 +855,26 @@ class PythonPackage(ExtensionEasyBlock):
 
         return ' '.join(cmd)
 
+    def det_install_location(self, absolute=False):
+        """Determine location to pass to install command (wheel, unpacked sources or source file)."""
+        if self.wheel_path:
+            loc = self.wheel_path
+        elif self.cfg.get('unpack_sources', True):
+            # specify current directory
+            if absolute:
+                loc = os.getcwd()
+            else:
+                loc = '.'
+        else:
+            # for extensions, self.src specifies the location of the source file
+            # otherwise, self.src is a list of dicts, one element per source file
+            if isinstance(self.src, basestring):
+                loc = self.src
+            else:
+                loc = self.src[0]['path']
+
+        return loc
+
     def extract_step(self):
         """Unpack source files, unless instructed otherwise."""
         if self.cfg.get('unpack_sources', True):
@@ -428,16 +917,118 @@ class PythonPackage(ExtensionEasyBlock):
                 raise EasyBuildError("Creating %s failed", self.sitecfgfn)
 
         # creates log entries for python being used, for debugging
-        run_cmd("%s -V" % self.python_cmd, verbose=False, trace=False)
-        run_cmd("%s -c 'import sys; print(sys.executable)'" % self.python_cmd, verbose=False, trace=False)
+        python_facts = det_python_facts(self.python_cmd)
+        self.log.info("Using Python %s (%s)", python_facts['version'], det_cache_key(self.python_cmd))
 
         # don't add user site directory to sys.path (equivalent to python -s)
         # see https://www.python.org/dev/peps/pep-0370/
         env.setvar('PYTHONNOUSERSITE', '1', verbose=False)
         run_cmd("%s -c 'import sys; print(sys.path)'" % self.python_cmd, verbose=False, trace=False)
 
+    def det_wheel_cache_key(self):
+        """
+        Determine key for wheel cache, based on checksums of source & patches, Python version, toolchain,
+        dependencies (incl. extensions that were installed before this one), build/install options
+        and relevant environment variables.
+        """
+        if isinstance(self.src, basestring):
+            src = self.src
+        else:
+            src = self.src[0]['path']
+        patches = [p['path'] if isinstance(p, dict) else p for p in self.patches or []]
+
+        key_data = [self.name, self.version, det_python_facts(self.python_cmd)['version']]
+        key_data.extend(compute_checksum(path, checksum_type='sha256') for path in [src] + patches)
+        key_data.extend([self.toolchain.name, self.toolchain.version])
+        key_data.extend('%s-%s' % (dep['name'], dep['version']) for dep in self.cfg.dependencies())
+        if self.is_extension:
+            # wheel may be built against extensions that were installed earlier (e.g. numpy for scipy)
+            key_data.extend('%s-%s' % (ext.name, ext.version) for ext in self.master.ext_instances)
+        key_data.extend(self.cfg[key] or '' for key in ['prebuildopts', 'buildcmd', 'buildopts', 'preinstallopts',
+                                                        'installopts'])
+        key_data.append(self.sitecfg or '')
+        key_data.extend('%s=%s' % (var, os.getenv(var, '')) for var in WHEEL_CACHE_KEY_ENV_VARS)
+
+        self.log.debug("Data used to determine key for wheel cache: %s", key_data)
+        return hashlib.sha256('\n'.join(str(x) for x in key_data)).hexdigest()
+
+    def get_wheel_cache_stats(self):
+        """
+        Return statistics for wheel cache (names of packages for which there was a cache hit/miss),
+        which are kept track of in the parent (or in this easyblock if it's not used to install an extension).
+        """
+        owner = self.master if self.is_extension else self
+        if not hasattr(owner, 'wheel_cache_stats'):
+            owner.wheel_cache_stats = {'hits': [], 'misses': []}
+        return owner.wheel_cache_stats
+
+    def build_wheel_cached(self):
+        """
+        Obtain wheel from wheel cache, or build it and store it in the wheel cache.
+
+        :return: True if a wheel is available to install from, False otherwise
+        """
+        wheel_cache_dir = self.cfg['wheel_cache_dir'] or det_cache_dir('wheels')
+        mkdir(wheel_cache_dir, parents=True)
+        key = self.det_wheel_cache_key()
+        stats = self.get_wheel_cache_stats()
+
+        cached = lookup_cached_files(wheel_cache_dir, key)
+        if cached:
+            stats['hits'].append(self.name)
+            self.wheel_path = cached[0]
+            self.log.info("Wheel cache hit for %s (key: %s): %s", self.name, key, self.wheel_path)
+        else:
+            stats['misses'].append(self.name)
+            self.log.info("Wheel cache miss for %s (key: %s), building wheel...", self.name, key)
+
+            wheel_dir = tempfile.mkdtemp(prefix='wheel-', dir=self.builddir)
+            cmd = ' '.join([self.cfg['prebuildopts'], self.parallel_build_env, PIP_WHEEL_CMD % {
+                'loc': self.det_install_location(absolute=True),
+                'wheel_dir': wheel_dir,
+            }])
+            (out, ec) = run_cmd(cmd, log_all=False, log_ok=False, simple=False)
+            wheels = [os.path.join(wheel_dir, fn) for fn in os.listdir(wheel_dir) if fn.endswith('.whl')]
+            if ec or len(wheels) != 1:
+                self.log.warning("Failed to build wheel for %s (exit code %s, wheels: %s), not using wheel cache: %s",
+                                 self.name, ec, wheels, out)
+            else:
+                try:
+                    self.wheel_path = store_cached_files(wheel_cache_dir, key, wheels)[0]
+                    evicted = evict_lru(wheel_cache_dir, self.cfg['wheel_cache_max_size'] * 1024 * 1024)
+                    if evicted:
+                        self.log.info("Evicted %d least recently used entries from wheel cache", len(evicted))
+                except EasyBuildError, err:
+                    self.log.warning("Failed to store wheel in wheel cache: %s", err)
+                    self.wheel_path = None
+
+            rmtree2(wheel_dir)
+
+        self.log.info("Wheel cache statistics: %d hits, %d misses", len(stats['hits']), len(stats['misses']))
+        self.log.debug("Wheel cache hits: %s; misses: %s", stats['hits'], stats['misses'])
+
+        return self.wheel_path is not None
+
     def build_step(self):
         """Build Python package using setup.py"""
+        if self.install_cmd.startswith(PIP_INSTALL_CMD):
+            # with pip, extensions are only built in the install step
+            parallel_opts = self.det_parallel_build_ext_opts()
+            if parallel_opts:
+                self.parallel_build_env = parallel_opts[0]
+
+        if self.cfg.get('use_wheel_cache', False) and not self.dry_run:
+            if self.install_cmd != PIP_INSTALL_CMD:
+                self.log.info("Wheel cache is only supported when installing with pip, not using it")
+            elif self.cfg.get('use_pip_editable', False) or self.cfg.get('zipped_egg', False):
+                self.log.info("Wheel cache can not be used in combination with editable or zipped egg installs")
+            elif self.cfg['buildopts'] or self.cfg['buildcmd'] != 'build':
+                # 'pip wheel' does not take into account custom build command/options
+                self.log.info("Wheel cache can not be used in combination with custom buildcmd/buildopts")
+            elif self.build_wheel_cached():
+                # wheel was built or taken from cache, so nothing left to build
+                return
+
         if self.use_setup_py:
 
             if get_software_root('CMake'):
@@ -446,9 +1037,63 @@ class PythonPackage(ExtensionEasyBlock):
                 env.setvar("CMAKE_INCLUDE_PATH", include_paths)
                 env.setvar("CMAKE_LIBRARY_PATH", library_paths)
 
-            cmd = ' '.join([self.cfg['prebuildopts'], self.python_cmd, 'setup.py', self.cfg['buildcmd'],
-                            self.cfg['buildopts']])
-            run_cmd(cmd, log_all=True, simple=True)
+            build_cmd = [self.python_cmd, 'setup.py', self.cfg['buildcmd'], self.cfg['buildopts']]
+            parallel_opts = self.det_parallel_build_ext_opts()
+
+            if parallel_opts:
+                (env_opts, build_ext_opts) = parallel_opts
+                cmd = ' '.join([self.cfg['prebuildopts'], env_opts] + build_cmd + [build_ext_opts])
+                (out, ec) = run_cmd(cmd, log_all=False, log_ok=False, simple=False)
+                if ec:
+                    self.log.warning("Building in parallel using '%s' failed (exit code %s), "
+                                     "falling back to serial build; output: %s", cmd, ec, out)
+                    parallel_opts = None
+
+            if not parallel_opts:
+                cmd = ' '.join([self.cfg['prebuildopts']] + build_cmd)
+                run_cmd(cmd, log_all=True, simple=True)
+
+    def det_parallel_build_ext_opts(self):
+        """
+        Determine options to build extensions in parallel (if supported): via $NPY_NUM_BUILD_JOBS for packages
+        that use numpy.distutils, or via the --parallel option of build_ext (Python 3.5 and newer).
+        Returns None if extensions can/should not be built in parallel, or a tuple with environment variable
+        definitions to prefix the build command with and options to add to it.
+
+        When installing with pip, only $NPY_NUM_BUILD_JOBS is used, since options can only be passed down to build_ext
+        via --global-option, which makes pip fall back to 'setup.py install' rather than building a wheel.
+        """
+        parallel = self.cfg['parallel']
+        if not self.cfg.get('parallel_build_ext', True) or not parallel or parallel <= 1:
+            return None
+
+        if self.use_setup_py and (self.cfg['buildcmd'] not in PARALLEL_BUILD_EXT_CMDS or
+                                  'build_ext' in self.cfg['buildopts']):
+            self.log.info("Not building extensions in parallel for custom build command/options")
+            return None
+
+        preopts = self.cfg['prebuildopts'] + self.cfg['preinstallopts']
+        if NPY_NUM_BUILD_JOBS in os.environ or NPY_NUM_BUILD_JOBS in preopts:
+            self.log.info("$%s is already defined, so leaving it alone", NPY_NUM_BUILD_JOBS)
+            return None
+
+        if os.path.exists('setup.py') and 'numpy.distutils' in read_file('setup.py'):
+            parallel_opts = ('%s=%s' % (NPY_NUM_BUILD_JOBS, parallel), '')
+        elif not self.use_setup_py:
+            self.log.info("Only packages that use numpy.distutils can be built in parallel when installing with pip")
+            return None
+        else:
+            cmd = ' '.join([self.cfg['prebuildopts'], self.python_cmd, 'setup.py', 'build_ext', '--help'])
+            (out, ec) = run_cmd(cmd, log_all=False, log_ok=False, simple=False, trace=False)
+            if ec or not re.search(r'^\s*--parallel \(-j\)', out, re.M):
+                self.log.info("build_ext does not support building extensions in parallel, building serially")
+                return None
+
+            # options specified for build_ext are also picked up when build_ext is run as a part of 'build'
+            parallel_opts = ('', 'build_ext --parallel %s' % parallel)
+
+        self.log.info("Building extensions using %s parallel jobs: %s", parallel, parallel_opts)
+        return parallel_opts
 
     def test_step(self):
         """Test the built Python package."""
@@ -477,20 +1122,30 @@ class PythonPackage(ExtensionEasyBlock):
                 extrapath = "export PYTHONPATH=%s &&" % os.pathsep.join(abs_pylibdirs + ['$PYTHONPATH'])
 
                 cmd = self.compose_install_command(testinstalldir, extrapath=extrapath)
-                run_cmd(cmd, log_all=True, simple=True, verbose=False)
+                (test_install_output, _) = run_cmd(cmd, log_all=True, simple=False, verbose=False)
 
             if self.testcmd:
                 cmd = "%s%s" % (extrapath, self.testcmd % {'python': self.python_cmd})
                 run_cmd(cmd, log_all=True, simple=True)
 
-            if testinstalldir:
+            if testinstalldir and self.cfg.get('reuse_test_install', False) and not self.dry_run:
+                self.log.info("Retaining test installation in %s, to promote it in install step", testinstalldir)
+                self.reusable_test_install = (testinstalldir, test_install_output)
+
+            elif testinstalldir:
                 try:
                     rmtree2(testinstalldir)
                 except OSError, err:
                     raise EasyBuildError("Removing testinstalldir %s failed: %s", testinstalldir, err)
 
-    def install_step(self):
-        """Install Python package to a custom path using setup.py"""
+    def has_tests(self):
+        """Check whether tests will be run for this Python package in the test step."""
+        if isinstance(self.cfg['runtest'], basestring):
+            return True
+        return bool(self.cfg['runtest']) and self.testcmd is not None
+
+    def run_install_cmd(self, cmd, log_ok=True):
+        """Run specified install command, with $PYTHONPATH set as expected."""
 
         # create expected directories
         abs_pylibdirs = [os.path.join(self.installdir, pylibdir) for pylibdir in self.all_pylibdirs]
@@ -503,19 +1158,200 @@ class PythonPackage(ExtensionEasyBlock):
         env.setvar('PYTHONPATH', new_pythonpath, verbose=False)
 
         # actually install Python package
-        cmd = self.compose_install_command(self.installdir)
-        (self.install_cmd_output, _) = run_cmd(cmd, log_all=True, log_ok=True, simple=False)
+        (out, ec) = run_cmd(cmd, log_all=log_ok, log_ok=log_ok, simple=False)
 
         # restore PYTHONPATH if it was set
         if pythonpath is not None:
             env.setvar('PYTHONPATH', pythonpath, verbose=False)
 
+        return (out, ec)
+
+    def promote_test_install(self):
+        """
+        Promote test installation to installation directory, rather than installing again.
+
+        :return: True if test installation was promoted successfully, False otherwise
+        """
+        testinstalldir, test_install_output = self.reusable_test_install
+        self.reusable_test_install = None
+
+        self.log.info("Promoting test installation in %s to installation directory %s", testinstalldir, self.installdir)
+        try:
+            removed_pyc = relocate_install(testinstalldir, testinstalldir, self.installdir)
+            merge_staged_install(testinstalldir, self.installdir)
+            if removed_pyc:
+                # regenerate byte-compiled files that were removed during relocation
+                abs_pylibdirs = [os.path.join(self.installdir, pylibdir) for pylibdir in self.all_pylibdirs]
+                cmd = "%s -m compileall -q %s" % (self.python_cmd, ' '.join(nub(abs_pylibdirs)))
+                run_cmd(cmd, log_all=False, log_ok=False, simple=False, trace=False)
+        except (EasyBuildError, IOError, OSError), err:
+            self.log.warning("Failed to promote test installation, falling back to installing again: %s", err)
+            return False
+        finally:
+            rmtree2(testinstalldir)
+
+        self.install_cmd_output = test_install_output
+        return True
+
+    def install_step(self):
+        """Install Python package to a custom path using setup.py"""
+        if self.reusable_test_install and self.promote_test_install():
+            return
+
+        cmd = self.compose_install_command(self.installdir)
+        (self.install_cmd_output, _) = self.run_install_cmd(cmd)
+
+    def batch_install_ok(self):
+        """
+        Check whether this extension can be installed in batch with other Python extensions,
+        i.e. with a single 'pip install' command or in parallel
+        (only if enabled via 'exts_batch_install' or 'exts_parallel_install' in parent easyconfig).
+        """
+        if not self.is_extension:
+            return False
+        if not (self.cfg.get('exts_batch_install', False) or self.cfg.get('exts_parallel_install', False)):
+            return False
+
+        reason = None
+        if self.install_cmd != PIP_INSTALL_CMD:
+            reason = "not installed with pip"
+        elif any(self.cfg.get(key) for key in BATCH_INSTALL_INCOMPATIBLE_OPTIONS):
+            reason = "one of %s is set" % ', '.join(BATCH_INSTALL_INCOMPATIBLE_OPTIONS)
+        elif type(self).install_step != PythonPackage.install_step or type(self).run != PythonPackage.run:
+            reason = "custom installation procedure is used by %s" % type(self).__name__
+        else:
+            batch = self.get_batch()
+            if batch and batch[0].cfg['installopts'] != self.cfg['installopts']:
+                # different installation options result in starting a new batch, rather than a fallback
+                self.install_batch()
+
+        if reason:
+            self.log.info("Not installing extension %s in batch: %s", self.name, reason)
+            return False
+
+        return True
+
+    def install_batch_exts(self, batch):
+        """
+        Install specified batch of Python extensions, using a single 'pip install' command
+        (or in parallel, if enabled via 'exts_parallel_install').
+
+        The batch is split into parts if extensions in the batch are required at build time by other extensions,
+        since all packages are built before any of them is installed by 'pip install'.
+        """
+        if self.cfg.get('exts_parallel_install', False) and len(batch) > 1:
+            self.install_batch_parallel(batch)
+            return
+
+        parts = split_batch(batch)
+        if len(parts) > 1:
+            self.log.info("Splitting batch of Python extensions in %d parts, to take into account dependencies "
+                          "required at build time: %s", len(parts), [[ext.name for ext in part] for part in parts])
+
+        for part in parts:
+            self.install_batch_part(part)
+
+    def install_batch_part(self, batch):
+        """
+        Install specified (part of a) batch of Python extensions using a single 'pip install' command.
+
+        If this fails, the extensions are installed one by one, so the failure is attributed to the right extension.
+        """
+        names = [ext.name for ext in batch]
+        if len(batch) == 1:
+            self.log.info("Only one extension in batch, installing %s as usual", names[0])
+            cwd = change_dir(batch[0].batch_install_cwd)
+            batch[0].install_step()
+            change_dir(cwd)
+            return
+
+        self.log.info("Installing batch of %d Python extensions: %s", len(batch), ', '.join(names))
+
+        locs = [ext.batch_install_loc for ext in batch]
+        # build extensions in parallel if this can be done for any package in the batch (cfr. $NPY_NUM_BUILD_JOBS)
+        env_opts = ' '.join(nub(ext.parallel_build_env for ext in batch if ext.parallel_build_env))
+        cmd = batch[0].compose_install_command(self.installdir, loc=' '.join(locs), env_opts=env_opts)
+        (out, ec) = batch[0].run_install_cmd(cmd, log_ok=False)
+
+        if ec:
+            self.log.warning("Installing batch of Python extensions failed (exit code %s), "
+                             "falling back to installing them one by one: %s", ec, out)
+            for ext in batch:
+                cwd = change_dir(ext.batch_install_cwd)
+                ext.log.info("Installing extension %s after failed batch installation", ext.name)
+                ext.install_step()
+                change_dir(cwd)
+        else:
+            for ext, ext_out in zip(batch, split_pip_output(out, locs, names)):
+                ext.install_cmd_output = ext_out
+                ext.log.info("Output of batch installation for extension %s:\n%s", ext.name, ext_out)
+
+    def install_batch_parallel(self, batch):
+        """
+        Install specified batch of Python extensions in parallel, taking into account dependencies between them.
+
+        Each extension is installed in a separate staging directory, which is merged into the installation directory
+        once the installation was successful. Extensions that depend on it are only installed after that,
+        with $PYTHONPATH set such that the installation directory is taken into account.
+        """
+        names = [normalize_pkg_name(ext.name) for ext in batch]
+
+        # only dependencies on extensions listed earlier are taken into account, which guarantees an acyclic graph;
+        # dependencies on extensions installed in an earlier batch (or not at all) are already satisfied
+        deps = {}
+        for idx, ext in enumerate(batch):
+            deps[idx] = [names.index(dep) for dep in nub(ext.ext_deps + ext.ext_setup_deps) if dep in names[:idx]]
+            ext.log.info("Dependencies for extension %s in batch: %s", ext.name, [names[i] for i in deps[idx]])
+
+        staging_root = tempfile.mkdtemp(prefix='eb-staging-', dir=self.master.builddir)
+        abs_pylibdirs = [os.path.join(self.installdir, pylibdir) for pylibdir in self.all_pylibdirs]
+        for pylibdir in abs_pylibdirs:
+            mkdir(pylibdir, parents=True)
+
+        def run_job(idx):
+            """Install extension in staging area."""
+            ext = batch[idx]
+            staging_dir = os.path.join(staging_root, str(idx))
+            staging_pylibdirs = [os.path.join(staging_dir, pylibdir) for pylibdir in self.all_pylibdirs]
+            for pylibdir in staging_pylibdirs:
+                mkdir(pylibdir, parents=True)
+
+            pythonpath = os.pathsep.join(staging_pylibdirs + abs_pylibdirs + ['$PYTHONPATH'])
+            extrapath = "cd %s && export PYTHONPATH=%s &&" % (ext.batch_install_cwd, pythonpath)
+            cmd = ext.compose_install_command(staging_dir, extrapath=extrapath, loc=ext.batch_install_loc)
+            (out, ec) = run_cmd(cmd, log_all=False, log_ok=False, simple=False, trace=False)
+
+            return (out, ec, staging_dir)
+
+        def job_done(idx, result):
+            """Merge staging area for successfully installed extension into installation directory."""
+            ext, (out, ec, staging_dir) = batch[idx], result
+            ext.install_cmd_output = out
+            ext.log.info("Output of parallel installation for extension %s (exit code %s):\n%s", ext.name, ec, out)
+            if ec:
+                return False
+            merge_staged_install(staging_dir, self.installdir)
+            return True
+
+        self.log.info("Installing batch of %d Python extensions in parallel (max. %d jobs): %s",
+                      len(batch), self.cfg['parallel'], ', '.join(names))
+        res = run_dag(range(len(batch)), deps, run_job, self.cfg['parallel'], job_done=job_done)
+        rmtree2(staging_root)
+
+        if res['errors'] or res['skipped']:
+            raise EasyBuildError("Failed to install extension(s) %s in parallel (skipped: %s)",
+                                 ', '.join(names[idx] for idx in sorted(res['errors'])),
+                                 ', '.join(names[idx] for idx in res['skipped']) or 'none')
+
     def run(self, *args, **kwargs):
         """Perform the actual Python package build/installation procedure"""
 
         if not self.src:
             raise EasyBuildError("No source found for Python package %s, required for installation. (src: %s)",
                                  self.name, self.src)
+
+        batch_install = self.prepare_batch_install()
+
         # we unpack unless explicitly told otherwise
         kwargs.setdefault('unpack_src', self.cfg.get('unpack_sources', True))
         super(PythonPackage, self).run(*args, **kwargs)
@@ -523,8 +1359,39 @@ class PythonPackage(ExtensionEasyBlock):
         # configure, build, test, install
         self.configure_step()
         self.build_step()
+
+        if batch_install and self.has_tests():
+            # tests may require extensions that are still queued for installation in batch, so install those first
+            self.install_batch()
         self.test_step()
-        self.install_step()
+
+        if batch_install and self.reusable_test_install:
+            self.log.info("Not installing extension %s in batch, since test installation can be promoted", self.name)
+            # earlier extensions must be installed first, since this one is installed right away
+            self.install_batch()
+            self.install_step()
+
+        elif batch_install:
+            self.batch_install_cwd = os.getcwd()
+            self.batch_install_loc = self.det_install_location(absolute=True)
+            if self.cfg.get('ext_deps') is None:
+                self.ext_deps = det_install_requires(self.batch_install_cwd)
+            else:
+                self.ext_deps = [normalize_pkg_name(dep) for dep in self.cfg['ext_deps']]
+            self.ext_setup_deps = det_setup_requires(self.batch_install_cwd)
+            self.log.debug("Location for installing extension %s in batch: %s", self.name, self.batch_install_loc)
+            self.queue_for_batch_install()
+        else:
+            self.install_step()
+
+    def post_install_step(self, *args, **kwargs):
+        """Precompile Python modules, if desired."""
+        super(PythonPackage, self).post_install_step(*args, **kwargs)
+
+        if self.cfg.get('precompile_bytecode', False) and not self.dry_run:
+            abs_pylibdirs = [os.path.join(self.installdir, pylibdir) for pylibdir in nub(self.all_pylibdirs)]
+            precompile_bytecode(self.python_cmd, abs_pylibdirs, self.cfg['parallel'],
+                                optimized=self.cfg.get('precompile_bytecode_optimized', False))
 
     def sanity_check_step(self, *args, **kwargs):
         """
@@ -535,6 +1402,11 @@ class PythonPackage(ExtensionEasyBlock):
             exts_filter = (orig_exts_filter[0].replace('python', self.python_cmd), orig_exts_filter[1])
             kwargs.update({'exts_filter': exts_filter})
 
+        if self.is_extension and self.cfg.get('exts_batch_sanity_check', False) and self.batch_import_check_ok():
+            # no need to check again whether Python module can be imported, so skip running the filter command
+            self.cfg['exts_filter'] = None
+            kwargs['exts_filter'] = None
+
         (success, fail_msg) = super(PythonPackage, self).sanity_check_step(*args, **kwargs)
 
         if self.cfg.get('download_dep_fail', False):
@@ -553,6 +1425,47 @@ class PythonPackage(ExtensionEasyBlock):
 
         return (success, fail_msg)
 
+    def batch_import_check_ok(self):
+        """
+        Check whether this extension passed the batched import check, which is performed for all Python extensions
+        (that use the default filter) of the parent when the first of them is being sanity checked.
+
+        For extensions that failed the batched import check, False is returned,
+        so they are checked individually (the result of the batched check is not considered to be final).
+        """
+        modname = self.options.get('modulename')
+        default_filters = [None, EXTS_FILTER_PYTHON_PACKAGES]
+        if not isinstance(modname, basestring) or self.cfg['exts_filter'] not in default_filters:
+            return False
+
+        if not hasattr(self.master, 'python_exts_import_check'):
+            exts = [ext for ext in self.master.ext_instances if isinstance(ext, PythonPackage)]
+            modnames = nub(ext.options.get('modulename') for ext in exts if ext.cfg['exts_filter'] in default_filters)
+            modnames = [m for m in modnames if isinstance(m, basestring)]
+
+            self.log.info("Checking whether %d Python modules can be imported, in chunks of %d...",
+                          len(modnames), IMPORT_CHECK_CHUNK_SIZE)
+            res = check_python_imports(self.python_cmd, modnames)
+            self.master.python_exts_import_check = res
+
+            failed = sorted(m for m in res if not res[m]['ok'])
+            for mod in failed:
+                self.log.warning("Failed to import Python module %s:\n%s", mod, res[mod]['traceback'])
+            self.log.info("Batched import check done: %d OK, %d failed, %d not checked (failed: %s)",
+                          len(res) - len(failed), len(failed), len(modnames) - len(res), ', '.join(failed) or 'none')
+
+            slowest = sorted(res.values(), key=lambda x: x['time'], reverse=True)[:10]
+            self.log.info("Slowest imports: %s", ', '.join('%s (%.2fs)' % (x['name'], x['time']) for x in slowest))
+
+        res = self.master.python_exts_import_check.get(modname)
+        if res and res['ok']:
+            self.log.info("Python module %s was imported successfully in batched import check (%.2fs)",
+                          modname, res['time'])
+            return True
+        else:
+            self.log.info("Python module %s did not pass batched import check, checking individually", modname)
+            return False
+
     def make_module_req_guess(self):
         """
         Define list of subdirectories to consider for updating path-like environment variables ($PATH, etc.).
@@ -32,17 +32,56 @@ EasyBuild support for building and installing R packages, implemented as an easy
 @author: Toon Willems (Ghent University)
 @author: Balazs Hajgato (Vrije Universiteit Brussel)
 """
+import glob
+import hashlib
 import os
+import re
 import shutil
+import tarfile
+from vsc.utils import fancylogger
 
 from easybuild.easyblocks.r import EXTS_FILTER_R_PACKAGES, EB_R
+from easybuild.easyblocks.tools.batch import BatchInstallMixin
+from easybuild.easyblocks.tools.cache import det_cache_dir, evict_lru, lookup_cached_files, store_cached_files
+from easybuild.easyblocks.tools.dag import det_critical_path, run_dag
 from easybuild.framework.easyconfig import CUSTOM
 from easybuild.framework.extensioneasyblock import ExtensionEasyBlock
 from easybuild.tools.build_log import EasyBuildError
-from easybuild.tools.filetools import mkdir
+from easybuild.tools.filetools import compute_checksum, mkdir, rmtree2
+from easybuild.tools.modules import get_software_version
 from easybuild.tools.run import run_cmd, parse_log_for_error
 
 
+# options that are specific to a single R package, which can not be combined in a batch installation
+BATCH_INSTALL_INCOMPATIBLE_OPTIONS = ['patches', 'preinstallopts', 'unpack_sources']
+
+# regular expression for line that marks the start of the output of 'R CMD INSTALL' for a particular package
+R_INSTALL_START_REGEX = re.compile(r"^\* installing \*source\* package \W*(?P<name>[A-Za-z0-9.]+)", re.M)
+
+# fields in DESCRIPTION file of R packages that specify (required) dependencies
+R_DEPS_FIELDS = ['Depends', 'Imports', 'LinkingTo']
+
+# environment variables that are taken into account in the key for the binary package cache
+# (compilers, compiler flags and BLAS/LAPACK libraries)
+BINARY_CACHE_KEY_ENV_VARS = ['CC', 'CXX', 'F77', 'FC', 'CFLAGS', 'CPPFLAGS', 'CXXFLAGS', 'FFLAGS', 'LDFLAGS',
+                             'LIBBLAS', 'LIBLAPACK']
+
+# number of R packages to load in a single R session in batched sanity check
+LIBRARY_CHECK_CHUNK_SIZE = 50
+LIBRARY_CHECK_PREFIX = 'EB_LIBRARY_CHECK'
+# R script to load packages with specified names (one by one), and report result & time for each of them
+LIBRARY_CHECK_SCRIPT = '\n'.join([
+    "for (pkg in c(%(pkgs)s)) {",
+    "    t <- system.time(res <- tryCatch({ library(pkg, character.only=TRUE); 'OK' },",
+    "                                     error=function(err) { message(conditionMessage(err)); 'FAILED' }))",
+    "    cat('\\n%s', pkg, res, t[['elapsed']], '\\n')" % LIBRARY_CHECK_PREFIX,
+    "}",
+])
+
+# statistics for binary package cache (names of packages for which there was a cache hit/miss)
+_binary_cache_stats = {'hits': [], 'misses': []}
+
+
 def make_R_install_option(opt, values, cmdline=False):
     """
     Make option list for install.packages, to specify in R environment.
@@ -62,18 +101,112 @@ def make_R_install_option(opt, values, cmdline=False):
     return txt
 
 
-class RPackage(ExtensionEasyBlock):
+def split_R_install_output(out, names):
+    """
+    Split output of installing multiple R packages in a single R session into parts for each package.
+    Returns a dict with the part of the output for each package (None for packages that are not mentioned).
+    """
+    res = dict((name, None) for name in names)
+
+    starts = [(m.start(), m.group('name')) for m in R_INSTALL_START_REGEX.finditer(out)]
+    for idx, (start, name) in enumerate(starts):
+        if name in res:
+            end = starts[idx + 1][0] if idx + 1 < len(starts) else len(out)
+            res[name] = out[start:end]
+
+    return res
+
+
+def det_R_package_deps(path):
+    """
+    Determine names of packages required by the R package at the specified location (source tarball or directory),
+    from the Depends/Imports/LinkingTo fields in its DESCRIPTION file (best effort, so no errors are raised).
+    """
+    txt = None
+    try:
+        if os.path.isdir(path):
+            with open(os.path.join(path, 'DESCRIPTION')) as fh:
+                txt = fh.read()
+        else:
+            tar = tarfile.open(path)
+            try:
+                for member in tar.getmembers():
+                    if member.name.count('/') == 1 and member.name.endswith('/DESCRIPTION'):
+                        txt = tar.extractfile(member).read()
+                        break
+            finally:
+                tar.close()
+    except (IOError, OSError, tarfile.TarError):
+        pass
+
+    if txt is None:
+        return []
+
+    # fields may be continued on the next line(s), which start with whitespace
+    fields = dict(re.findall(r'^([A-Za-z0-9/@_.-]+):(.*(?:\n[ \t].*)*)', txt, re.M))
+    deps = []
+    for field in R_DEPS_FIELDS:
+        for dep in fields.get(field, '').split(','):
+            # strip off version constraints, e.g. 'Rcpp (>= 0.12.0)'
+            dep = dep.split('(')[0].strip()
+            if dep and dep != 'R' and dep not in deps:
+                deps.append(dep)
+
+    return deps
+
+
+def check_R_libraries(names, chunk_size=LIBRARY_CHECK_CHUNK_SIZE):
+    """
+    Check whether specified R packages can be loaded, using a single R session per chunk of packages,
+    so a crash when loading a particular package only affects the other packages in that chunk.
+
+    :return: dict with result for each package (with 'ok' and 'time' keys);
+             no result is included for packages that were not checked because R crashed
+    """
+    log = fancylogger.getLogger('check_R_libraries', fname=False)
+
+    res = {}
+    regex = re.compile(r'^%s (?P<name>\S+) (?P<res>OK|FAILED) (?P<time>[0-9.]+)' % LIBRARY_CHECK_PREFIX, re.M)
+    for idx in range(0, len(names), chunk_size):
+        chunk = names[idx:idx + chunk_size]
+        stdin = LIBRARY_CHECK_SCRIPT % {'pkgs': ', '.join('"%s"' % name for name in chunk)}
+        (out, ec) = run_cmd("R -q --no-save", log_all=False, log_ok=False, simple=False, inp=stdin, regexp=False,
+                            trace=False)
+
+        for pkg_res in regex.finditer(out):
+            res[pkg_res.group('name')] = {
+                'ok': pkg_res.group('res') == 'OK',
+                'time': float(pkg_res.group('time')),
+            }
+
+        unchecked = [name for name in chunk if name not in res]
+        if unchecked:
+            log.warning("R crashed during batched sanity check (exit code %s), packages not checked: %s",
+                        ec, ', '.join(unchecked))
+
+    return res
+
+
+class RPackage(BatchInstallMixin, ExtensionEasyBlock):
     """
     Install an R package as a separate module, or as an extension.
     """
 
+    BATCH_ATTR = 'r_exts_batch'
+    BATCH_EASYBLOCK = 'RPackage'
+    BATCH_INSTALL_INCOMPATIBLE_OPTIONS = BATCH_INSTALL_INCOMPATIBLE_OPTIONS
+
     @staticmethod
     def extra_options(extra_vars=None):
         """Extra easyconfig parameters specific to RPackage."""
         extra_vars = ExtensionEasyBlock.extra_options(extra_vars=extra_vars)
         extra_vars.update({
+            'binary_cache_dir': [None, "Location of binary package cache (default: R-binaries subdirectory of "
+                                       "cache directory)", CUSTOM],
+            'binary_cache_max_size': [10240, "Maximum size of binary package cache (in MiB)", CUSTOM],
             'exts_subdir': ['', "Subdirectory where R extensions should be installed info", CUSTOM],
             'unpack_sources': [False, "Unpack sources before installation", CUSTOM],
+            'use_binary_cache': [False, "Use cache of binary packages built for this R package", CUSTOM],
         })
         return extra_vars
 
@@ -85,6 +218,10 @@ class RPackage(ExtensionEasyBlock):
         self.configurevars = []
         self.configureargs = []
         self.ext_src = None
+        self.lib_install_prefix = None
+        self.binary_path = None
+        self.binary_cache_key = None
+        self.binary_build_dir = None
 
     def make_r_cmd(self, prefix=None):
         """Create a command to run in R to install an R package."""
@@ -132,26 +269,68 @@ class RPackage(ExtensionEasyBlock):
         else:
             prefix = ''
 
-        if self.cfg['unpack_sources']:
-            loc = self.start_dir
-        elif self.patches:
-            loc = self.ext_dir
-        else:
-            loc = self.ext_src
-        cmd = ' '.join([
+        cmd = [
             self.cfg['preinstallopts'],
             "R CMD INSTALL",
-            loc,
+            self.det_install_location(),
             confargs,
             confvars,
             prefix,
             '--no-clean-on-error',
             self.cfg['installopts'],
-        ])
+        ]
+        if self.binary_build_dir:
+            # also build binary package to store in cache, in a dedicated directory (created when installing)
+            cmd[2] = os.path.abspath(cmd[2])
+            cmd = ["mkdir -p %s && cd %s &&" % (self.binary_build_dir, self.binary_build_dir)] + cmd + ['--build']
+        cmd = ' '.join(cmd)
 
         self.log.debug("make_cmdline_cmd returns %s" % cmd)
         return cmd, None
 
+    def det_install_location(self):
+        """Determine location of R package to install (cached binary package, source tarball or directory)."""
+        if self.binary_path:
+            loc = self.binary_path
+        elif self.cfg['unpack_sources']:
+            loc = self.start_dir
+        elif self.patches:
+            loc = self.ext_dir
+        else:
+            loc = self.ext_src
+        return loc
+
+    def make_batch_r_cmd(self, batch, prefix):
+        """
+        Create a command to run in R to install the specified batch of R packages in a single R session,
+        from the local source tarballs.
+        """
+        def named_list(pairs):
+            """Compose R list with specified (name, value) pairs."""
+            return 'list(%s)' % ', '.join('"%s"="%s"' % (name, ' '.join(values)) for (name, values) in pairs)
+
+        locs = ', '.join('"%s"' % ext.det_install_location() for ext in batch)
+        install_opts = ', '.join('"%s"' % x for x in ['--no-clean-on-error'] + self.cfg['installopts'].split())
+        confargs = named_list((ext.name, ext.configureargs) for ext in batch if ext.configureargs)
+        confvars = named_list((ext.name, ext.configurevars) for ext in batch if ext.configurevars)
+
+        r_cmd = '\n'.join([
+            "install.packages(c(%s), lib=\"%s\", repos=NULL, type=\"source\", dependencies=FALSE," % (locs, prefix),
+            "                 INSTALL_opts=c(%s)," % install_opts,
+            "                 configure.args=%s, configure.vars=%s)" % (confargs, confvars),
+        ])
+
+        # packages installed from local files are installed one after the other (Ncpus only has effect when
+        # installing from a repository), so only compilation of each package can be done in parallel
+        makeflags = ''
+        if self.cfg['parallel'] > 1 and 'MAKEFLAGS' not in os.environ:
+            makeflags = 'MAKEFLAGS=-j%s ' % self.cfg['parallel']
+        cmd = makeflags + "R -q --no-save"
+
+        self.log.debug("make_batch_r_cmd returns %s with input %s" % (cmd, r_cmd))
+
+        return (cmd, r_cmd)
+
     def extract_step(self):
         """Source should not be extracted."""
 
@@ -179,47 +358,275 @@ class RPackage(ExtensionEasyBlock):
 
     def install_R_package(self, cmd, inp=None):
         """Install R package as specified, and check for errors."""
+        try:
+            cmdttdouterr, _ = run_cmd(cmd, log_all=True, simple=False, inp=inp, regexp=False)
+
+            cmderrors = parse_log_for_error(cmdttdouterr, regExp="^ERROR:")
+            if cmderrors:
+                # remove package if errors were detected
+                # it's possible that some of the dependencies failed, but the package itself was installed
+                self.remove_R_package()
+                raise EasyBuildError("Errors detected during installation of R package %s!", self.name)
+            else:
+                self.log.debug("R package %s installed succesfully" % self.name)
+                self.store_binary_cached()
+        finally:
+            self.clean_up_binary_build_dir()
+
+    def det_binary_cache_key(self):
+        """
+        Determine key for binary package cache, based on checksums of source & patches, R version,
+        toolchain, dependencies (incl. BLAS/LAPACK library), configure/install options and compilers/flags.
+        """
+        if isinstance(self.src, basestring):
+            src = self.src
+        else:
+            src = self.src[0]['path']
+        patches = [p['path'] if isinstance(p, dict) else p for p in self.patches or []]
 
-        cmdttdouterr, _ = run_cmd(cmd, log_all=True, simple=False, inp=inp, regexp=False)
+        if isinstance(self.master, EB_R):
+            r_version = self.master.version
+        else:
+            r_version = get_software_version('R')
+
+        key_data = [self.name, self.version, r_version]
+        key_data.extend(compute_checksum(path, checksum_type='sha256') for path in [src] + patches)
+        key_data.extend([self.toolchain.name, self.toolchain.version])
+        key_data.extend('%s-%s' % (dep['name'], dep['version']) for dep in self.cfg.dependencies())
+        key_data.extend(self.configureargs + self.configurevars)
+        key_data.extend(self.cfg[key] or '' for key in ['preinstallopts', 'installopts'])
+        key_data.extend('%s=%s' % (var, os.getenv(var, '')) for var in BINARY_CACHE_KEY_ENV_VARS)
 
-        cmderrors = parse_log_for_error(cmdttdouterr, regExp="^ERROR:")
-        if cmderrors:
-            cmd = "R -q --no-save"
-            stdin = """
-            remove.library(%s)
-            """ % self.name
-            # remove package if errors were detected
-            # it's possible that some of the dependencies failed, but the package itself was installed
-            run_cmd(cmd, log_all=False, log_ok=False, simple=False, inp=stdin, regexp=False)
-            raise EasyBuildError("Errors detected during installation of R package %s!", self.name)
+        self.log.debug("Data used to determine key for binary package cache: %s", key_data)
+        return hashlib.sha256('\n'.join(str(x) for x in key_data)).hexdigest()
+
+    def lookup_binary_cached(self):
+        """
+        Look up binary package for this R package in binary package cache.
+        If it's not available, the binary package will be built during the installation and stored in the cache.
+        """
+        cache_dir = self.cfg['binary_cache_dir'] or det_cache_dir('R-binaries')
+        mkdir(cache_dir, parents=True)
+        key = self.det_binary_cache_key()
+
+        cached = lookup_cached_files(cache_dir, key)
+        if cached:
+            _binary_cache_stats['hits'].append(self.name)
+            self.binary_path = cached[0]
+            self.log.info("Binary package cache hit for %s (key: %s): %s", self.name, key, self.binary_path)
+        else:
+            _binary_cache_stats['misses'].append(self.name)
+            self.binary_cache_key = key
+            self.binary_build_dir = os.path.join(self.builddir, 'R-binary-%s' % self.name)
+            self.log.info("Binary package cache miss for %s (key: %s)", self.name, key)
+
+        self.log.info("Binary package cache statistics: %d hits, %d misses",
+                      len(_binary_cache_stats['hits']), len(_binary_cache_stats['misses']))
+        self.log.debug("Binary package cache hits: %s; misses: %s",
+                       _binary_cache_stats['hits'], _binary_cache_stats['misses'])
+
+    def store_binary_cached(self):
+        """Store binary package that was built during installation in binary package cache (if any)."""
+        if not self.binary_cache_key or not self.binary_build_dir:
+            return
+
+        cache_dir = self.cfg['binary_cache_dir'] or det_cache_dir('R-binaries')
+        binaries = glob.glob(os.path.join(self.binary_build_dir, '%s_*_R_*.tar.gz' % self.name))
+        if len(binaries) == 1:
+            try:
+                store_cached_files(cache_dir, self.binary_cache_key, binaries)
+                self.log.info("Stored binary package %s in binary package cache", os.path.basename(binaries[0]))
+                evicted = evict_lru(cache_dir, self.cfg['binary_cache_max_size'] * 1024 * 1024)
+                if evicted:
+                    self.log.info("Evicted %d least recently used entries from binary package cache", len(evicted))
+            except EasyBuildError, err:
+                self.log.warning("Failed to store binary package in binary package cache: %s", err)
+        else:
+            self.log.warning("Expected exactly one binary package for %s, found: %s", self.name, binaries)
+
+    def clean_up_binary_build_dir(self):
+        """Remove directory in which binary package was built (if any)."""
+        if self.binary_build_dir:
+            if os.path.exists(self.binary_build_dir):
+                rmtree2(self.binary_build_dir)
+            self.binary_build_dir = None
+
+    def remove_R_package(self):
+        """Remove (partially) installed R package."""
+        cmd = "R -q --no-save"
+        stdin = """
+        remove.library(%s)
+        """ % self.name
+        run_cmd(cmd, log_all=False, log_ok=False, simple=False, inp=stdin, regexp=False)
+
+    def batch_install_ok(self):
+        """
+        Check whether this extension can be installed in batch with other R extensions, in a single R session
+        or in parallel (only if enabled via 'exts_batch_install' or 'exts_parallel_install' in parent easyconfig).
+        """
+        if not self.is_extension:
+            return False
+        if not (self.cfg.get('exts_batch_install', False) or self.cfg.get('exts_parallel_install', False)):
+            return False
+
+        reason = None
+        if not self.src:
+            reason = "no source tarball available"
+        elif self.patches or any(self.cfg.get(key) for key in BATCH_INSTALL_INCOMPATIBLE_OPTIONS):
+            reason = "one of %s is set" % ', '.join(BATCH_INSTALL_INCOMPATIBLE_OPTIONS)
+        elif type(self).install_step != RPackage.install_step or type(self).run != RPackage.run:
+            reason = "custom installation procedure is used by %s" % type(self).__name__
+        elif self.cfg['use_binary_cache'] and not self.cfg.get('exts_parallel_install', False):
+            reason = "binary package cache can not be used when installing in a single R session"
         else:
-            self.log.debug("R package %s installed succesfully" % self.name)
+            batch = self.get_batch()
+            if batch and batch[0].cfg['installopts'] != self.cfg['installopts']:
+                # different installation options result in starting a new batch
+                self.install_batch()
+
+        if reason:
+            self.log.info("Not installing extension %s in batch: %s", self.name, reason)
+            return False
+
+        return True
+
+    def install_batch_exts(self, batch):
+        """
+        Install specified batch of R extensions, in a single R session using install.packages
+        (or in parallel, if enabled via 'exts_parallel_install').
+
+        Errors are detected for each package separately, in the part of the output that corresponds to it.
+        Packages for which errors were detected are removed and installed again one by one,
+        so the failure is attributed to the right extension.
+        """
+        names = [ext.name for ext in batch]
+        if self.cfg.get('exts_parallel_install', False) and len(batch) > 1:
+            self.install_batch_parallel(batch)
+            return
+
+        self.log.info("Installing batch of %d R extensions in a single R session: %s", len(batch), ', '.join(names))
+
+        cmd, stdin = self.make_batch_r_cmd(batch, self.lib_install_prefix)
+        (out, _) = run_cmd(cmd, log_all=False, log_ok=False, simple=False, inp=stdin, regexp=False)
+
+        failed = []
+        outputs = split_R_install_output(out, names)
+        for ext in batch:
+            ext_out = outputs[ext.name]
+            if ext_out is None:
+                ext.log.warning("No installation output found for extension %s in batch installation", ext.name)
+                failed.append(ext)
+            elif parse_log_for_error(ext_out, regExp="^ERROR:"):
+                ext.log.warning("Errors detected in batch installation for extension %s:\n%s", ext.name, ext_out)
+                ext.remove_R_package()
+                failed.append(ext)
+            else:
+                ext.log.info("Output of batch installation for extension %s:\n%s", ext.name, ext_out)
+
+        if failed:
+            self.log.warning("Installing R extensions in batch failed for %s, installing them one by one",
+                             ', '.join(ext.name for ext in failed))
+            for ext in failed:
+                cmd, stdin = ext.make_cmdline_cmd(prefix=self.lib_install_prefix)
+                ext.install_R_package(cmd, inp=stdin)
 
     def install_step(self):
         """Install procedure for R packages."""
 
+        if self.cfg['use_binary_cache'] and not self.dry_run:
+            self.lookup_binary_cached()
+
         cmd, stdin = self.make_cmdline_cmd(prefix=os.path.join(self.installdir, self.cfg['exts_subdir']))
         self.install_R_package(cmd, inp=stdin)
 
+    def install_batch_parallel(self, batch):
+        """
+        Install specified batch of R extensions in parallel, using separate 'R CMD INSTALL' commands,
+        taking into account the dependencies between them as specified in their DESCRIPTION files.
+
+        Failing to install an extension only prevents the installation of extensions that depend on it.
+        A summary of the timings on the critical path is logged, to see which packages dominate the installation time.
+        """
+        names = [ext.name for ext in batch]
+
+        # only dependencies on extensions listed earlier are taken into account, which guarantees an acyclic graph;
+        # dependencies on extensions installed in an earlier batch (or not at all) are already satisfied
+        deps = {}
+        for idx, ext in enumerate(batch):
+            ext_deps = det_R_package_deps(ext.det_install_location())
+            deps[idx] = [names.index(dep) for dep in ext_deps if dep in names[:idx]]
+            ext.log.info("Dependencies for extension %s in batch: %s", ext.name, [names[i] for i in deps[idx]])
+
+        def run_job(idx):
+            """Install extension."""
+            cmd, _ = batch[idx].make_cmdline_cmd(prefix=self.lib_install_prefix)
+            return run_cmd(cmd, log_all=False, log_ok=False, simple=False, regexp=False, trace=False)
+
+        def job_done(idx, result):
+            """Check output of installation of extension for errors."""
+            ext, (out, ec) = batch[idx], result
+            ext.log.info("Output of parallel installation for extension %s (exit code %s):\n%s", ext.name, ec, out)
+            try:
+                if ec or parse_log_for_error(out, regExp="^ERROR:"):
+                    ext.remove_R_package()
+                    return False
+                ext.store_binary_cached()
+                return True
+            finally:
+                ext.clean_up_binary_build_dir()
+
+        self.log.info("Installing batch of %d R extensions in parallel (max. %d jobs): %s",
+                      len(batch), self.cfg['parallel'], ', '.join(names))
+        res = run_dag(range(len(batch)), deps, run_job, self.cfg['parallel'], job_done=job_done)
+
+        timings = res['timings']
+        (path, duration) = det_critical_path(deps, timings)
+        durations = ["%s (%.1fs)" % (names[idx], timings[idx][1] - timings[idx][0]) for idx in path]
+        self.log.info("Critical path for parallel installation of R extensions (%.1fs in total): %s",
+                      duration, ' -> '.join(durations))
+        slowest = sorted(timings, key=lambda idx: timings[idx][0] - timings[idx][1])[:10]
+        self.log.info("Slowest R extensions in parallel installation: %s",
+                      ', '.join("%s (%.1fs)" % (names[idx], timings[idx][1] - timings[idx][0]) for idx in slowest))
+
+        if res['errors'] or res['skipped']:
+            raise EasyBuildError("Failed to install R extension(s) %s in parallel (skipped: %s)",
+                                 ', '.join(names[idx] for idx in sorted(res['errors'])),
+                                 ', '.join(names[idx] for idx in res['skipped']) or 'none')
+
     def run(self):
         """Install R package as an extension."""
 
         # determine location
         if isinstance(self.master, EB_R):
-            # extension is being installed as part of an R installation/module
-            (out, _) = run_cmd("R RHOME", log_all=True, simple=False)
-            rhome = out.strip()
-            lib_install_prefix = os.path.join(rhome, 'library')
+            # extension is being installed as part of an R installation/module;
+            # location is only determined once, since it's the same for all extensions
+            lib_install_prefix = getattr(self.master, 'r_lib_install_prefix', None)
+            if lib_install_prefix is None:
+                (out, _) = run_cmd("R RHOME", log_all=True, simple=False)
+                rhome = out.strip()
+                lib_install_prefix = os.path.join(rhome, 'library')
+                self.master.r_lib_install_prefix = lib_install_prefix
         else:
             # extension is being installed in a separate installation prefix
             lib_install_prefix = os.path.join(self.installdir, self.cfg['exts_subdir'])
             mkdir(lib_install_prefix, parents=True)
+        self.lib_install_prefix = lib_install_prefix
+
+        batch_install = self.prepare_batch_install()
 
         if self.patches:
             super(RPackage, self).run(unpack_src=True)
         else:
             super(RPackage, self).run()
 
+        if self.src and self.cfg['use_binary_cache'] and not self.dry_run:
+            self.lookup_binary_cached()
+
+        if batch_install:
+            self.ext_src = self.src
+            self.queue_for_batch_install()
+            return
+
         if self.src:
             self.ext_src = self.src
             self.log.debug("Installing R package %s version %s." % (self.name, self.version))
@@ -234,7 +641,51 @@ class RPackage(ExtensionEasyBlock):
         """
         Custom sanity check for R packages
         """
-        return super(RPackage, self).sanity_check_step(EXTS_FILTER_R_PACKAGES, *args, **kwargs)
+        exts_filter = EXTS_FILTER_R_PACKAGES
+        if self.is_extension and self.cfg.get('exts_batch_sanity_check', False) and self.batch_library_check_ok():
+            # no need to check again whether R package can be loaded, so skip running the filter command
+            self.cfg['exts_filter'] = None
+            exts_filter = None
+
+        return super(RPackage, self).sanity_check_step(exts_filter, *args, **kwargs)
+
+    def batch_library_check_ok(self):
+        """
+        Check whether this extension passed the batched sanity check, which is performed for all R extensions
+        (that use the default filter) of the parent when the first of them is being sanity checked.
+
+        For extensions that failed the batched check, False is returned,
+        so they are checked individually (the result of the batched check is not considered to be final).
+        """
+        default_filters = [None, EXTS_FILTER_R_PACKAGES]
+        if self.cfg['exts_filter'] not in default_filters:
+            return False
+
+        if not hasattr(self.master, 'r_exts_library_check'):
+            exts = [ext for ext in self.master.ext_instances if isinstance(ext, RPackage)]
+            names = [ext.name for ext in exts if ext.cfg['exts_filter'] in default_filters]
+
+            self.log.info("Checking whether %d R packages can be loaded, in chunks of %d...",
+                          len(names), LIBRARY_CHECK_CHUNK_SIZE)
+            res = check_R_libraries(names)
+            self.master.r_exts_library_check = res
+
+            failed = sorted(name for name in res if not res[name]['ok'])
+            self.log.info("Batched sanity check done: %d OK, %d failed, %d not checked (failed: %s)",
+                          len(res) - len(failed), len(failed), len(names) - len(res), ', '.join(failed) or 'none')
+
+            slowest = sorted(res, key=lambda name: res[name]['time'], reverse=True)[:10]
+            self.log.info("Slowest R packages to load: %s",
+                          ', '.join('%s (%.2fs)' % (name, res[name]['time']) for name in slowest))
+
+        res = self.master.r_exts_library_check.get(self.name)
+        if res and res['ok']:
+            self.log.info("R package %s was loaded successfully in batched sanity check (%.2fs)",
+                          self.name, res['time'])
+            return True
+        else:
+            self.log.info("R package %s did not pass batched sanity check, checking individually", self.name)
+            return False
 
     def make_module_extra(self):
         """Add install path to R_LIBS"""
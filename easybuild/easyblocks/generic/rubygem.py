@@ -29,18 +29,46 @@ EasyBuild support for Ruby Gems, implemented as an easyblock
 @author: Kenneth Hoste (Ghent University)
 """
 import os
+import re
 import shutil
 
 import easybuild.tools.environment as env
+from easybuild.easyblocks.tools.batch import BatchInstallMixin
 from easybuild.framework.extensioneasyblock import ExtensionEasyBlock
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.modules import get_software_root
 from easybuild.tools.run import run_cmd
 
 
-class RubyGem(ExtensionEasyBlock):
+# regular expression for line that marks the successful installation of a particular gem
+GEM_INSTALLED_REGEX = re.compile(r"^Successfully installed (?P<name>\S+)\s*$", re.M)
+
+
+def split_gem_install_output(out, full_names):
+    """
+    Split output of installing multiple gems with a single 'gem install' command into parts for each gem,
+    based on the 'Successfully installed <name>-<version>' lines.
+    Returns a dict with the part of the output for each gem (None for gems that were not installed successfully).
+    """
+    res = dict((full_name, None) for full_name in full_names)
+
+    start = 0
+    for installed in GEM_INSTALLED_REGEX.finditer(out):
+        # name of platform-specific gems include a platform suffix, e.g. nokogiri-1.8.2-x86_64-linux
+        for full_name in full_names:
+            if installed.group('name') == full_name or installed.group('name').startswith(full_name + '-'):
+                res[full_name] = out[start:installed.end()]
+        start = installed.end()
+
+    return res
+
+
+class RubyGem(BatchInstallMixin, ExtensionEasyBlock):
     """Builds and installs Ruby Gems."""
 
+    BATCH_ATTR = 'ruby_exts_batch'
+    BATCH_EASYBLOCK = 'RubyGem'
+
     def __init__(self, *args, **kwargs):
         """RubyGem easyblock constructor."""
         super(RubyGem, self).__init__(*args, **kwargs)
@@ -54,9 +82,57 @@ class RubyGem(ExtensionEasyBlock):
         super(RubyGem, self).run()
 
         self.ext_src = self.src
+
+        if self.prepare_batch_install():
+            self.queue_for_batch_install()
+            return
+
         self.log.debug("Installing Ruby gem %s version %s." % (self.name, self.version))
         self.install_step()
 
+    def batch_install_ok(self):
+        """
+        Check whether this extension can be installed in batch with other Ruby gems, using a single 'gem install'
+        (only if enabled via 'exts_batch_install' in parent easyconfig).
+        """
+        if not self.is_extension or not self.cfg.get('exts_batch_install', False):
+            return False
+
+        if type(self).install_step != RubyGem.install_step or type(self).run != RubyGem.run:
+            self.log.info("Not installing extension %s in batch: custom installation procedure is used by %s",
+                          self.name, type(self).__name__)
+            return False
+
+        return True
+
+    def install_batch_exts(self, batch):
+        """
+        Install specified batch of Ruby gems, using a single 'gem install'.
+        Dependencies are not resolved, since gems are installed in the order in which they are listed.
+
+        Gems that were not installed successfully are installed one by one,
+        so the failure is attributed to the right extension.
+        """
+        full_names = ['%s-%s' % (ext.name, ext.version) for ext in batch]
+        self.log.info("Installing batch of %d Ruby gems: %s", len(batch), ', '.join(full_names))
+
+        cmd = self.compose_install_cmd([ext.ext_src for ext in batch], ignore_deps=True)
+        (out, ec) = run_cmd(cmd, log_all=False, log_ok=False, simple=False)
+
+        failed = []
+        outputs = split_gem_install_output(out, full_names)
+        for ext, full_name in zip(batch, full_names):
+            if outputs[full_name] is None:
+                failed.append(ext)
+            else:
+                ext.log.info("Output of batch installation for Ruby gem %s:\n%s", ext.name, outputs[full_name])
+
+        if failed:
+            self.log.warning("Installing Ruby gems in batch failed for %s (exit code %s), installing them one by one; "
+                             "output: %s", ', '.join(ext.name for ext in failed), ec, out)
+            for ext in failed:
+                ext.install_step()
+
     def extract_step(self):
         """Skip extraction, gemfiles will be installed as downloaded"""
         if len(self.src) > 1:
@@ -89,12 +165,25 @@ class RubyGem(ExtensionEasyBlock):
         if not ruby_root:
             raise EasyBuildError("Ruby module not loaded?")
 
+        run_cmd(self.compose_install_cmd([self.ext_src]))
+
+    def compose_install_cmd(self, gems, ignore_deps=False):
+        """Compose 'gem install' command to install specified gem files."""
         # this is the 'proper' way to specify a custom installation prefix: set $GEM_HOME
         if not self.is_extension or self.master.name != 'Ruby':
             env.setvar('GEM_HOME', self.installdir)
 
+        # build native extensions in parallel
+        makeflags = ''
+        if self.cfg['parallel'] > 1 and 'MAKEFLAGS' not in os.environ:
+            makeflags = 'MAKEFLAGS=-j%s' % self.cfg['parallel']
+
         bindir = os.path.join(self.installdir, 'bin')
-        run_cmd("gem install --bindir %s --local %s" % (bindir, self.ext_src))
+        opts = ['--bindir %s' % bindir, '--local']
+        if ignore_deps:
+            opts.append('--ignore-dependencies')
+
+        return ' '.join(x for x in [makeflags, 'gem install'] + opts + gems if x)
 
     def make_module_extra(self):
         """Extend $GEM_PATH in module file."""
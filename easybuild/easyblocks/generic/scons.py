@@ -27,6 +27,9 @@ EasyBuild support for building and installing SCons, implemented as an easyblock
 
 @author: Balazs Hajgato (Free University Brussels (VUB))
 """
+import os
+
+from easybuild.easyblocks.tools.cache import get_ccache_stats, log_ccache_stats, setup_ccache
 from easybuild.framework.easyblock import EasyBlock
 from easybuild.framework.easyconfig import CUSTOM
 from easybuild.tools.run import run_cmd
@@ -37,7 +40,12 @@ class SCons(EasyBlock):
     @staticmethod
     def extra_options():
         extra_vars = {
+            'ccache_dir': [None, "Location of ccache directory (default: ccache subdirectory of cache directory)",
+                           CUSTOM],
+            'ccache_max_size': [10240, "Maximum size of ccache directory (in MiB)", CUSTOM],
             'prefix_arg': ['PREFIX=', "Syntax for specifying installation prefix", CUSTOM],
+            'use_ccache': [False, "Use ccache as compiler cache for C/C++ compilers (if available); "
+                                  "only effective if SConstruct picks up $CC/$CXX from the environment", CUSTOM],
         }
         return EasyBlock.extra_options(extra_vars)
 
@@ -62,8 +70,28 @@ class SCons(EasyBlock):
             'prefix': self.cfg['prefix_arg'] + self.installdir,
             'par': par,
         }
+
+        ccache, ccache_env = None, ''
+        if self.cfg['use_ccache'] and not self.dry_run:
+            ccache, ccache_env = setup_ccache(ccache_dir=self.cfg['ccache_dir'], max_size=self.cfg['ccache_max_size'],
+                                              basedir=self.builddir)
+        if ccache:
+            ccache_stats = get_ccache_stats(ccache, ccache_env=ccache_env)
+            # SCons does not import the environment into construction environments by default,
+            # so this only has effect for SConstruct files that pick up $CC/$CXX from os.environ;
+            # compiler commands are not passed as SCons arguments, since there's no standard way of specifying them
+            compilers = ['%s="%s %s"' % (var, ccache, os.getenv(var)) for var in ['CC', 'CXX'] if os.getenv(var)]
+            if compilers:
+                self.log.info("Using ccache for compiler commands (only if picked up by SConstruct): %s",
+                              ' '.join(compilers))
+                cmd = "export %s && %s" % (' '.join(compilers), cmd)
+            cmd = ccache_env + cmd
+
         (out, _) = run_cmd(cmd, log_all=True, log_output=verbose)
 
+        if ccache:
+            log_ccache_stats(ccache, ccache_stats, self.log, ccache_env=ccache_env)
+
         return out
 
     def test_step(self):
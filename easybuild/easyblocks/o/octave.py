@@ -48,6 +48,7 @@ class EB_Octave(ConfigureMake):
     def extra_options():
         extra_vars = {
             'blas_lapack_mt': [False, "Link with multi-threaded BLAS/LAPACK library", CUSTOM],
+            'exts_batch_install': [False, "Install extensions in batch, using a single 'pkg install'", CUSTOM],
         }
         return ConfigureMake.extra_options(extra_vars)
 
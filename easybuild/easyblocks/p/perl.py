@@ -34,11 +34,15 @@ import re
 
 from easybuild.easyblocks.generic.configuremake import ConfigureMake
 from easybuild.framework.easyconfig import CUSTOM
+from easybuild.tools.filetools import which
 from easybuild.tools.run import run_cmd
 
 # perldoc -lm seems to be the safest way to test if a module is available, based on exit code
 EXTS_FILTER_PERL_MODULES = ("perldoc -lm %(ext_name)s ", "")
 
+# cache for results of querying the configuration of the perl binary in the current $PATH
+_perl_config_cache = {}
+
 
 class EB_Perl(ConfigureMake):
     """Support for building and installing Perl."""
@@ -79,6 +83,10 @@ class EB_Perl(ConfigureMake):
             # specify locale to be used, to avoid that a handful of tests fail
             cmd = "export LC_ALL=C && %s" % cmd
 
+            # run tests in parallel, $TEST_JOBS is picked up by the Perl test harness (t/harness)
+            if self.cfg['parallel_test'] and self.cfg['parallel'] > 1:
+                cmd = "export TEST_JOBS=%s && %s" % (self.cfg['parallel'], cmd)
+
             run_cmd(cmd, log_all=False, log_ok=False, simple=False)
 
     def prepare_for_extensions(self):
@@ -99,13 +107,24 @@ class EB_Perl(ConfigureMake):
         super(EB_Perl, self).sanity_check_step(custom_paths=custom_paths)
 
 
+def get_perl_config(perl_cmd):
+    """
+    Run specified Perl code with Config module loaded, and return the output.
+    The result is cached for the perl binary that is found in the current $PATH.
+    """
+    key = (which('perl'), perl_cmd)
+    if key not in _perl_config_cache:
+        cmd = "perl -MConfig -e '%s'" % perl_cmd
+        (out, _) = run_cmd(cmd, log_all=True, log_output=True, simple=False)
+        _perl_config_cache[key] = out
+    return _perl_config_cache[key]
+
+
 def get_major_perl_version():
     """"
     Returns the major verson of the perl binary in the current path
     """
-    cmd = "perl -MConfig -e 'print $Config::Config{PERL_API_REVISION}'"
-    (perlmajver, _) = run_cmd(cmd, log_all=True, log_output=True, simple=False)
-    return perlmajver
+    return get_perl_config('print $Config::Config{PERL_API_REVISION}')
 
 def get_site_suffix(tag):
     """
@@ -116,8 +135,7 @@ def get_site_suffix(tag):
     @tag: site tag to use, e.g. 'sitearch', 'sitelib'
     """
     perl_cmd = 'my $a = $Config::Config{"%s"}; $a =~ s/($Config::Config{"siteprefix"})//; print $a' % tag
-    cmd = "perl -MConfig -e '%s'" % perl_cmd
-    (sitesuffix, _) = run_cmd(cmd, log_all=True, log_output=True, simple=False)
+    sitesuffix = get_perl_config(perl_cmd)
     # obtained value usually contains leading '/', so strip it off
     return sitesuffix.lstrip(os.path.sep)
 
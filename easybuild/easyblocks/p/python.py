@@ -37,13 +37,16 @@ import os
 import re
 import fileinput
 import sys
+import tempfile
+import time
 from distutils.version import LooseVersion
+from vsc.utils import fancylogger
 
 from easybuild.easyblocks.generic.configuremake import ConfigureMake
 from easybuild.framework.easyconfig import CUSTOM
 from easybuild.tools.build_log import EasyBuildError, print_warning
 from easybuild.tools.modules import get_software_libdir, get_software_libdir, get_software_root, get_software_version
-from easybuild.tools.filetools import remove_file, symlink
+from easybuild.tools.filetools import remove_file, rmtree2, symlink, write_file
 from easybuild.tools.run import run_cmd
 from easybuild.tools.systemtools import get_shared_lib_ext
 
@@ -53,6 +56,91 @@ EXTS_FILTER_PYTHON_PACKAGES = ('python -c "import %(ext_name)s"', "")
 # magic value for unlimited stack size
 UNLIMITED = 'unlimited'
 
+# regular expression for paths of Python modules that should not be byte-compiled,
+# since they are not valid Python code on purpose (cfr. 'compileall' command in 'make install' for Python)
+PRECOMPILE_EXCLUDE_REGEX = r'bad_coding|badsyntax|lib2to3/tests/data'
+
+# script to precompile Python modules in the specified directories in parallel,
+# which must be run with the Python interpreter for which the modules should be byte-compiled;
+# byte-compiled files that are up-to-date are retained (should work with Python 2.6 or newer, incl. Python 3)
+PRECOMPILE_SCRIPT = '\n'.join([
+    "import compileall, os, py_compile, re, sys",
+    "from multiprocessing import Pool",
+    "def compile_file(path):",
+    "    if hasattr(compileall, 'compile_file'):",
+    "        return bool(compileall.compile_file(path, quiet=1))",
+    # compileall.compile_file is only available in Python 2.7 & newer
+    "    cfile = path + (__debug__ and 'c' or 'o')",
+    "    try:",
+    "        if os.stat(cfile).st_mtime >= os.stat(path).st_mtime:",
+    "            return True",
+    "    except OSError:",
+    "        pass",
+    "    try:",
+    "        py_compile.compile(path, cfile, doraise=True)",
+    "        return True",
+    "    except (py_compile.PyCompileError, IOError):",
+    "        return False",
+    "if __name__ == '__main__':",
+    "    exclude = re.compile(sys.argv[2])",
+    "    paths = []",
+    "    for top in sys.argv[3:]:",
+    "        for (dirpath, _, filenames) in os.walk(top):",
+    "            paths.extend(os.path.join(dirpath, f) for f in sorted(filenames) if f.endswith('.py'))",
+    "    paths = [p for p in paths if not exclude.search(p)]",
+    "    pool = Pool(int(sys.argv[1]))",
+    "    res = pool.map(compile_file, paths, 100)",
+    "    pool.close()",
+    "    print('PRECOMPILE_RESULT %d %d' % (len(res), res.count(False)))",
+])
+
+
+def precompile_bytecode(python_cmd, paths, workers, optimized=False, exclude=PRECOMPILE_EXCLUDE_REGEX):
+    """
+    Byte-compile all Python modules in specified paths, in parallel using specified number of workers.
+    Byte-compiled files that are already up-to-date are not regenerated, so this can be run repeatedly.
+
+    :param python_cmd: Python command to use
+    :param paths: list of paths to directories containing Python modules
+    :param workers: number of worker processes to use
+    :param optimized: also generate optimized byte-compiled files (cfr. 'python -O')
+    :param exclude: regular expression for paths of Python modules that should not be byte-compiled
+    """
+    log = fancylogger.getLogger('precompile_bytecode', fname=False)
+
+    paths = [p for p in paths if os.path.isdir(p)]
+    if not paths:
+        log.info("No existing paths to precompile Python modules in, so nothing to do")
+        return
+
+    # use a dedicated directory for the script, since it will be included in the Python search path
+    tmpdir = tempfile.mkdtemp(prefix='eb-precompile-')
+    script = os.path.join(tmpdir, 'precompile.py')
+
+    python_opts = ['']
+    if optimized:
+        python_opts.append('-O')
+
+    try:
+        write_file(script, PRECOMPILE_SCRIPT)
+
+        for python_opt in python_opts:
+            start = time.time()
+            cmd = ' '.join([python_cmd, python_opt, script, str(max(1, workers or 1)), "'%s'" % exclude] + paths)
+            (out, ec) = run_cmd(cmd, log_all=False, log_ok=False, simple=False, trace=False)
+
+            res = re.search('^PRECOMPILE_RESULT ([0-9]+) ([0-9]+)$', out, re.M)
+            if ec or not res:
+                raise EasyBuildError("Precompiling Python modules with '%s' failed (exit code %s): %s", cmd, ec, out)
+
+            log.info("Precompiled %s Python modules in %s using %s %s (%s failed, %d workers) in %.2fs",
+                     res.group(1), paths, python_cmd, python_opt, res.group(2), workers, time.time() - start)
+            if int(res.group(2)):
+                msg = "Failed to precompile %s out of %s Python modules in %s using %s %s, see log for details"
+                print_warning(msg % (res.group(2), res.group(1), ', '.join(paths), python_cmd, python_opt))
+    finally:
+        rmtree2(tmpdir)
+
 
 class EB_Python(ConfigureMake):
     """Support for building/installing Python
@@ -70,6 +158,17 @@ class EB_Python(ConfigureMake):
     def extra_options():
         """Add extra config options specific to Python."""
         extra_vars = {
+            'exts_batch_install': [False, "Install compatible extensions in batch, using a single 'pip install'",
+                                   CUSTOM],
+            'exts_batch_sanity_check': [False, "Check whether extensions can be imported in batch, in a single "
+                                               "Python session per chunk of extensions", CUSTOM],
+            'precompile_bytecode': [False, "Precompile Python modules provided by extensions in parallel at the end "
+                                           "of the installation (standard library is byte-compiled by 'make install')",
+                                    CUSTOM],
+            'precompile_bytecode_optimized': [False, "Also generate optimized byte-compiled Python modules "
+                                                     "(only relevant when precompile_bytecode is enabled)", CUSTOM],
+            'exts_parallel_install': [False, "Install independent extensions in parallel (only for extensions that "
+                                             "are installed with pip)", CUSTOM],
             'ulimit_unlimited': [False, "Ensure stack size limit is set to '%s' during build" % UNLIMITED, CUSTOM],
         }
         return ConfigureMake.extra_options(extra_vars)
@@ -186,6 +285,28 @@ class EB_Python(ConfigureMake):
             pyver = '.'.join(self.version.split('.')[:2])
             symlink(python_binary_path + pyver, python_binary_path)
 
+    def post_install_step(self):
+        """Precompile Python modules (incl. the ones provided by extensions), if desired."""
+        super(EB_Python, self).post_install_step()
+
+        if self.cfg['precompile_bytecode'] and not self.dry_run:
+            pyver = 'python' + '.'.join(self.version.split('.')[:2])
+            python_cmd = os.path.join(self.installdir, 'bin', 'python')
+            # standard library is already byte-compiled by 'make install', only modules provided by extensions are not
+            paths = [os.path.join(self.installdir, libdir, pyver, 'site-packages') for libdir in ['lib', 'lib64']]
+
+            # load fake module, so the installed Python command works (libpython is found via $LD_LIBRARY_PATH)
+            try:
+                fake_mod_data = self.load_fake_module()
+            except EasyBuildError, err:
+                raise EasyBuildError("Loading fake module failed: %s", err)
+
+            try:
+                precompile_bytecode(python_cmd, paths, self.cfg['parallel'],
+                                    optimized=self.cfg['precompile_bytecode_optimized'])
+            finally:
+                self.clean_up_fake_module(fake_mod_data)
+
     def sanity_check_step(self):
         """Custom sanity check for Python."""
 
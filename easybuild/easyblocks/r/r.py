@@ -34,6 +34,7 @@ from distutils.version import LooseVersion
 
 import easybuild.tools.environment as env
 from easybuild.easyblocks.generic.configuremake import ConfigureMake
+from easybuild.framework.easyconfig import CUSTOM
 from easybuild.tools.build_log import print_warning
 from easybuild.tools.modules import get_software_root
 from easybuild.tools.systemtools import get_shared_lib_ext
@@ -49,6 +50,19 @@ class EB_R(ConfigureMake):
     or latest library version (in that order of preference)
     """
 
+    @staticmethod
+    def extra_options(extra_vars=None):
+        """Extra easyconfig parameters specific to R."""
+        extra_vars = ConfigureMake.extra_options(extra_vars=extra_vars)
+        extra_vars.update({
+            'exts_batch_install': [False, "Install compatible extensions in batch, in a single R session", CUSTOM],
+            'exts_batch_sanity_check': [False, "Check whether extensions can be loaded in batch, in a few R sessions "
+                                               "(only failing extensions are checked again individually)", CUSTOM],
+            'exts_parallel_install': [False, "Install independent extensions in parallel, taking into account "
+                                             "dependencies specified in DESCRIPTION files", CUSTOM],
+        })
+        return extra_vars
+
     def prepare_for_extensions(self):
         """
         We set some default configs here for R packages
@@ -29,6 +29,7 @@ EasyBuild support for Ruby, implemented as an easyblock
 """
 
 from easybuild.easyblocks.generic.configuremake import ConfigureMake
+from easybuild.framework.easyconfig import CUSTOM
 from easybuild.tools.systemtools import get_shared_lib_ext
 
 
@@ -38,7 +39,16 @@ EXTS_FILTER_GEMS = ("gem list '^%(ext_name)s$' -i", "")
 
 class EB_Ruby(ConfigureMake):
     """Building and installing Ruby including support for gems"""
-    
+
+    @staticmethod
+    def extra_options(extra_vars=None):
+        """Extra easyconfig parameters specific to Ruby."""
+        extra_vars = ConfigureMake.extra_options(extra_vars=extra_vars)
+        extra_vars.update({
+            'exts_batch_install': [False, "Install extensions in batch, using a single 'gem install'", CUSTOM],
+        })
+        return extra_vars
+
     def prepare_for_extensions(self):
         """Sets default class and filter for gems"""
         self.cfg['exts_defaultclass'] = 'RubyGem'
@@ -38,6 +38,7 @@ from distutils.version import LooseVersion
 import easybuild.tools.environment as env
 import easybuild.tools.toolchain as toolchain
 from easybuild.easyblocks.generic.pythonpackage import PythonPackage
+from easybuild.easyblocks.tools.memory import det_available_memory, det_memory_aware_parallelism
 from easybuild.framework.easyconfig import CUSTOM
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.filetools import adjust_permissions, apply_regex_substitutions, mkdir, resolve_path
@@ -78,6 +79,8 @@ class EB_TensorFlow(PythonPackage):
         extra_vars = {
             # see https://developer.nvidia.com/cuda-gpus
             'cuda_compute_capabilities': [[], "List of CUDA compute capabilities to build with", CUSTOM],
+            'memory_per_job': [2048, "Amount of memory (in MiB) required per Bazel job, used to limit the number of "
+                                     "parallel jobs and the RAM made available to Bazel (None to disable)", CUSTOM],
             'path_filter': [[], "List of patterns to be filtered out in paths in $CPATH and $LIBRARY_PATH", CUSTOM],
             'with_jemalloc': [None, "Make TensorFlow use jemalloc (usually enabled by default)", CUSTOM],
             'with_mkl_dnn': [True, "Make TensorFlow use Intel MKL-DNN", CUSTOM],
@@ -324,7 +327,21 @@ class EB_TensorFlow(PythonPackage):
         cmd.extend(['--subcommands', '--verbose_failures'])
 
         # limit the number of parallel jobs running simultaneously (useful on KNL)...
-        cmd.append('--jobs=%s' % self.cfg['parallel'])
+        # taking into account the available memory
+        parallel = det_memory_aware_parallelism(self.cfg['parallel'], self.cfg['memory_per_job'], log=self.log)
+        cmd.append('--jobs=%s' % parallel)
+
+        # also limit the amount of RAM that Bazel assumes to be available for running jobs
+        # cfr. https://docs.bazel.build/versions/master/user-manual.html#flag--local_ram_resources
+        avail_mem = det_available_memory()
+        if self.cfg['memory_per_job'] and avail_mem:
+            ram = min(avail_mem, parallel * self.cfg['memory_per_job'])
+            self.log.info("Limiting RAM available to Bazel to %d MiB", ram)
+            bazel_version = get_software_version('Bazel')
+            if bazel_version and LooseVersion(bazel_version) < LooseVersion('0.18'):
+                cmd.append('--local_resources=%d,%d,1.0' % (ram, parallel))
+            else:
+                cmd.append('--local_ram_resources=%d' % ram)
 
         if self.toolchain.options.get('pic', None):
             cmd.append('--copt="-fPIC"')
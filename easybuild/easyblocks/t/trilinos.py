@@ -36,6 +36,7 @@ from distutils.version import LooseVersion
 
 import easybuild.tools.toolchain as toolchain
 from easybuild.easyblocks.generic.cmakemake import CMakeMake
+from easybuild.easyblocks.tools.memory import det_memory_aware_parallelism
 from easybuild.framework.easyconfig import CUSTOM
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.config import build_path
@@ -53,6 +54,8 @@ class EB_Trilinos(CMakeMake):
         """Add extra config options specific to Trilinos."""
         extra_vars = {
             'shared_libs': [False, "Build shared libs; if False, build static libs", CUSTOM],
+            'memory_per_job': [3072, "Amount of memory (in MiB) required per build job, used to limit the number "
+                                     "of parallel jobs (None to disable)", CUSTOM],
             'openmp': [True, "Enable OpenMP support", CUSTOM],
             'all_exts': [True, "Enable all Trilinos packages", CUSTOM],
             'skip_exts': [[], "List of Trilinos packages to skip", CUSTOM],
@@ -63,6 +66,11 @@ class EB_Trilinos(CMakeMake):
     def configure_step(self):
         """Set some extra environment variables before configuring."""
 
+        # limit parallelism based on available memory, since compiling Trilinos requires lots of memory
+        if self.cfg['parallel']:
+            self.cfg['parallel'] = det_memory_aware_parallelism(self.cfg['parallel'], self.cfg['memory_per_job'],
+                                                                log=self.log)
+
         # enable verbose output if desired
         if self.cfg['verbose']:
             for x in ["CONFIGURE", "MAKEFILE"]:
@@ -0,0 +1,129 @@
+##
+# Copyright 2018 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+##
+"""
+Support for installing consecutive extensions in batch (e.g. with a single 'pip install' command),
+for use in extension easyblocks.
+"""
+
+
+class BatchInstallMixin(object):
+    """
+    Mixin class for extension easyblocks that support installing consecutive extensions in batch.
+
+    Extensions are queued in a list that is stored in the parent (see BATCH_ATTR); the queued extensions are installed
+    when an extension that can not be installed in batch is encountered (see prepare_batch_install),
+    or when the next extension is not a candidate for being installed in batch (see postrun).
+
+    Easyblocks that use this must define BATCH_ATTR and BATCH_EASYBLOCK,
+    and implement the batch_install_ok and install_batch_exts methods.
+    """
+    # name of attribute of parent in which extensions that are queued for installation in batch are stored
+    BATCH_ATTR = None
+    # name of easyblock for extensions that can be installed in batch
+    BATCH_EASYBLOCK = None
+    # extension options that prevent an extension from being installed in batch
+    BATCH_INSTALL_INCOMPATIBLE_OPTIONS = []
+
+    @classmethod
+    def is_batch_install_candidate(cls, ext, exts_defaultclass):
+        """
+        Check whether specified extension (as specified in the exts list of the parent) is a candidate
+        for being installed in batch with other extensions.
+
+        This is only an indication, the final decision is made in batch_install_ok.
+        """
+        options = ext.get('options', {})
+
+        if (options.get('easyblock') or exts_defaultclass) != cls.BATCH_EASYBLOCK:
+            return False
+        if any(options.get(key) for key in cls.BATCH_INSTALL_INCOMPATIBLE_OPTIONS):
+            return False
+
+        # extensions for which a software-specific easyblock is available are not a candidate
+        try:
+            from easybuild.easyblocks import det_easyblock_module
+        except ImportError:
+            return False
+
+        return det_easyblock_module(software=ext.get('name', '')) is None
+
+    def batch_install_ok(self):
+        """Check whether this extension can be installed in batch with other extensions."""
+        raise NotImplementedError
+
+    def install_batch_exts(self, batch):
+        """Install specified batch of extensions."""
+        raise NotImplementedError
+
+    def get_batch(self):
+        """Return list of extensions that are queued for installation in batch."""
+        if not hasattr(self.master, self.BATCH_ATTR):
+            setattr(self.master, self.BATCH_ATTR, [])
+        return getattr(self.master, self.BATCH_ATTR)
+
+    def prepare_batch_install(self):
+        """
+        Determine whether this extension will be installed in batch.
+        If not, the extensions that are still queued are installed first, since this one may require them.
+        """
+        if not self.is_extension:
+            return False
+
+        self.get_batch()
+        batch_install = self.batch_install_ok()
+        if not batch_install:
+            self.install_batch()
+
+        return batch_install
+
+    def queue_for_batch_install(self):
+        """Queue this extension for installation in batch."""
+        self.log.info("Queued extension %s version %s for installation in batch", self.name, self.version)
+        self.get_batch().append(self)
+
+    def install_batch(self):
+        """Install pending batch of extensions (which includes this one, if it was queued)."""
+        batch = getattr(self.master, self.BATCH_ATTR, None)
+        if batch:
+            setattr(self.master, self.BATCH_ATTR, [])
+            self.install_batch_exts(batch)
+
+    def postrun(self):
+        """
+        Install pending batch of extensions if this is the last extension,
+        or if the next extension is not a candidate for installing in batch.
+        """
+        super(BatchInstallMixin, self).postrun()
+
+        if self.is_extension and getattr(self.master, self.BATCH_ATTR, None):
+            # the parent only adds this extension to its list of extension instances after postrun
+            next_idx = len(self.master.ext_instances) + 1
+            if next_idx < len(self.master.exts):
+                next_ext = self.master.exts[next_idx]
+                if self.is_batch_install_candidate(next_ext, self.master.cfg['exts_defaultclass']):
+                    self.log.debug("Next extension %s is a candidate for batch installation", next_ext.get('name'))
+                    return
+
+            self.install_batch()
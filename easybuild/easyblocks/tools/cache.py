@@ -0,0 +1,287 @@
+##
+# Copyright 2018 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+##
+"""
+Support for caching data across EasyBuild sessions, for use in easyblocks.
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+from vsc.utils import fancylogger
+
+from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.config import build_path
+from easybuild.tools.filetools import mkdir, symlink, which
+from easybuild.tools.run import run_cmd
+
+
+_log = fancylogger.getLogger('easyblocks.tools.cache', fname=False)
+
+# name of subdirectory of build path that is used as cache directory for easyblocks
+CACHE_SUBDIR = '.easyblocks-cache'
+
+# environment variables that specify C/C++ compiler commands, which can be wrapped with ccache
+CCACHE_COMPILER_VARS = ['CC', 'CXX', 'MPICC', 'MPICXX']
+# regular expressions for hit/miss statistics in output of 'ccache --print-stats' (ccache 4.x) or 'ccache -s'
+CCACHE_STATS_REGEXES = {
+    'hits': [r'^(?:direct|preprocessed)_cache_hit\s+(\d+)$', r'^cache hit \((?:direct|preprocessed)\)\s+(\d+)$'],
+    'misses': [r'^cache_miss\s+(\d+)$', r'^cache miss\s+(\d+)$'],
+}
+
+# maximum size that was already set for ccache directories (in MiB), to avoid doing so over and over again
+_ccache_max_sizes = {}
+
+
+def det_cache_dir(*subdirs):
+    """
+    Determine (and create) location of cache directory for easyblocks,
+    optionally extended with specified subdirectories.
+
+    The cache directory is located in the build path that is configured for EasyBuild (cfr. --buildpath);
+    easyblocks provide easyconfig parameters to use a different location for particular caches
+    (e.g. 'wheel_cache_dir', 'binary_cache_dir', 'ccache_dir').
+    """
+    cache_dir = os.path.join(build_path(), CACHE_SUBDIR, *subdirs)
+    mkdir(cache_dir, parents=True)
+
+    return cache_dir
+
+
+def read_json_cache(path):
+    """
+    Read cache from specified JSON file.
+    An empty cache is returned if the file does not exist or is unreadable/corrupt.
+    """
+    res = {}
+    if os.path.exists(path):
+        try:
+            handle = open(path, 'r')
+            res = json.loads(handle.read())
+            handle.close()
+        except (IOError, OSError, ValueError), err:
+            _log.warning("Ignoring unreadable cache file %s: %s", path, err)
+            res = {}
+
+    if not isinstance(res, dict):
+        _log.warning("Ignoring cache file %s with unexpected contents", path)
+        res = {}
+
+    return res
+
+
+def write_json_cache(path, data):
+    """
+    Write cache to specified JSON file.
+
+    The cache is written to a temporary file first, which is then moved into place,
+    so concurrent EasyBuild sessions never see a partially written cache file.
+    """
+    try:
+        fd, tmp_path = tempfile.mkstemp(prefix='.%s.' % os.path.basename(path), dir=os.path.dirname(path))
+        handle = os.fdopen(fd, 'w')
+        handle.write(json.dumps(data, indent=1, sort_keys=True))
+        handle.close()
+        os.rename(tmp_path, path)
+    except (IOError, OSError), err:
+        raise EasyBuildError("Failed to write cache file %s: %s", path, err)
+
+
+def update_json_cache(path, key, value):
+    """
+    Update entry in cache stored in specified JSON file.
+    Failing to update the cache is not considered fatal, since it only affects performance.
+    """
+    try:
+        data = read_json_cache(path)
+        data[key] = value
+        write_json_cache(path, data)
+    except EasyBuildError, err:
+        _log.warning("Failed to update cache: %s", err)
+
+
+def lookup_cached_files(cache_dir, key):
+    """
+    Look up files stored under specified key in specified cache directory.
+    The cache entry is marked as being used, for the sake of evicting least recently used entries.
+
+    :return: list of paths to cached files, or None if there's no cache entry for this key
+    """
+    entry = os.path.join(cache_dir, key)
+    if not os.path.isdir(entry):
+        return None
+
+    paths = [os.path.join(entry, fn) for fn in sorted(os.listdir(entry))]
+    try:
+        os.utime(entry, None)
+    except OSError, err:
+        _log.warning("Failed to update modification time of cache entry %s: %s", entry, err)
+
+    return paths
+
+
+def store_cached_files(cache_dir, key, paths):
+    """
+    Store copy of specified files under specified key in specified cache directory.
+
+    Files are copied to a temporary directory first, which is then moved into place,
+    so concurrent EasyBuild sessions never see a partial cache entry.
+
+    :return: list of paths to cached files
+    """
+    entry = os.path.join(cache_dir, key)
+    if not os.path.exists(entry):
+        try:
+            tmpdir = tempfile.mkdtemp(prefix='.%s.' % key, dir=cache_dir)
+            for path in paths:
+                shutil.copy2(path, tmpdir)
+            os.rename(tmpdir, entry)
+        except (IOError, OSError), err:
+            # another session may have stored an entry for the same key in the meantime
+            if not os.path.isdir(entry):
+                raise EasyBuildError("Failed to store %s in cache %s: %s", paths, cache_dir, err)
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    return lookup_cached_files(cache_dir, key)
+
+
+def evict_lru(cache_dir, max_size):
+    """
+    Evict least recently used entries from specified cache directory, until the total size is below the
+    specified maximum size (in bytes).
+
+    :return: list of keys for evicted cache entries
+    """
+    entries = []
+    total_size = 0
+    for key in os.listdir(cache_dir):
+        entry = os.path.join(cache_dir, key)
+        if key.startswith('.') or not os.path.isdir(entry):
+            continue
+        size = sum(os.path.getsize(os.path.join(entry, fn)) for fn in os.listdir(entry))
+        entries.append((os.path.getmtime(entry), key, size))
+        total_size += size
+
+    evicted = []
+    for _, key, size in sorted(entries):
+        if total_size <= max_size:
+            break
+        _log.info("Evicting entry %s (%d bytes) from cache %s", key, size, cache_dir)
+        shutil.rmtree(os.path.join(cache_dir, key), ignore_errors=True)
+        total_size -= size
+        evicted.append(key)
+
+    return evicted
+
+
+def setup_ccache(ccache_dir=None, max_size=None, basedir=None):
+    """
+    Set up for using ccache as compiler cache.
+
+    The environment is left untouched: the ccache configuration is specified via a prefix for the commands
+    that should use ccache (e.g. the build command), to avoid that it leaks into other steps or installations.
+
+    :param ccache_dir: location of ccache directory (default: ccache subdirectory of cache directory)
+    :param max_size: maximum size of ccache directory (in MiB)
+    :param basedir: base directory, paths in which are rewritten to relative paths to increase hit rate
+    :return: tuple with path to ccache command and prefix for commands that use ccache,
+             or (None, '') if ccache is not available
+    """
+    ccache = which('ccache')
+    if ccache is None:
+        _log.warning("ccache command not found, not using compiler cache")
+        return (None, '')
+
+    ccache_dir = ccache_dir or det_cache_dir('ccache')
+    ccache_env = "CCACHE_DIR='%s'" % ccache_dir
+    if basedir:
+        ccache_env += " CCACHE_BASEDIR='%s'" % basedir
+    ccache_env = "export %s && " % ccache_env
+
+    # maximum size is stored in the ccache configuration, so only set it once per ccache directory
+    if max_size and _ccache_max_sizes.get(ccache_dir) != max_size:
+        cmd = "%s%s -M %sM" % (ccache_env, ccache, max_size)
+        if run_cmd(cmd, log_all=False, log_ok=False, simple=True, trace=False):
+            _ccache_max_sizes[ccache_dir] = max_size
+        else:
+            _log.warning("Failed to set maximum size of ccache directory %s to %sM", ccache_dir, max_size)
+
+    return (ccache, ccache_env)
+
+
+def create_ccache_wrappers(ccache, path):
+    """
+    Create directory with symlinks to ccache for the C/C++ compilers that are currently defined ($CC, $CXX, etc.),
+    which can be prepended to $PATH to use ccache without changing the compiler commands (masquerade mode).
+
+    :return: list of wrapped compiler commands
+    """
+    mkdir(path, parents=True)
+
+    compilers = []
+    for var in CCACHE_COMPILER_VARS:
+        compiler = os.getenv(var, '').split(' ')[0]
+        # only compiler commands that are found via $PATH can be wrapped
+        if compiler and os.path.sep not in compiler and compiler not in compilers:
+            symlink(ccache, os.path.join(path, compiler))
+            compilers.append(compiler)
+
+    return compilers
+
+
+def get_ccache_stats(ccache, ccache_env=''):
+    """
+    Get hit/miss statistics for ccache.
+
+    :param ccache: path to ccache command
+    :param ccache_env: prefix for ccache command that specifies ccache configuration (cfr. setup_ccache)
+    :return: dict with number of hits and misses, or None if the statistics could not be determined
+    """
+    for cmd in ["%s%s --print-stats" % (ccache_env, ccache), "%s%s -s" % (ccache_env, ccache)]:
+        (out, ec) = run_cmd(cmd, log_all=False, log_ok=False, simple=False, trace=False)
+        if ec:
+            continue
+
+        stats = {}
+        for key, regexes in CCACHE_STATS_REGEXES.items():
+            counts = [int(x) for regex in regexes for x in re.findall(regex, out, re.M)]
+            if counts:
+                stats[key] = sum(counts)
+
+        if sorted(stats.keys()) == ['hits', 'misses']:
+            return stats
+
+    _log.warning("Failed to determine ccache statistics")
+    return None
+
+
+def log_ccache_stats(ccache, stats_before, log, ccache_env=''):
+    """Log ccache hit/miss statistics since specified (earlier) statistics to specified log."""
+    stats = get_ccache_stats(ccache, ccache_env=ccache_env)
+    if stats and stats_before:
+        hits, misses = stats['hits'] - stats_before['hits'], stats['misses'] - stats_before['misses']
+        total = hits + misses
+        log.info("ccache statistics: %d hits, %d misses (hit rate: %.1f%%)",
+                 hits, misses, 100.0 * hits / total if total else 0.0)
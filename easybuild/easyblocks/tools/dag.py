@@ -0,0 +1,257 @@
+##
+# Copyright 2018 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+##
+"""
+Support for running jobs concurrently while respecting dependencies between them (directed acyclic graph),
+for use in easyblocks.
+"""
+import multiprocessing
+import sys
+import threading
+import time
+import Queue
+from vsc.utils import fancylogger
+
+from easybuild.tools.build_log import EasyBuildError
+
+
+_log = fancylogger.getLogger('easyblocks.tools.dag', fname=False)
+
+
+def check_dag(nodes, deps):
+    """
+    Check whether specified dependencies between nodes form a directed acyclic graph.
+
+    :param nodes: list of nodes
+    :param deps: dict with list of dependencies (nodes) for each node
+    """
+    for node in nodes:
+        for dep in deps.get(node, []):
+            if dep not in nodes:
+                raise EasyBuildError("Unknown dependency %s for %s", dep, node)
+
+    # depth-first search, keeping track of nodes that are being visited to detect cycles
+    visiting, visited = [], set()
+
+    def visit(node):
+        """Visit specified node."""
+        if node in visiting:
+            cycle = visiting[visiting.index(node):] + [node]
+            raise EasyBuildError("Cyclic dependency detected: %s", ' -> '.join(str(x) for x in cycle))
+        if node not in visited:
+            visiting.append(node)
+            for dep in deps.get(node, []):
+                visit(dep)
+            visiting.pop()
+            visited.add(node)
+
+    for node in nodes:
+        visit(node)
+
+
+def run_dag(nodes, deps, run_job, max_jobs, job_done=None, processes=False):
+    """
+    Run job for each of the specified nodes, concurrently (using at most max_jobs threads),
+    while making sure that the jobs for all dependencies of a node have completed before its job is started.
+
+    Jobs are started in the order in which nodes are specified, as soon as their dependencies are satisfied.
+    If a job fails, all nodes that (directly or indirectly) depend on it are skipped.
+
+    If processes is True, each job is run in a separate (forked) process rather than a thread,
+    so jobs can safely change the environment or working directory; results of jobs must be picklable in that case,
+    and errors for failed jobs are reported as strings.
+
+    :param nodes: list of nodes
+    :param deps: dict with list of dependencies (nodes) for each node
+    :param run_job: function to run for each node, in a separate thread
+    :param max_jobs: maximum number of jobs to run concurrently
+    :param job_done: function to call (in the main thread) with node and result of completed job;
+                     should return False (or raise an error) if the completed job should be considered as failed
+    :param processes: run jobs in separate processes rather than in threads
+    :return: dict with results, errors (for failed jobs), list of skipped nodes and (start, end) timings per node
+    """
+    check_dag(nodes, deps)
+    max_jobs = max(1, max_jobs)
+
+    res = {
+        'results': {},
+        'errors': {},
+        'skipped': [],
+        'timings': {},
+    }
+    todo = list(nodes)
+    running = set()
+    procs, starts, reported = {}, {}, set()
+    if processes:
+        done_queue = multiprocessing.Queue()
+    else:
+        done_queue = Queue.Queue()
+
+    def worker(node):
+        """Run job for specified node, and report back via queue."""
+        start = time.time()
+        try:
+            result, err = run_job(node), None
+        except Exception, err:
+            result = None
+            _log.debug("Job for %s failed", node, exc_info=sys.exc_info())
+            if processes:
+                # exceptions are not necessarily picklable (the str value of an EasyBuildError is quoted)
+                err = getattr(err, 'msg', None) or str(err)
+        done_queue.put((node, result, err, start, time.time()))
+
+    def wait_for_job():
+        """Wait for a running job to complete."""
+        if not processes:
+            return done_queue.get()
+
+        while True:
+            try:
+                job = done_queue.get(timeout=1)
+                # a process may exit with a non-zero exit code after reporting back,
+                # so its result may only show up after it was already reported as failed below
+                if job[0] not in reported:
+                    reported.add(job[0])
+                    return job
+            except Queue.Empty:
+                # check for processes that died without reporting back (e.g. killed by a signal)
+                for node, proc in procs.items():
+                    if node not in reported and not proc.is_alive() and proc.exitcode:
+                        reported.add(node)
+                        err = "Process for %s exited with exit code %s" % (node, proc.exitcode)
+                        return (node, None, err, starts[node], time.time())
+
+    while todo or running:
+        failed = set(res['errors'].keys() + res['skipped'])
+        for node in todo[:]:
+            if any(dep in failed for dep in deps.get(node, [])):
+                _log.info("Skipping %s, since one or more of its dependencies failed", node)
+                todo.remove(node)
+                res['skipped'].append(node)
+                failed.add(node)
+
+        for node in todo[:]:
+            if len(running) >= max_jobs:
+                break
+            if all(dep in res['results'] for dep in deps.get(node, [])):
+                _log.info("Starting job for %s (%d jobs running)", node, len(running) + 1)
+                todo.remove(node)
+                running.add(node)
+                if processes:
+                    proc = multiprocessing.Process(target=worker, args=(node,))
+                    proc.daemon = True
+                    proc.start()
+                    procs[node], starts[node] = proc, time.time()
+                else:
+                    thread = threading.Thread(target=worker, args=(node,))
+                    thread.setDaemon(True)
+                    thread.start()
+
+        if not running:
+            # can only happen when remaining nodes have failed dependencies, which are dealt with above
+            continue
+
+        node, result, err, start, end = wait_for_job()
+        running.remove(node)
+        if node in procs:
+            procs.pop(node).join()
+        res['timings'][node] = (start, end)
+
+        if err is None and job_done is not None:
+            try:
+                if job_done(node, result) is False:
+                    err = EasyBuildError("Job for %s failed", node)
+            except EasyBuildError, err:
+                pass
+
+        if err is None:
+            _log.info("Job for %s completed successfully (%.1fs)", node, end - start)
+            res['results'][node] = result
+        else:
+            _log.warning("Job for %s failed (%.1fs): %s", node, end - start, err)
+            res['errors'][node] = err
+
+    return res
+
+
+def det_critical_path(deps, timings):
+    """
+    Determine critical path, i.e. the chain of dependent jobs that took the longest time to complete in total.
+
+    :param deps: dict with list of dependencies (nodes) for each node
+    :param timings: dict with (start, end) timings for each node (cfr. result of run_dag)
+    :return: tuple with list of nodes on critical path (dependencies first) and total duration
+    """
+    paths = {}
+
+    def longest_path(node):
+        """Determine longest path ending in specified node, and its total duration."""
+        if node not in paths:
+            (start, end) = timings[node]
+            dep_paths = [longest_path(dep) for dep in deps.get(node, []) if dep in timings]
+            (path, duration) = max(dep_paths or [([], 0)], key=lambda x: x[1])
+            paths[node] = (path + [node], duration + end - start)
+        return paths[node]
+
+    return max([longest_path(node) for node in timings] or [([], 0)], key=lambda x: x[1])
+
+
+def det_dag_width(nodes, deps):
+    """
+    Determine width of directed acyclic graph, i.e. the maximum number of nodes that do not (directly or indirectly)
+    depend on each other, which is the maximum number of jobs that can be running at the same time.
+
+    The width is determined as the number of nodes minus the size of a maximum matching in the bipartite graph
+    formed by the transitive closure of the dependencies (cfr. Dilworth's theorem).
+
+    :param nodes: list of nodes
+    :param deps: dict with list of dependencies (nodes) for each node
+    :return: width of graph (0 if there are no nodes)
+    """
+    check_dag(nodes, deps)
+
+    all_deps = {}
+
+    def det_all_deps(node):
+        """Determine all (direct and indirect) dependencies of specified node."""
+        if node not in all_deps:
+            all_deps[node] = set(deps.get(node, []))
+            for dep in deps.get(node, []):
+                all_deps[node].update(det_all_deps(dep))
+        return all_deps[node]
+
+    # determine maximum matching of nodes with one of their (direct or indirect) dependencies, via augmenting paths
+    matches = {}
+
+    def match(node, seen):
+        """Try to match specified node with a dependency, rematching other nodes if needed."""
+        for dep in det_all_deps(node):
+            if dep not in seen:
+                seen.add(dep)
+                if dep not in matches or match(matches[dep], seen):
+                    matches[dep] = node
+                    return True
+        return False
+
+    return len(nodes) - len([node for node in nodes if match(node, set())])
@@ -0,0 +1,154 @@
+##
+# Copyright 2018 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+##
+"""
+Support for taking into account available memory, for use in easyblocks.
+"""
+import os
+import re
+from vsc.utils import fancylogger
+
+from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.filetools import read_file
+
+
+_log = fancylogger.getLogger('easyblocks.tools.memory', fname=False)
+
+MEMINFO_PATH = '/proc/meminfo'
+PROC_CGROUP_PATH = '/proc/self/cgroup'
+CGROUP_ROOT = '/sys/fs/cgroup'
+# cgroup v1 reports a value close to 2^63 as memory limit if there is no limit
+CGROUP_V1_UNLIMITED = 2 ** 62
+
+
+def det_cgroup_memory_limit():
+    """
+    Determine memory limit (in MiB) imposed on this process via cgroups (e.g. by a resource manager for a job),
+    using memory.limit_in_bytes (cgroup v1) or memory.max (cgroup v2) of the cgroup of this process and its parents.
+
+    :return: memory limit in MiB, or None if there is no limit (or if it could not be determined)
+    """
+    try:
+        proc_cgroup = read_file(PROC_CGROUP_PATH)
+    except EasyBuildError, err:
+        _log.debug("Failed to read %s: %s", PROC_CGROUP_PATH, err)
+        return None
+
+    # lines in /proc/self/cgroup are formatted as <id>:<controllers>:<path>, with empty list of controllers for v2
+    cgroups = []
+    for line in (proc_cgroup or '').splitlines():
+        fields = line.split(':', 2)
+        if len(fields) == 3:
+            if fields[1] == '':
+                cgroups.append((CGROUP_ROOT, fields[2], 'memory.max'))
+            elif 'memory' in fields[1].split(','):
+                cgroups.append((os.path.join(CGROUP_ROOT, 'memory'), fields[2], 'memory.limit_in_bytes'))
+
+    limits = []
+    for (root, path, limit_fn) in cgroups:
+        # limits of parent cgroups also apply; if the cgroup path is not visible (e.g. in a container),
+        # only the limit at the root of the hierarchy is taken into account
+        path = path.strip('/')
+        while True:
+            limit_path = os.path.join(root, path, limit_fn)
+            if os.path.exists(limit_path):
+                limit = read_file(limit_path, log_error=False) or ''
+                if limit.strip().isdigit() and int(limit) < CGROUP_V1_UNLIMITED:
+                    limits.append(int(limit) // 1048576)
+                    _log.info("Memory limit according to %s: %d MiB", limit_path, limits[-1])
+            if not path:
+                break
+            path = os.path.dirname(path)
+
+    if limits:
+        return min(limits)
+    else:
+        return None
+
+
+def det_available_memory():
+    """
+    Determine amount of available memory (in MiB), using MemAvailable (or MemTotal if MemAvailable is not reported)
+    in /proc/meminfo, taking into account the memory limit imposed via cgroups (if any).
+
+    :return: available memory in MiB, or None if it could not be determined
+    """
+    avail_mem = None
+    try:
+        meminfo = read_file(MEMINFO_PATH)
+    except EasyBuildError, err:
+        _log.warning("Failed to read %s: %s", MEMINFO_PATH, err)
+        meminfo = None
+
+    for key in ['MemAvailable', 'MemTotal']:
+        res = re.search(r'^%s:\s*(\d+)\s*kB' % key, meminfo or '', re.M)
+        if res:
+            avail_mem = int(res.group(1)) // 1024
+            _log.info("Available memory according to %s in %s: %d MiB", key, MEMINFO_PATH, avail_mem)
+            break
+
+    cgroup_limit = det_cgroup_memory_limit()
+    if cgroup_limit is not None and (avail_mem is None or cgroup_limit < avail_mem):
+        _log.info("Available memory limited by cgroup memory limit: %d MiB", cgroup_limit)
+        avail_mem = cgroup_limit
+
+    if avail_mem is None:
+        _log.warning("Failed to determine available memory from %s", MEMINFO_PATH)
+
+    return avail_mem
+
+
+def det_memory_aware_parallelism(max_parallel, memory_per_job, log=None):
+    """
+    Determine parallelism to use, taking into account the available memory and the (estimated) amount of memory
+    required per job, i.e. min(max_parallel, available memory / memory per job).
+
+    :param max_parallel: maximum parallelism (e.g. based on number of available cores)
+    :param memory_per_job: amount of memory (in MiB) required per job (None or 0 to not take memory into account)
+    :param log: logger to use to log the chosen parallelism, and the reason for it
+    :return: parallelism to use (at least 1)
+    """
+    if log is None:
+        log = _log
+
+    parallel = max(1, int(max_parallel or 1))
+
+    if memory_per_job:
+        avail_mem = det_available_memory()
+        if avail_mem is None:
+            reason = "available memory could not be determined"
+        else:
+            mem_parallel = max(1, avail_mem // memory_per_job)
+            tup = (avail_mem, memory_per_job, mem_parallel)
+            if mem_parallel < parallel:
+                parallel = mem_parallel
+                reason = "limited by available memory (%d MiB available, %d MiB per job => %d jobs)" % tup
+            else:
+                reason = "sufficient memory available (%d MiB available, %d MiB per job => %d jobs)" % tup
+    else:
+        reason = "no memory per job specified"
+
+    log.info("Parallelism: %d (maximum: %s), %s", parallel, max_parallel, reason)
+
+    return parallel
@@ -0,0 +1,443 @@
+##
+# Copyright 2018 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+##
+"""
+Support for profiling installations performed with easyblocks.
+
+For every step, and for every command run via run_cmd/run_cmd_qa from an easyblock, the wall time,
+the user/system CPU time and peak RSS of the child process tree, and the number of bytes written are recorded.
+A JSON profile is written next to the build log (updated after every step),
+and a summary of the most expensive steps/commands is printed at the end of the session.
+
+This module is a hooks file (see 'eb --hooks'), and profiling is only done when it is used as such:
+
+    eb --hooks=<prefix>/easybuild/easyblocks/tools/profiling.py ...
+
+If other hooks are already in use, the start_profiling, start_step, end_step, end_profiling and report_profiles
+functions can be called from the corresponding hooks instead.
+
+Since the EasyBuild framework does not provide a way to intercept the commands that are run, the run_cmd/run_cmd_qa
+functions are replaced with profiled versions, both in easybuild.tools.run and in the easyblock modules that are
+loaded (which import them by name). This is deliberate: only commands issued from easyblocks are profiled this way.
+
+Post-step hooks are not run for a step that fails, so the measurement for that step is stopped (and marked as failed)
+when the next installation is started, in the end hook, or when EasyBuild exits (since it may exit on failure
+before running the end hook). The profile is always written, such that it is available for failed installations too.
+
+Settings can be controlled via these environment variables:
+
+* $EASYBUILD_EASYBLOCKS_PROFILE_TOP: number of steps/commands to include in summary (default: 10)
+* $EASYBUILD_EASYBLOCKS_PROFILE_INTERVAL: interval (in seconds) for sampling memory usage (default: 1)
+"""
+import atexit
+import os
+import resource
+import sys
+import threading
+import time
+from vsc.utils import fancylogger
+
+import easybuild.tools.run
+from easybuild.easyblocks.tools.cache import write_json_cache
+from easybuild.tools.build_log import EasyBuildError, print_msg
+
+
+_log = fancylogger.getLogger('easyblocks.tools.profiling', fname=False)
+
+# names of installation steps, for which pre/post hooks are defined
+PROFILED_STEPS = ['fetch', 'ready', 'source', 'patch', 'prepare', 'configure', 'build', 'test', 'install',
+                  'extensions', 'postproc', 'sanitycheck', 'cleanup', 'module', 'permissions', 'package', 'testcases']
+# functions in easybuild.tools.run that are profiled
+PROFILED_RUN_FUNCTIONS = ['run_cmd', 'run_cmd_qa']
+
+DEFAULT_PROFILE_TOP = 10
+DEFAULT_PROFILE_INTERVAL = 1.0
+# maximum length of (recorded) commands in profile
+MAX_CMD_LENGTH = 500
+
+PROC_IO_PATH = '/proc/self/io'
+
+# profiles for installations performed in this session, and measurements that are currently ongoing
+_profiles = []
+_active = []
+_lock = threading.RLock()
+_sampler = {'thread': None}
+_state = {'exit_handler': False}
+# original (non-profiled) functions to run commands
+_run_functions = {}
+
+
+def read_io_counters():
+    """
+    Read I/O counters for this process from /proc/self/io,
+    which also include the I/O of all child processes that have terminated (and were waited for).
+    """
+    res = {}
+    try:
+        handle = open(PROC_IO_PATH, 'r')
+        for line in handle.read().splitlines():
+            key, value = line.split(':', 1)
+            res[key.strip()] = int(value)
+        handle.close()
+    except (IOError, OSError, ValueError), err:
+        _log.debug("Failed to read I/O counters from %s: %s", PROC_IO_PATH, err)
+
+    return res
+
+
+def det_child_tree_rss(pid=None):
+    """
+    Determine total resident set size (in bytes) of all (running) descendant processes of specified process
+    (defaults to this process), by scanning /proc.
+    """
+    if pid is None:
+        pid = os.getpid()
+
+    children, rss = {}, {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            handle = open(os.path.join('/proc', entry, 'stat'), 'r')
+            stat = handle.read()
+            handle.close()
+            # command name (2nd field) is enclosed in parentheses and may contain spaces
+            fields = stat[stat.rindex(')') + 2:].split()
+            children.setdefault(int(fields[1]), []).append(int(entry))
+            rss[int(entry)] = int(fields[21])
+        except (IOError, OSError, ValueError, IndexError):
+            # process may have terminated in the meantime
+            continue
+
+    total, todo = 0, list(children.get(pid, []))
+    while todo:
+        child = todo.pop()
+        total += rss.get(child, 0)
+        todo.extend(children.get(child, []))
+
+    return total * resource.getpagesize()
+
+
+class Measurement(object):
+    """Measurement of resources used by child processes during a step or command."""
+
+    def __init__(self, **info):
+        """Start measurement."""
+        self.info = info
+        self.peak_rss = 0
+
+        self.start_time = time.time()
+        self.start_times = os.times()
+        self.start_maxrss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        self.start_io = read_io_counters()
+
+        with _lock:
+            _active.append(self)
+        start_sampler()
+
+    def stop(self):
+        """Stop measurement, and return result."""
+        with _lock:
+            if self in _active:
+                _active.remove(self)
+
+        times = os.times()
+        maxrss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        io = read_io_counters()
+
+        # ru_maxrss (in KiB) is the peak RSS of the largest child process that terminated so far,
+        # so it is only relevant for this measurement if it increased
+        if maxrss > self.start_maxrss:
+            self.peak_rss = max(self.peak_rss, maxrss * 1024)
+
+        res = dict(self.info)
+        res.update({
+            'start': self.start_time,
+            'wall_time': time.time() - self.start_time,
+            'user_time': times[2] - self.start_times[2],
+            'sys_time': times[3] - self.start_times[3],
+            'peak_rss': self.peak_rss,
+            'bytes_written': None,
+            'chars_written': None,
+        })
+        if 'write_bytes' in io and 'write_bytes' in self.start_io:
+            res['bytes_written'] = io['write_bytes'] - self.start_io['write_bytes']
+        if 'wchar' in io and 'wchar' in self.start_io:
+            res['chars_written'] = io['wchar'] - self.start_io['wchar']
+
+        return res
+
+
+def sample_memory_usage(interval):
+    """Periodically sample memory usage of child process tree, while measurements are ongoing."""
+    while True:
+        with _lock:
+            if not _active:
+                _sampler['thread'] = None
+                break
+        rss = det_child_tree_rss()
+        with _lock:
+            for measurement in _active:
+                measurement.peak_rss = max(measurement.peak_rss, rss)
+        time.sleep(interval)
+
+
+def start_sampler():
+    """Start thread that samples memory usage of child process tree (if it's not running yet)."""
+    with _lock:
+        if _sampler['thread'] is None:
+            interval = float(os.getenv('EASYBUILD_EASYBLOCKS_PROFILE_INTERVAL', DEFAULT_PROFILE_INTERVAL))
+            thread = threading.Thread(target=sample_memory_usage, args=(interval,))
+            thread.daemon = True
+            _sampler['thread'] = thread
+            thread.start()
+
+
+def det_caller():
+    """Determine location of (easyblock) code that called a profiled function, e.g. easybuild.easyblocks.gcc:123"""
+    frame = sys._getframe(2)
+    return '%s:%s (%s)' % (frame.f_globals.get('__name__'), frame.f_lineno, frame.f_code.co_name)
+
+
+def profiled(func):
+    """Return profiled version of specified function to run commands."""
+    if getattr(func, 'profiled', False):
+        return func
+
+    def profiled_func(cmd, *args, **kwargs):
+        """Profiled version of function to run commands."""
+        with _lock:
+            profile = _profiles and _profiles[-1]
+        if not profile:
+            return func(cmd, *args, **kwargs)
+
+        if isinstance(cmd, (list, tuple)):
+            cmd_str = ' '.join(cmd)
+        else:
+            cmd_str = str(cmd)
+
+        measurement = Measurement(cmd=cmd_str[:MAX_CMD_LENGTH], function=func.__name__, caller=det_caller(),
+                                  step=profile['current_step'])
+        try:
+            res = func(cmd, *args, **kwargs)
+        finally:
+            result = measurement.stop()
+            with _lock:
+                profile['commands'].append(result)
+
+        if isinstance(res, tuple) and len(res) == 2:
+            result['exit_code'] = res[1]
+
+        return res
+
+    profiled_func.profiled = True
+    profiled_func.__name__ = func.__name__
+    return profiled_func
+
+
+def profile_run_functions(modules=None):
+    """
+    Replace functions to run commands with profiled versions, in easybuild.tools.run and all easyblock modules
+    (which import them by name).
+    """
+    for name in PROFILED_RUN_FUNCTIONS:
+        func = getattr(easybuild.tools.run, name)
+        if not getattr(func, 'profiled', False):
+            _run_functions[name] = func
+            setattr(easybuild.tools.run, name, profiled(func))
+
+    if modules is None:
+        modules = [mod for (name, mod) in sys.modules.items() if name.startswith('easybuild.easyblocks.')]
+
+    for mod in modules:
+        for name in PROFILED_RUN_FUNCTIONS:
+            func = getattr(mod, name, None)
+            if func is not None and func is _run_functions.get(name):
+                setattr(mod, name, getattr(easybuild.tools.run, name))
+
+
+def det_profile_path(logfile):
+    """Determine location of JSON profile, next to specified build log."""
+    return '%s-profile.json' % os.path.splitext(logfile)[0]
+
+
+def write_profile(profile):
+    """Write specified profile to JSON file next to build log (if known)."""
+    if profile['path']:
+        with _lock:
+            data = dict((key, value) for (key, value) in profile.items() if key not in ['current_step', 'eb', 'path'])
+        try:
+            write_json_cache(profile['path'], data)
+        except EasyBuildError, err:
+            _log.warning("Failed to write profile: %s", err)
+
+
+def start_profiling():
+    """Start profiling of run_cmd/run_cmd_qa calls issued from easyblocks."""
+    profile_run_functions()
+
+    # make sure ongoing measurements are stopped and written if EasyBuild exits on failure
+    with _lock:
+        if not _state['exit_handler']:
+            atexit.register(end_profiling)
+            _state['exit_handler'] = True
+
+
+def stop_failed_step(profile):
+    """Stop measurement for step in specified profile that is still ongoing (if any), since it failed."""
+    with _lock:
+        measurement = profile.pop('measurement', None)
+        if measurement is None:
+            return
+        result = measurement.stop()
+        result['failed'] = True
+        profile['steps'].append(result)
+        profile['current_step'] = None
+
+    _log.info("Step '%s' for %s v%s failed", result['step'], profile['name'], profile['version'])
+    write_profile(profile)
+
+
+def end_profiling():
+    """Stop measurements for steps that are still ongoing (since they failed), and write the corresponding profiles."""
+    with _lock:
+        profiles = _profiles[:]
+
+    for profile in profiles:
+        stop_failed_step(profile)
+
+
+def start_step(eb, step):
+    """Start profiling of specified step for specified easyblock instance."""
+    with _lock:
+        profile = _profiles and _profiles[-1]
+        if not profile or profile['eb'] != id(eb):
+            # a step of the previous installation that is still ongoing failed
+            if profile:
+                stop_failed_step(profile)
+            logfile = getattr(eb, 'logfile', None)
+            profile = {
+                'eb': id(eb),
+                'name': eb.cfg['name'],
+                'version': eb.cfg['version'],
+                'easyblock': eb.__class__.__name__,
+                'path': logfile and det_profile_path(logfile),
+                'current_step': None,
+                'steps': [],
+                'commands': [],
+            }
+            _profiles.append(profile)
+        profile['current_step'] = step
+        profile['measurement'] = Measurement(step=step)
+
+    # easyblock modules imported since the previous step also need to use the profiled run_cmd/run_cmd_qa
+    profile_run_functions(modules=[sys.modules[klass.__module__] for klass in type(eb).__mro__
+                                   if klass.__module__ in sys.modules])
+
+
+def end_step(eb, step):
+    """End profiling of specified step for specified easyblock instance."""
+    with _lock:
+        profile = _profiles and _profiles[-1]
+        if not profile or profile['eb'] != id(eb) or profile['current_step'] != step:
+            return
+        profile['steps'].append(profile.pop('measurement').stop())
+        profile['current_step'] = None
+
+    write_profile(profile)
+
+
+def format_metrics(entry):
+    """Format metrics for specified profile entry."""
+    res = "%.1fs wall, %.1fs user, %.1fs sys, %.1f MiB peak RSS" % (entry['wall_time'], entry['user_time'],
+                                                                    entry['sys_time'], entry['peak_rss'] / 1048576.)
+    if entry.get('bytes_written') is not None:
+        res += ", %.1f MiB written" % (entry['bytes_written'] / 1048576.)
+    return res
+
+
+def det_profile_summary(profile, top=None):
+    """Compose summary of specified profile, including the top-N most expensive steps and commands (by wall time)."""
+    if top is None:
+        top = int(os.getenv('EASYBUILD_EASYBLOCKS_PROFILE_TOP', DEFAULT_PROFILE_TOP))
+
+    lines = ["Profile for %s v%s (%s easyblock)%s:" % (profile['name'], profile['version'], profile['easyblock'],
+                                                       profile['path'] and ', see %s' % profile['path'] or '')]
+    steps = sorted(profile['steps'], key=lambda x: x['wall_time'], reverse=True)[:top]
+    if steps:
+        lines.append("* top %d steps:" % len(steps))
+        for step in steps:
+            lines.append("  - %s step%s: %s" % (step['step'], step.get('failed') and ' (failed)' or '',
+                                                format_metrics(step)))
+
+    cmds = sorted(profile['commands'], key=lambda x: x['wall_time'], reverse=True)[:top]
+    if cmds:
+        lines.append("* top %d commands:" % len(cmds))
+        for cmd in cmds:
+            lines.append("  - [%s step, %s] %s" % (cmd['step'], cmd['caller'], cmd['cmd'].strip()[:100]))
+            lines.append("    %s" % format_metrics(cmd))
+
+    return '\n'.join(lines)
+
+
+def report_profiles():
+    """Report summary of profiles of all installations performed in this session."""
+    with _lock:
+        profiles = _profiles[:]
+
+    for profile in profiles:
+        summary = det_profile_summary(profile)
+        _log.info(summary)
+        print_msg(summary, log=None, prefix=False)
+
+
+def start_hook():
+    """Hook run at start of EasyBuild session: start profiling."""
+    start_profiling()
+
+
+def end_hook():
+    """Hook run at end of EasyBuild session: stop measurements for failed steps, and report profiles."""
+    end_profiling()
+    report_profiles()
+
+
+def _define_step_hooks(step):
+    """Define pre/post hooks for specified step."""
+
+    def pre_step_hook(self):
+        """Hook run before step: start profiling of this step."""
+        start_step(self, step)
+
+    def post_step_hook(self):
+        """Hook run after step: end profiling of this step."""
+        end_step(self, step)
+
+    for prefix, hook in [('pre', pre_step_hook), ('post', post_step_hook)]:
+        hook.__name__ = '%s_%s_hook' % (prefix, step)
+        globals()[hook.__name__] = hook
+
+
+for _step in PROFILED_STEPS:
+    _define_step_hooks(_step)
@@ -38,7 +38,8 @@ import sys
 from distutils import log
 
 sys.path.append('easybuild')
-from easyblocks import VERSION
+from easyblocks import (VERSION, EASYBLOCKS_INDEX_FILENAME, GIT_REVISION_STAMP_FILENAME, write_easyblocks_index,
+                        write_git_revision_stamp)
 
 API_VERSION = str(VERSION).split('.')[0]
 suff = ''
@@ -60,15 +61,40 @@ log.set_verbosity(1)
 
 try:
     from setuptools import setup
+    from setuptools.command.build_py import build_py
+    from setuptools.command.sdist import sdist
     log.info("Installing with setuptools.setup...")
 except ImportError, err:
     log.info("Failed to import setuptools.setup, so falling back to distutils.setup")
     from distutils.core import setup
+    from distutils.command.build_py import build_py
+    from distutils.command.sdist import sdist
 
 # Utility function to read README file
 def read(fname):
     return open(os.path.join(os.path.dirname(__file__), fname)).read()
 
+
+def generate_files(cmd_class):
+    """
+    Return version of specified setup command that (re)generates the files that are installed along with the
+    easyblocks first: the index of easyblocks, and the stamp file for the git revision
+    (so git doesn't need to be run to determine the verbose version).
+
+    This is only done when building or packaging easybuild-easyblocks, not for every invocation of this script.
+    """
+    class GenerateFilesCommand(cmd_class):
+        def run(self):
+            log.info("Generating index of easyblocks and git revision stamp file...")
+            write_easyblocks_index()
+            write_git_revision_stamp()
+            if hasattr(self, 'data_files'):
+                # list of package data files may have been determined before the generated files were available
+                self.data_files = self.get_data_files()
+            cmd_class.run(self)
+
+    return GenerateFilesCommand
+
 log.info("Installing version %s (required versions: API >= %s)" % (VERSION, API_VERSION))
 
 setup(
@@ -80,9 +106,9 @@ setup(
     license = "GPLv2",
     keywords = "software build building installation installing compilation HPC scientific",
     url = "https://easybuilders.github.io/easybuild",
-    packages = ["easybuild", "easybuild.easyblocks", "easybuild.easyblocks.generic"],
+    packages = ["easybuild", "easybuild.easyblocks", "easybuild.easyblocks.generic", "easybuild.easyblocks.tools"],
     package_dir = {"easybuild.easyblocks": "easybuild/easyblocks"},
-    package_data = {'easybuild.easyblocks': ["[a-z0-9]/*.py"]},
+    package_data = {'easybuild.easyblocks': ["[a-z0-9]/*.py", EASYBLOCKS_INDEX_FILENAME, GIT_REVISION_STAMP_FILENAME]},
     long_description = read("README.rst"),
     classifiers = [
         "Development Status :: 5 - Production/Stable",
@@ -99,4 +125,5 @@ setup(
         "easybuild-framework >= %s" % API_VERSION,
     ],
     zip_safe = False,
+    cmdclass = {'build_py': generate_files(build_py), 'sdist': generate_files(sdist)},
 )
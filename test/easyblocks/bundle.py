@@ -0,0 +1,131 @@
+##
+# Copyright 2018-2018 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+##
+"""
+Unit tests for the Bundle easyblock (easybuild.easyblocks.generic.bundle).
+"""
+import glob
+import os
+import re
+from unittest import TestLoader, main
+from vsc.utils.patterns import Singleton
+
+import easybuild.easyblocks.generic.bundle as bundle
+from easybuild.tools import config
+from easybuild.tools.filetools import read_file
+from test.easyblocks.utilities import EasyblockTestCase, init_config
+
+
+class BundleTest(EasyblockTestCase):
+    """Tests for the Bundle easyblock (easybuild.easyblocks.generic.bundle)."""
+
+    def test_bundle_components_parallel_install(self):
+        """Test splitting cores across components of a bundle that are installed concurrently."""
+        recorded = []
+
+        def fake_run_dag(nodes, deps, run_job, max_jobs, job_done=None, processes=False):
+            """Fake version of run_dag, which only records how many jobs would be run with how many cores each."""
+            recorded.append((max_jobs, [cfg['parallel'] for cfg in app.comp_cfgs]))
+            for node in nodes:
+                job_done(node, {})
+            return {'results': {}, 'errors': {}, 'skipped': [], 'timings': dict((n, (0, 1)) for n in nodes)}
+
+        def init_bundle(components):
+            """Create Bundle instance with specified components (name and dependencies)."""
+            comps = []
+            for (name, deps) in components:
+                specs = {'sources': ['%s.tar.gz' % name]}
+                if deps is not None:
+                    specs['depends_on'] = deps
+                comps.append((name, '1.0', specs))
+            extratxt = "components = %s\ncomponents_parallel_install = True\nparallel = 8" % comps
+            return self.init_easyblock('Bundle', extratxt=extratxt)
+
+        orig_run_dag = bundle.run_dag
+        bundle.run_dag = fake_run_dag
+        try:
+            # 4 independent components: 2 cores each
+            app = init_bundle([('a', []), ('b', []), ('c', []), ('d', [])])
+            app.install_components_parallel()
+            # only 'b' and 'c' can be installed at the same time: 4 cores each
+            app = init_bundle([('a', None), ('b', ['a']), ('c', ['a']), ('d', ['b', 'c'])])
+            app.install_components_parallel()
+            # no dependencies specified, so components are installed one by one: all cores for each component
+            app = init_bundle([('a', None), ('b', None), ('c', None)])
+            app.install_components_parallel()
+        finally:
+            bundle.run_dag = orig_run_dag
+
+        self.assertEqual(recorded, [(4, [2, 2, 2, 2]), (2, [4, 4, 4, 4]), (1, [8, 8, 8])])
+
+    def test_bundle_components_configure_cache(self):
+        """Test sharing of autoconf cache file across components of a bundle that have a separate build directory."""
+        srcdir = os.path.join(self.tmpdir, 'src')
+        configure_log = self.setup_fake_configure(srcdir)
+        specs = {
+            'sources': ['%(name)s.tar.gz'],
+            'easyblock': 'ConfigureMake',
+            'skipsteps': ['build', 'install'],
+            'start_dir': srcdir,
+        }
+        comps = [('foo', '1.0', dict(specs, configopts='foo')), ('bar', '1.0', dict(specs, configopts='bar'))]
+        app = self.init_easyblock('Bundle', extratxt="components = %s\nconfigure_cache = True" % comps)
+
+        comps_builddir = os.path.join(app.builddir, 'easybuild_components')
+        # start directory of components is only entered when not running with --module-only,
+        # which may be enabled via the (singleton) build options by other tests (cfr. test/easyblocks/module.py)
+        build_options = dict(config.BuildOptions())
+        try:
+            del Singleton._instances[config.BuildOptions]
+            config.init_build_options(build_options=dict(build_options, module_only=False))
+            # warnings are printed for (fake) config.guess script, since its version & checksum do not match
+            self.mock_stderr(True)
+            for cfg in app.comp_cfgs:
+                app.install_component(cfg, builddir=os.path.join(comps_builddir, cfg['name']))
+            self.mock_stderr(False)
+        finally:
+            del Singleton._instances[config.BuildOptions]
+            config.init_build_options(build_options=build_options)
+
+        # a single cache file is used, located in build directory of bundle rather than in that of the component
+        cache_files = glob.glob(os.path.join(app.builddir, 'config.cache.*'))
+        self.assertEqual(len(cache_files), 1)
+        self.assertEqual(glob.glob(os.path.join(comps_builddir, '*', '*config.cache*')), [])
+        # private copies of the cache file that were used by configure are moved into place
+        self.assertEqual(glob.glob(os.path.join(app.builddir, '.config.cache.*')), [])
+        self.assertEqual(read_file(cache_files[0]), "ac_cv_func_foo=${ac_cv_func_foo=yes}\n"
+                                                    "ac_cv_func_bar=${ac_cv_func_bar=yes}\n")
+        # second component sees entry added to cache file when first component was configured
+        regex = re.compile(r"^.* bar --cache-file=.*\n    ac_cv_func_foo=\$\{ac_cv_func_foo=yes\}$", re.M)
+        self.assertTrue(regex.search(read_file(configure_log)), read_file(configure_log))
+
+
+def suite():
+    """Return all tests for the Bundle easyblock."""
+    init_config()
+    return TestLoader().loadTestsFromTestCase(BundleTest)
+
+
+if __name__ == '__main__':
+    main()
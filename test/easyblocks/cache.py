@@ -0,0 +1,215 @@
+##
+# Copyright 2018-2018 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+##
+"""
+Unit tests for caching support for easyblocks (easybuild.easyblocks.tools.cache).
+"""
+import os
+import shutil
+import stat
+import tempfile
+from unittest import TestLoader, main
+from vsc.utils.testing import EnhancedTestCase
+
+import easybuild.easyblocks.tools.cache as cache
+from easybuild.easyblocks.tools.cache import CACHE_SUBDIR, det_cache_dir, evict_lru, lookup_cached_files
+from easybuild.easyblocks.tools.cache import read_json_cache, setup_ccache, store_cached_files, update_json_cache
+from easybuild.easyblocks.tools.cache import write_json_cache
+from easybuild.tools import config
+from easybuild.tools.build_log import EasyBuildError
+
+
+class CacheTest(EnhancedTestCase):
+    """Tests for easybuild.easyblocks.tools.cache."""
+
+    def setUp(self):
+        """Test setup."""
+        super(CacheTest, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.orig_environ = dict(os.environ)
+        self.orig_build_path = cache.build_path
+
+    def tearDown(self):
+        """Test cleanup."""
+        super(CacheTest, self).tearDown()
+        cache.build_path = self.orig_build_path
+        os.environ.clear()
+        os.environ.update(self.orig_environ)
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, path, txt):
+        """Write specified text to file at specified path."""
+        handle = open(path, 'w')
+        handle.write(txt)
+        handle.close()
+
+    def test_det_cache_dir(self):
+        """Test det_cache_dir function."""
+        # cache directory is located in configured build path
+        cache.build_path = lambda: os.path.join(self.tmpdir, 'build')
+        self.assertEqual(det_cache_dir(), os.path.join(self.tmpdir, 'build', CACHE_SUBDIR))
+        res = det_cache_dir('foo', 'bar')
+        self.assertEqual(res, os.path.join(self.tmpdir, 'build', CACHE_SUBDIR, 'foo', 'bar'))
+        self.assertTrue(os.path.isdir(res))
+
+        # environment is not taken into account
+        os.environ['XDG_CACHE_HOME'] = os.path.join(self.tmpdir, 'xdg')
+        self.assertEqual(det_cache_dir('foo'), os.path.join(self.tmpdir, 'build', CACHE_SUBDIR, 'foo'))
+
+    def test_json_cache(self):
+        """Test reading/writing/updating JSON cache files."""
+        path = os.path.join(self.tmpdir, 'cache.json')
+        self.assertEqual(read_json_cache(path), {})
+
+        write_json_cache(path, {'foo': [1, 2], 'bar': {'baz': 'test'}})
+        self.assertEqual(read_json_cache(path), {'foo': [1, 2], 'bar': {'baz': 'test'}})
+
+        update_json_cache(path, 'foo', 'updated')
+        update_json_cache(path, 'new', 3)
+        self.assertEqual(read_json_cache(path), {'foo': 'updated', 'bar': {'baz': 'test'}, 'new': 3})
+
+        # cache file is moved into place, so no temporary files are left behind
+        self.assertEqual(os.listdir(self.tmpdir), ['cache.json'])
+
+        # corrupt cache files, or cache files with unexpected contents, are ignored
+        for txt in ['{"foo": ', '[1, 2, 3]', 'this is not JSON']:
+            self.write(path, txt)
+            self.assertEqual(read_json_cache(path), {})
+
+        # updating a corrupt cache starts from scratch
+        update_json_cache(path, 'foo', 'bar')
+        self.assertEqual(read_json_cache(path), {'foo': 'bar'})
+
+        # failing to write a cache file is an error, but failing to update a cache is not
+        cache_path = os.path.join(self.tmpdir, 'nosuchdir', 'cache.json')
+        self.assertErrorRegex(EasyBuildError, "Failed to write cache file", write_json_cache, cache_path, {})
+        update_json_cache(cache_path, 'foo', 'bar')
+        self.assertFalse(os.path.exists(cache_path))
+
+    def test_cached_files(self):
+        """Test storing/looking up cached files."""
+        cache_dir = os.path.join(self.tmpdir, 'cache')
+        os.mkdir(cache_dir)
+
+        self.assertEqual(lookup_cached_files(cache_dir, 'foo'), None)
+
+        paths = []
+        for fn in ['one.txt', 'two.txt']:
+            paths.append(os.path.join(self.tmpdir, fn))
+            self.write(paths[-1], fn)
+
+        res = store_cached_files(cache_dir, 'foo', paths)
+        expected = [os.path.join(cache_dir, 'foo', fn) for fn in ['one.txt', 'two.txt']]
+        self.assertEqual(res, expected)
+        self.assertEqual(lookup_cached_files(cache_dir, 'foo'), expected)
+        self.assertEqual(open(expected[1]).read(), 'two.txt')
+
+        # existing cache entry is retained
+        self.write(paths[0], 'changed')
+        self.assertEqual(store_cached_files(cache_dir, 'foo', paths[:1]), expected)
+        self.assertEqual(open(expected[0]).read(), 'one.txt')
+
+        # no temporary directories are left behind
+        self.assertEqual(os.listdir(cache_dir), ['foo'])
+
+        # looking up a cache entry marks it as being used
+        os.utime(os.path.join(cache_dir, 'foo'), (0, 0))
+        lookup_cached_files(cache_dir, 'foo')
+        self.assertTrue(os.path.getmtime(os.path.join(cache_dir, 'foo')) > 0)
+
+        # failing to store files in cache results in an error, no partial cache entry is left behind
+        self.assertErrorRegex(EasyBuildError, "Failed to store", store_cached_files, cache_dir, 'bar',
+                              [os.path.join(self.tmpdir, 'nosuchfile.txt')])
+        self.assertEqual(lookup_cached_files(cache_dir, 'bar'), None)
+
+    def test_evict_lru(self):
+        """Test evicting least recently used cache entries."""
+        cache_dir = os.path.join(self.tmpdir, 'cache')
+        os.mkdir(cache_dir)
+
+        path = os.path.join(self.tmpdir, 'data.txt')
+        self.write(path, 'x' * 100)
+        for idx, key in enumerate(['one', 'two', 'three', 'four']):
+            store_cached_files(cache_dir, key, [path])
+            os.utime(os.path.join(cache_dir, key), (idx * 100, idx * 100))
+
+        # temporary directories and files are ignored
+        os.mkdir(os.path.join(cache_dir, '.five.tmp'))
+        self.write(os.path.join(cache_dir, 'somefile.txt'), 'x' * 1000)
+
+        # nothing is evicted when total size is below maximum size
+        self.assertEqual(evict_lru(cache_dir, 400), [])
+        self.assertEqual(sorted(os.listdir(cache_dir)), ['.five.tmp', 'four', 'one', 'somefile.txt', 'three', 'two'])
+
+        # least recently used entries are evicted first
+        lookup_cached_files(cache_dir, 'one')
+        self.assertEqual(evict_lru(cache_dir, 250), ['two', 'three'])
+        self.assertEqual(sorted(os.listdir(cache_dir)), ['.five.tmp', 'four', 'one', 'somefile.txt'])
+
+        self.assertEqual(evict_lru(cache_dir, 0), ['four', 'one'])
+        self.assertEqual(sorted(os.listdir(cache_dir)), ['.five.tmp', 'somefile.txt'])
+
+    def test_setup_ccache(self):
+        """Test setup_ccache function."""
+        # use fake ccache command, which keeps track of how it was called
+        bindir = os.path.join(self.tmpdir, 'bin')
+        os.mkdir(bindir)
+        ccache = os.path.join(bindir, 'ccache')
+        ccache_log = os.path.join(self.tmpdir, 'ccache.log')
+        self.write(ccache, '#!/bin/bash\necho "$CCACHE_DIR $@" >> %s\n' % ccache_log)
+        os.chmod(ccache, stat.S_IRUSR | stat.S_IWUSR | stat.S_IXUSR)
+
+        # no ccache available
+        os.environ['PATH'] = self.tmpdir
+        self.assertEqual(setup_ccache(), (None, ''))
+        os.environ['PATH'] = os.pathsep.join([bindir, self.orig_environ.get('PATH', '')])
+
+        # ccache configuration is passed via a prefix for commands, environment is left untouched
+        ccache_dir = os.path.join(self.tmpdir, 'ccache')
+        (ccache_cmd, ccache_env) = setup_ccache(ccache_dir=ccache_dir, basedir='/tmp')
+        self.assertEqual(os.path.realpath(ccache_cmd), ccache)
+        self.assertEqual(ccache_env, "export CCACHE_DIR='%s' CCACHE_BASEDIR='/tmp' && " % ccache_dir)
+        self.assertFalse('CCACHE_DIR' in os.environ)
+        self.assertFalse('CCACHE_BASEDIR' in os.environ)
+        self.assertFalse(os.path.exists(ccache_log))
+
+        # maximum size is only set once per ccache directory
+        cache._ccache_max_sizes.clear()
+        for _ in range(3):
+            setup_ccache(ccache_dir=ccache_dir, max_size=1024)
+        setup_ccache(ccache_dir=ccache_dir, max_size=2048)
+        setup_ccache(ccache_dir=ccache_dir + '2', max_size=2048)
+        expected = "%(dir)s -M 1024M\n%(dir)s -M 2048M\n%(dir)s2 -M 2048M\n" % {'dir': ccache_dir}
+        self.assertEqual(open(ccache_log).read(), expected)
+
+
+def suite():
+    """Return all tests for easybuild.easyblocks.tools.cache."""
+    # initialize build options (required for e.g. run_cmd)
+    config.init_build_options(build_options={'silent': True})
+    return TestLoader().loadTestsFromTestCase(CacheTest)
+
+
+if __name__ == '__main__':
+    main()
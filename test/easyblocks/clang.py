@@ -0,0 +1,73 @@
+##
+# Copyright 2018-2018 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+##
+"""
+Unit tests for the Clang easyblock (easybuild.easyblocks.clang).
+"""
+import os
+from unittest import TestLoader, main
+
+import easybuild.easyblocks.tools.memory as memory
+from easybuild.tools.filetools import mkdir, read_file, write_file
+from test.easyblocks.utilities import EasyblockTestCase, init_config, write_script
+
+
+class ClangTest(EasyblockTestCase):
+    """Tests for the Clang easyblock (easybuild.easyblocks.clang)."""
+
+    def test_clang_memory_aware_parallelism(self):
+        """Test limiting parallelism based on available memory in EB_Clang, for all stages."""
+        bindir = os.path.join(self.tmpdir, 'fake_bin')
+        cmds_log = os.path.join(self.tmpdir, 'cmds.log')
+        mkdir(bindir, parents=True)
+        write_file(cmds_log, '')
+        for cmd in ['cmake', 'make']:
+            write_script(os.path.join(bindir, cmd), 'echo "$(basename $0) $@" >> %s' % cmds_log)
+        os.environ['PATH'] = os.pathsep.join([bindir, os.getenv('PATH', '')])
+        os.environ['EBROOTGCC'] = os.path.join(self.tmpdir, 'gcc')
+
+        orig_det_available_memory = memory.det_available_memory
+        memory.det_available_memory = lambda: 8000
+        try:
+            app = self.init_easyblock('EB_Clang', name='Clang', version='3.2', extratxt="parallel = 16")
+            app.llvm_src_dir = os.path.join(self.tmpdir, 'llvm')
+            app.configure_step()
+            app.build_step()
+        finally:
+            memory.det_available_memory = orig_det_available_memory
+
+        # 8000 MiB available, 2048 MiB per job (default) => 3 jobs, also for stage 1 (built with CMakeMake)
+        self.assertEqual(app.cfg['parallel'], 3)
+        self.assertEqual(app.make_parallel_opts, '-j 3')
+        self.assertEqual(read_file(cmds_log).splitlines()[-1], 'make -j 3')
+
+
+def suite():
+    """Return all tests for the Clang easyblock."""
+    init_config()
+    return TestLoader().loadTestsFromTestCase(ClangTest)
+
+
+if __name__ == '__main__':
+    main()
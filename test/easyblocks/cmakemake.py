@@ -0,0 +1,97 @@
+##
+# Copyright 2018-2018 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+##
+"""
+Unit tests for the CMakeMake easyblock (easybuild.easyblocks.generic.cmakemake).
+"""
+import os
+from unittest import TestLoader, main
+
+from easybuild.tools.filetools import mkdir, read_file, write_file
+from test.easyblocks.utilities import EasyblockTestCase, init_config, write_script
+
+
+class CMakeMakeTest(EasyblockTestCase):
+    """Tests for the CMakeMake easyblock (easybuild.easyblocks.generic.cmakemake)."""
+
+    def test_cmakemake_ninja(self):
+        """Test building, testing and installing with Ninja generator in CMakeMake and EB_Clang."""
+        bindir = os.path.join(self.tmpdir, 'fake_bin')
+        cmds_log = os.path.join(self.tmpdir, 'cmds.log')
+        mkdir(bindir, parents=True)
+        write_file(cmds_log, '')
+        for cmd in ['cmake', 'make', 'ninja']:
+            txt = 'echo "CTEST_PARALLEL_LEVEL=$CTEST_PARALLEL_LEVEL $(basename $0) $@" >> %s' % cmds_log
+            write_script(os.path.join(bindir, cmd), txt)
+        os.environ['PATH'] = os.pathsep.join([bindir, os.getenv('PATH', '')])
+        if 'CTEST_PARALLEL_LEVEL' in os.environ:
+            del os.environ['CTEST_PARALLEL_LEVEL']
+
+        app = self.init_easyblock('CMakeMake', extratxt="runtest = 'test'\nparallel = 3\nparallel_test = True")
+        app.test_step()
+        app.cfg['generator'] = 'Ninja'
+        app.test_step()
+        app.cfg['parallel_test'] = False
+        app.test_step()
+
+        # $CTEST_PARALLEL_LEVEL is only set for the test command when tests are run in parallel
+        expected = [
+            "CTEST_PARALLEL_LEVEL=3 make -j 3 test",
+            "CTEST_PARALLEL_LEVEL=3 ninja -j 3 test",
+            "CTEST_PARALLEL_LEVEL= ninja -j 1 test",
+        ]
+        self.assertEqual(read_file(cmds_log).splitlines(), expected)
+        self.assertFalse('CTEST_PARALLEL_LEVEL' in os.environ)
+
+        # stages 2 and 3 of Clang are also configured for & built with Ninja, as are the tests
+        app = self.init_easyblock('EB_Clang', name='Clang', version='6.0.1', extratxt="generator = 'Ninja'")
+        app.llvm_src_dir = os.path.join(self.tmpdir, 'llvm')
+        app.make_parallel_opts = '-j 4'
+        write_file(cmds_log, '')
+        app.build_with_prev_stage(os.path.join(self.tmpdir, 'obj1'), os.path.join(self.tmpdir, 'obj2'))
+        app.run_clang_tests(os.path.join(self.tmpdir, 'obj2'))
+        cmds = read_file(cmds_log).splitlines()
+        self.assertEqual(len(cmds), 3)
+        self.assertTrue(' -G Ninja ' in cmds[0])
+        self.assertTrue(' -DCMAKE_JOB_POOL_LINK=link_pool ' in cmds[0])
+        expected = ["CTEST_PARALLEL_LEVEL= ninja -v -j 4", "CTEST_PARALLEL_LEVEL= ninja -v -j 4 check-all"]
+        self.assertEqual(cmds[1:], expected)
+
+        app.cfg['generator'] = None
+        write_file(cmds_log, '')
+        app.build_with_prev_stage(os.path.join(self.tmpdir, 'obj1'), os.path.join(self.tmpdir, 'obj2'))
+        app.run_clang_tests(os.path.join(self.tmpdir, 'obj2'))
+        cmds = read_file(cmds_log).splitlines()
+        self.assertFalse('-G Ninja' in cmds[0])
+        self.assertEqual(cmds[1:], ["CTEST_PARALLEL_LEVEL= make -j 4", "CTEST_PARALLEL_LEVEL= make -j 4 check-all"])
+
+
+def suite():
+    """Return all tests for the CMakeMake easyblock."""
+    init_config()
+    return TestLoader().loadTestsFromTestCase(CMakeMakeTest)
+
+
+if __name__ == '__main__':
+    main()
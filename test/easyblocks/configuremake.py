@@ -0,0 +1,293 @@
+##
+# Copyright 2018-2018 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+##
+"""
+Unit tests for the ConfigureMake easyblock (easybuild.easyblocks.generic.configuremake).
+"""
+import glob
+import os
+import re
+from unittest import TestLoader, main
+from vsc.utils import fancylogger
+from vsc.utils.patterns import Singleton
+
+import easybuild.easyblocks.generic.configuremake as configuremake
+from easybuild.easyblocks.generic.cmakemake import CMakeMake
+from easybuild.easyblocks.generic.configuremake import ConfigureMake, det_build_triplet
+from easybuild.easyblocks.generic.makecp import MakeCp
+from easybuild.easyblocks.tools.cache import read_json_cache
+from easybuild.framework.easyconfig import CUSTOM
+from easybuild.tools import config
+from easybuild.tools.filetools import change_dir, mkdir, read_file, write_file
+from test.easyblocks.utilities import EasyblockTestCase, init_config, write_script
+
+
+class ConfigureMakeTest(EasyblockTestCase):
+    """Tests for the ConfigureMake easyblock (easybuild.easyblocks.generic.configuremake)."""
+
+    def test_configuremake_ccache(self):
+        """Test using ccache as compiler cache in ConfigureMake."""
+        bindir = os.path.join(self.tmpdir, 'fake_ccache_bin')
+        cmds_log = os.path.join(self.tmpdir, 'cmds.log')
+        mkdir(bindir, parents=True)
+        write_script(os.path.join(bindir, 'ccache'), 'echo "CCACHE_DIR=$CCACHE_DIR ccache $@" >> %s' % cmds_log)
+        txt = 'echo "CCACHE_DIR=$CCACHE_DIR CCACHE_BASEDIR=$CCACHE_BASEDIR $(which gcc) make $@" >> %s' % cmds_log
+        write_script(os.path.join(bindir, 'make'), txt)
+        os.environ['PATH'] = os.pathsep.join([bindir, os.getenv('PATH', '')])
+        os.environ['CC'] = 'gcc'
+        for var in ['CCACHE_DIR', 'CCACHE_BASEDIR']:
+            if var in os.environ:
+                del os.environ[var]
+
+        ccache_dir = os.path.join(self.tmpdir, 'ccache')
+        extratxt = "use_ccache = True\nccache_dir = '%s'\nccache_max_size = 0\nparallel = 1" % ccache_dir
+        app = self.init_easyblock('ConfigureMake', extratxt=extratxt)
+        app.build_step()
+
+        # ccache configuration is only passed to the build command, and compiler commands are wrapped with ccache
+        make_cmds = [line for line in read_file(cmds_log).splitlines() if ' make ' in line]
+        wrapper = os.path.join(app.builddir, 'easybuild_ccache', 'gcc')
+        expected = "CCACHE_DIR=%s CCACHE_BASEDIR=%s %s make -j 1" % (ccache_dir, app.builddir, wrapper)
+        self.assertEqual(make_cmds, [expected])
+        self.assertTrue("CCACHE_DIR=%s ccache -s" % ccache_dir in read_file(cmds_log).splitlines())
+        self.assertFalse('CCACHE_DIR' in os.environ)
+        self.assertFalse('CCACHE_BASEDIR' in os.environ)
+
+    def test_configuremake_parallel_test_install(self):
+        """Test running tests and installation in parallel in ConfigureMake."""
+        cmds_log = self.setup_fake_cmds(['make'])
+
+        # tests and installation are not run in parallel by default, for all easyblocks that derive from ConfigureMake
+        for easyblock in [ConfigureMake, CMakeMake, MakeCp]:
+            for param in ['parallel_install', 'parallel_test']:
+                self.assertEqual(easyblock.extra_options()[param][0], False)
+
+        app = self.init_easyblock('ConfigureMake', extratxt="runtest = 'check'\nparallel = 3")
+        app.test_step()
+        app.install_step()
+        make_cmds = [line.split(' ', 2)[2] for line in read_file(cmds_log).splitlines()]
+        self.assertEqual(make_cmds, ["make check", "make install"])
+
+        # running tests and installation in parallel can be enabled in easyconfig
+        write_file(cmds_log, '')
+        extratxt = "runtest = 'check'\nparallel = 3\nparallel_install = True\nparallel_test = True"
+        app = self.init_easyblock('ConfigureMake', extratxt=extratxt)
+        app.test_step()
+        app.install_step()
+        make_cmds = [line.split(' ', 2)[2] for line in read_file(cmds_log).splitlines()]
+        self.assertEqual(make_cmds, ["make -j 3 check", "make -j 3 install"])
+
+        # nothing is run in parallel if 'parallel' is not set
+        write_file(cmds_log, '')
+        app.cfg['parallel'] = None
+        app.install_step()
+        self.assertEqual([line.split(' ', 2)[2] for line in read_file(cmds_log).splitlines()], ["make install"])
+
+        # easyblocks that derive from ConfigureMake can specify a different default
+        class ParallelInstall(ConfigureMake):
+            """Easyblock for software with an install target that is parallel-safe."""
+            @staticmethod
+            def extra_options():
+                extra_vars = {
+                    'parallel_install': [True, "Run 'make install' in parallel", CUSTOM],
+                }
+                return ConfigureMake.extra_options(extra_vars)
+
+        self.assertEqual(ParallelInstall.extra_options()['parallel_install'][0], True)
+        self.assertEqual(ParallelInstall.extra_options()['parallel_test'][0], False)
+
+    def test_configuremake_sanitize_configure_cache(self):
+        """Test sanitizing autoconf cache file, so it can be shared across configure runs."""
+        builddir = os.path.join(self.tmpdir, 'build')
+        cache_file = os.path.join(self.tmpdir, 'config.cache')
+        write_file(cache_file, '\n'.join([
+            "# This file is a shell script that caches the results of configure tests run on this system",
+            "ac_cv_env_CC_set=set",
+            "ac_cv_env_CC_value=gcc",
+            "ac_cv_path_SED=${ac_cv_path_SED=/usr/bin/sed}",
+            "test \"${ac_cv_path_install+set}\" = set || ac_cv_path_install='/usr/bin/install -c'",
+            "ac_cv_prog_AWK=${ac_cv_prog_AWK=gawk}",
+            "am_cv_CC_dependencies_compiler_type=${am_cv_CC_dependencies_compiler_type=gcc3}",
+            "pkg_cv_ZLIB_CFLAGS=${pkg_cv_ZLIB_CFLAGS=-I/apps/zlib/include}",
+            "lt_cv_path_LD=${lt_cv_path_LD=/usr/bin/ld}",
+            "ac_cv_c_compiler_gnu=${ac_cv_c_compiler_gnu=yes}",
+            "ac_cv_func_malloc=${ac_cv_func_malloc=yes}",
+            "ac_cv_func_foo=${ac_cv_func_foo=no}",
+            "ac_cv_header_zlib_h=${ac_cv_header_zlib_h='no'}",
+            "ac_cv_lib_z_deflate=${ac_cv_lib_z_deflate=yes}",
+            "ac_cv_search_clock_gettime=${ac_cv_search_clock_gettime=no}",
+            "ac_cv_sizeof_long=${ac_cv_sizeof_long=8}",
+            "gl_cv_srcdir=${gl_cv_srcdir=%s/foo-1.0/lib}" % builddir,
+            "",
+        ]))
+        removed = configuremake.sanitize_configure_cache(cache_file, unsafe_strings=[builddir])
+
+        # environment of configure run, locations of commands, pkg-config results, negative results of checks
+        # and entries that refer to the build directory are removed
+        expected_removed = ['ac_cv_env_CC_set', 'ac_cv_env_CC_value', 'ac_cv_path_SED', 'ac_cv_path_install',
+                            'ac_cv_prog_AWK', 'am_cv_CC_dependencies_compiler_type', 'pkg_cv_ZLIB_CFLAGS',
+                            'lt_cv_path_LD', 'ac_cv_func_foo', 'ac_cv_header_zlib_h', 'ac_cv_search_clock_gettime',
+                            'gl_cv_srcdir']
+        self.assertEqual(removed, expected_removed)
+        self.assertEqual(read_file(cache_file), '\n'.join([
+            "# This file is a shell script that caches the results of configure tests run on this system",
+            "ac_cv_c_compiler_gnu=${ac_cv_c_compiler_gnu=yes}",
+            "ac_cv_func_malloc=${ac_cv_func_malloc=yes}",
+            "ac_cv_lib_z_deflate=${ac_cv_lib_z_deflate=yes}",
+            "ac_cv_sizeof_long=${ac_cv_sizeof_long=8}",
+            "",
+        ]))
+
+        # sanitizing again doesn't change anything
+        self.assertEqual(configuremake.sanitize_configure_cache(cache_file, unsafe_strings=[builddir]), [])
+
+    def test_configuremake_det_configure_cache_file(self):
+        """Test determining location of shared autoconf cache file."""
+        bindir = os.path.join(self.tmpdir, 'fake_gcc_bin')
+        gcc = os.path.join(bindir, 'gcc')
+        write_script(gcc, 'echo gcc')
+        os.environ['PATH'] = os.pathsep.join([bindir, os.getenv('PATH', '')])
+        os.environ['CC'] = 'gcc -std=c99'
+        os.environ['CFLAGS'] = '-O2'
+
+        app = self.init_easyblock('ConfigureMake', extratxt="configure_cache = True")
+        cache_file = app.det_configure_cache_file()
+        self.assertEqual(os.path.dirname(cache_file), app.builddir)
+        self.assertTrue(os.path.basename(cache_file).startswith('config.cache.'))
+        self.assertEqual(app.det_configure_cache_file(), cache_file)
+
+        # fingerprint changes when compiler flags change
+        os.environ['CFLAGS'] = '-O3'
+        self.assertNotEqual(app.det_configure_cache_file(), cache_file)
+        os.environ['CFLAGS'] = '-O2'
+        self.assertEqual(app.det_configure_cache_file(), cache_file)
+
+        # fingerprint changes when compiler is updated (timestamp changes)
+        mtime = os.stat(gcc).st_mtime
+        os.utime(gcc, (mtime + 10, mtime + 10))
+        updated_cache_file = app.det_configure_cache_file()
+        self.assertNotEqual(updated_cache_file, cache_file)
+
+        # fingerprint changes when another compiler command (at a different location) is picked up
+        other_bindir = os.path.join(self.tmpdir, 'other_gcc_bin')
+        write_script(os.path.join(other_bindir, 'gcc'), 'echo gcc')
+        os.utime(os.path.join(other_bindir, 'gcc'), (mtime + 10, mtime + 10))
+        os.environ['PATH'] = os.pathsep.join([other_bindir, os.getenv('PATH', '')])
+        self.assertFalse(app.det_configure_cache_file() in [cache_file, updated_cache_file])
+
+        # location of cache file can be changed (e.g. to share it across components of a bundle)
+        app.configure_cache_dir = self.tmpdir
+        self.assertEqual(os.path.dirname(app.det_configure_cache_file()), self.tmpdir)
+
+    def test_configuremake_configure_cache(self):
+        """Test use of shared autoconf cache file in configure step."""
+        srcdir = os.path.join(self.tmpdir, 'src')
+        configure_log = self.setup_fake_configure(srcdir)
+
+        def configure(configopts):
+            """Run configure step with specified configure options & shared autoconf cache file enabled."""
+            change_dir(srcdir)
+            extratxt = "configure_cache = True\nconfigopts = '%s'" % configopts
+            app = self.init_easyblock('ConfigureMake', extratxt=extratxt)
+            # warnings are printed for (fake) config.guess script, since its version & checksum do not match
+            self.mock_stderr(True)
+            app.configure_step()
+            self.mock_stderr(False)
+            return app
+
+        app = configure('foo')
+        cache_file = app.det_configure_cache_file()
+        app = configure('bar')
+        self.assertEqual(app.det_configure_cache_file(), cache_file)
+
+        # configure is run with a (private copy of) the shared cache file, which includes the results of earlier runs;
+        # entries that refer to the source directory are removed from the cache file
+        regex = re.compile(r"^.* foo --cache-file=%s/\.config\.cache\.\w+\.\w+$" % app.builddir, re.M)
+        self.assertTrue(regex.search(read_file(configure_log)), read_file(configure_log))
+        regex = re.compile(r"^.* bar --cache-file=.*\n    ac_cv_func_foo=\$\{ac_cv_func_foo=yes\}$", re.M)
+        self.assertTrue(regex.search(read_file(configure_log)), read_file(configure_log))
+        self.assertFalse('ac_cv_srcdir' in read_file(configure_log))
+        self.assertEqual(read_file(cache_file), "ac_cv_func_foo=${ac_cv_func_foo=yes}\n"
+                                                "ac_cv_func_bar=${ac_cv_func_bar=yes}\n")
+        self.assertEqual(glob.glob(os.path.join(app.builddir, '.config.cache.*')), [])
+
+        # if configure fails with the shared cache file, it's run again without it, and the cache file is removed
+        write_file(configure_log, '')
+        write_file(cache_file, "ac_cv_broken=${ac_cv_broken=yes}\n", append=True)
+        app = configure('baz')
+        cmds = [line for line in read_file(configure_log).splitlines() if not line.startswith(' ')]
+        self.assertEqual(len(cmds), 2)
+        self.assertTrue(' baz --cache-file=' in cmds[0])
+        self.assertTrue(cmds[1].endswith(' baz'))
+        self.assertFalse(os.path.exists(cache_file))
+        self.assertEqual(glob.glob(os.path.join(app.builddir, '*config.cache*')), [])
+
+    def test_configuremake_det_build_triplet(self):
+        """Test determining (and caching) build triplet via config.guess."""
+        log = fancylogger.getLogger('det_build_triplet', fname=False)
+        config_guess = os.path.join(self.tmpdir, 'config.guess')
+        config_guess_log = os.path.join(self.tmpdir, 'config_guess.log')
+        write_script(config_guess, 'echo run >> %s\necho x86_64-pc-linux-gnu' % config_guess_log)
+
+        # config.guess is only run once, result is cached in memory and on disk
+        for _ in range(2):
+            self.assertEqual(det_build_triplet(config_guess, log), 'x86_64-pc-linux-gnu')
+        configuremake._config_guess_cache['triplets'].clear()
+        self.assertEqual(det_build_triplet(config_guess, log), 'x86_64-pc-linux-gnu')
+        self.assertEqual(read_file(config_guess_log), 'run\n')
+        cached = read_json_cache(os.path.join(self.cache_dir, 'config_guess', 'triplets.json'))
+        self.assertEqual(cached.values(), ['x86_64-pc-linux-gnu'])
+        # C library is taken into account in cache key
+        self.assertTrue(cached.keys()[0].endswith(configuremake.det_libc_version()))
+
+        # failures or empty output are never cached
+        for txt in ['exit 1', 'echo']:
+            write_file(config_guess_log, '')
+            write_script(config_guess, 'echo run >> %s\n%s' % (config_guess_log, txt))
+            for _ in range(2):
+                self.assertEqual(det_build_triplet(config_guess, log), None)
+            self.assertEqual(read_file(config_guess_log), 'run\nrun\n')
+
+        # config.guess is also run in dry run mode
+        write_script(config_guess, 'echo x86_64-unknown-linux-gnu')
+        build_options = dict(config.BuildOptions())
+        try:
+            del Singleton._instances[config.BuildOptions]
+            config.init_build_options(build_options=dict(build_options, extended_dry_run=True))
+            self.mock_stdout(True)
+            self.assertEqual(det_build_triplet(config_guess, log), 'x86_64-unknown-linux-gnu')
+            self.mock_stdout(False)
+        finally:
+            del Singleton._instances[config.BuildOptions]
+            config.init_build_options(build_options=build_options)
+
+
+def suite():
+    """Return all tests for the ConfigureMake easyblock."""
+    init_config()
+    return TestLoader().loadTestsFromTestCase(ConfigureMakeTest)
+
+
+if __name__ == '__main__':
+    main()
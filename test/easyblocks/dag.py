@@ -0,0 +1,270 @@
+##
+# Copyright 2018-2018 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+##
+"""
+Unit tests for running jobs concurrently while respecting dependencies between them (easybuild.easyblocks.tools.dag).
+"""
+import multiprocessing
+import multiprocessing.queues
+import multiprocessing.util
+import os
+import Queue
+import threading
+import time
+from unittest import TestLoader, main
+from vsc.utils.testing import EnhancedTestCase
+
+from easybuild.easyblocks.tools.dag import check_dag, det_critical_path, det_dag_width, run_dag
+from easybuild.tools.build_log import EasyBuildError
+
+
+class DAGTest(EnhancedTestCase):
+    """Tests for easybuild.easyblocks.tools.dag."""
+
+    def test_check_dag(self):
+        """Test check_dag function."""
+        # these should not raise an error
+        check_dag([], {})
+        check_dag(['a', 'b', 'c'], {})
+        check_dag(['a', 'b', 'c', 'd'], {'b': ['a'], 'c': ['a'], 'd': ['b', 'c']})
+
+        self.assertErrorRegex(EasyBuildError, "Unknown dependency x for b", check_dag, ['a', 'b'], {'b': ['x']})
+        self.assertErrorRegex(EasyBuildError, "Cyclic dependency detected: a -> a", check_dag, ['a'], {'a': ['a']})
+        deps = {'a': ['c'], 'b': ['a'], 'c': ['b']}
+        self.assertErrorRegex(EasyBuildError, "Cyclic dependency detected: a -> c -> b -> a",
+                              check_dag, ['a', 'b', 'c'], deps)
+
+    def test_run_dag(self):
+        """Test run_dag function."""
+        nodes = ['a', 'b', 'c', 'd']
+        deps = {'b': ['a'], 'c': ['a'], 'd': ['b', 'c']}
+        started, lock = [], threading.Lock()
+
+        def run_job(node):
+            """Run job for specified node."""
+            with lock:
+                started.append(node)
+            return node.upper()
+
+        res = run_dag(nodes, deps, run_job, 2)
+        self.assertEqual(res['results'], {'a': 'A', 'b': 'B', 'c': 'C', 'd': 'D'})
+        self.assertEqual(res['errors'], {})
+        self.assertEqual(res['skipped'], [])
+        self.assertEqual(sorted(res['timings'].keys()), nodes)
+        # jobs are only started once all dependencies have completed
+        self.assertEqual(started[0], 'a')
+        self.assertEqual(started[-1], 'd')
+        for node in nodes:
+            for dep in deps.get(node, []):
+                self.assertTrue(res['timings'][dep][1] <= res['timings'][node][0])
+
+        # cyclic dependencies are detected before any job is started
+        started[:] = []
+        cyclic_deps = {'a': ['d'], 'd': ['a']}
+        self.assertErrorRegex(EasyBuildError, "Cyclic dependency", run_dag, nodes, cyclic_deps, run_job, 2)
+        self.assertEqual(started, [])
+
+    def test_run_dag_max_jobs(self):
+        """Test whether run_dag respects maximum number of jobs running concurrently."""
+        state = {'running': 0, 'max': 0}
+        lock = threading.Lock()
+
+        def run_job(node):
+            """Run job for specified node, keeping track of number of concurrently running jobs."""
+            with lock:
+                state['running'] += 1
+                state['max'] = max(state['max'], state['running'])
+            time.sleep(0.1)
+            with lock:
+                state['running'] -= 1
+
+        nodes = [str(x) for x in range(6)]
+        res = run_dag(nodes, {}, run_job, 2)
+        self.assertEqual(sorted(res['results'].keys()), nodes)
+        self.assertEqual(state['max'], 2)
+
+        # number of jobs is at least 1
+        state['max'] = 0
+        res = run_dag(nodes, {}, run_job, 0)
+        self.assertEqual(sorted(res['results'].keys()), nodes)
+        self.assertEqual(state['max'], 1)
+
+    def test_run_dag_failures(self):
+        """Test whether failing jobs are handled correctly by run_dag."""
+        nodes = ['a', 'b', 'c', 'd', 'e']
+        deps = {'b': ['a'], 'c': ['b'], 'd': ['a'], 'e': []}
+
+        def run_job(node):
+            """Run job for specified node, which fails for 'b'."""
+            if node == 'b':
+                raise EasyBuildError("oops")
+            return node
+
+        res = run_dag(nodes, deps, run_job, 3)
+        self.assertEqual(sorted(res['results'].keys()), ['a', 'd', 'e'])
+        self.assertEqual(res['errors'].keys(), ['b'])
+        self.assertTrue(isinstance(res['errors']['b'], EasyBuildError))
+        # nodes that (indirectly) depend on a failed node are skipped
+        self.assertEqual(res['skipped'], ['c'])
+        self.assertFalse('c' in res['timings'])
+
+        # job_done is called for every successful job, and can mark a job as failed
+        done = []
+
+        def job_done(node, result):
+            """Keep track of completed jobs, and consider job for 'd' as failed."""
+            done.append((node, result))
+            return node != 'd'
+
+        res = run_dag(['a', 'd', 'e'], {'d': ['a'], 'e': ['d']}, lambda node: node * 2, 2, job_done=job_done)
+        self.assertEqual(sorted(done), [('a', 'aa'), ('d', 'dd')])
+        self.assertEqual(res['results'], {'a': 'aa'})
+        self.assertTrue(isinstance(res['errors']['d'], EasyBuildError))
+        self.assertTrue("Job for d failed" in str(res['errors']['d']))
+        self.assertEqual(res['skipped'], ['e'])
+
+    def test_run_dag_processes(self):
+        """Test run_dag function with jobs running in separate processes."""
+        nodes = ['a', 'b', 'c', 'd']
+        deps = {'b': ['a'], 'c': ['a'], 'd': ['b', 'c']}
+        orig_pwd = os.getcwd()
+
+        def run_job(node):
+            """Run job for specified node, changes to environment are not visible to other jobs."""
+            os.environ['TEST_EB_DAG_NODE'] = node
+            os.chdir('/')
+            if node == 'c':
+                raise EasyBuildError("failed for %s", node)
+            elif node == 'd':
+                os._exit(3)
+            return (node, os.getpid())
+
+        done = []
+        res = run_dag(nodes + ['e'], dict(deps, e=['b']), run_job, 2, job_done=lambda n, r: done.append(n),
+                      processes=True)
+        self.assertEqual(sorted(res['results'].keys()), ['a', 'b', 'e'])
+        self.assertEqual(sorted(done), ['a', 'b', 'e'])
+        # each job runs in a separate process
+        for node in res['results']:
+            self.assertEqual(res['results'][node][0], node)
+            self.assertNotEqual(res['results'][node][1], os.getpid())
+        # errors are reported as strings
+        self.assertEqual(res['errors'], {'c': "failed for c"})
+        self.assertEqual(res['skipped'], ['d'])
+        self.assertFalse('TEST_EB_DAG_NODE' in os.environ)
+        self.assertEqual(os.getcwd(), orig_pwd)
+
+        # processes that die without reporting back are detected
+        res = run_dag(['d'], {}, run_job, 1, processes=True)
+        self.assertEqual(res['results'], {})
+        self.assertEqual(res['errors'], {'d': "Process for d exited with exit code 3"})
+
+    def test_run_dag_processes_late_result(self):
+        """Test run_dag function for process that exits with non-zero exit code after reporting back."""
+
+        class DelayedQueue(multiprocessing.queues.Queue):
+            """Queue for which first get with a timeout times out, as if results were not available yet."""
+            def __init__(self, *args, **kwargs):
+                super(DelayedQueue, self).__init__(*args, **kwargs)
+                self.timeouts = 1
+
+            def get(self, block=True, timeout=None):
+                if timeout is not None and self.timeouts:
+                    self.timeouts -= 1
+                    time.sleep(timeout)
+                    raise Queue.Empty
+                return super(DelayedQueue, self).get(block=block, timeout=timeout)
+
+        def run_job(node):
+            """Run job for specified node, process for 'a' exits with non-zero exit code after reporting back."""
+            if node == 'a':
+                # runs after result was flushed to queue (cfr. exit priority of -5 for joining queue feeder thread)
+                multiprocessing.util.Finalize(None, os._exit, args=(1,), exitpriority=-10)
+            else:
+                time.sleep(2)
+            return node
+
+        orig_queue = multiprocessing.Queue
+        multiprocessing.Queue = DelayedQueue
+        try:
+            res = run_dag(['a', 'b'], {}, run_job, 2, processes=True)
+        finally:
+            multiprocessing.Queue = orig_queue
+
+        # job for 'a' is only reported once (as failed, since result was not available when exit code was checked)
+        self.assertEqual(res['results'], {'b': 'b'})
+        self.assertEqual(res['errors'], {'a': "Process for a exited with exit code 1"})
+
+    def test_det_critical_path(self):
+        """Test det_critical_path function."""
+        self.assertEqual(det_critical_path({}, {}), ([], 0))
+
+        # 'd' can only start when both 'b' and 'c' are done, so 'c' is not on the critical path
+        deps = {'b': ['a'], 'c': ['a'], 'd': ['b', 'c']}
+        timings = {
+            'a': (0, 1),
+            'b': (1, 5),
+            'c': (1, 3),
+            'd': (5, 6),
+        }
+        self.assertEqual(det_critical_path(deps, timings), (['a', 'b', 'd'], 6))
+
+        # independent long-running job can be the critical path by itself
+        timings['e'] = (0, 10)
+        self.assertEqual(det_critical_path(deps, timings), (['e'], 10))
+
+        # nodes without timings (e.g. skipped nodes) are ignored
+        del timings['e']
+        del timings['a']
+        self.assertEqual(det_critical_path(deps, timings), (['b', 'd'], 5))
+
+    def test_det_dag_width(self):
+        """Test det_dag_width function."""
+        self.assertEqual(det_dag_width([], {}), 0)
+        self.assertEqual(det_dag_width(['a', 'b', 'c'], {}), 3)
+        # chain of dependencies
+        self.assertEqual(det_dag_width(['a', 'b', 'c'], {'b': ['a'], 'c': ['b']}), 1)
+        # diamond
+        self.assertEqual(det_dag_width(['a', 'b', 'c', 'd'], {'b': ['a'], 'c': ['a'], 'd': ['b', 'c']}), 2)
+
+        # 'b', 'c' and 'e' can be running at the same time, although 'e' is at another level than 'b' and 'c'
+        nodes = ['a', 'b', 'c', 'd', 'e']
+        deps = {'b': ['a'], 'c': ['a'], 'd': ['a'], 'e': ['d']}
+        self.assertEqual(det_dag_width(nodes, deps), 3)
+
+        # components of a bundle without specified dependencies depend on all preceding components
+        nodes = ['a', 'b', 'c', 'd']
+        self.assertEqual(det_dag_width(nodes, {'b': ['a'], 'c': ['a', 'b'], 'd': ['a', 'b', 'c']}), 1)
+        self.assertEqual(det_dag_width(nodes, {'b': [], 'c': ['a', 'b'], 'd': []}), 3)
+
+        self.assertErrorRegex(EasyBuildError, "Cyclic dependency", det_dag_width, ['a', 'b'], {'a': ['b'], 'b': ['a']})
+
+
+def suite():
+    """Return all tests for easybuild.easyblocks.tools.dag."""
+    return TestLoader().loadTestsFromTestCase(DAGTest)
+
+
+if __name__ == '__main__':
+    main()
@@ -27,8 +27,11 @@ General unit tests for the easybuild-easyblocks repo.
 
 @author: Kenneth Hoste (Ghent University)
 """
+import glob
+import json
 import os
 import shutil
+import sys
 import tempfile
 from unittest import TestLoader, main
 from vsc.utils.testing import EnhancedTestCase
@@ -180,6 +183,186 @@ class GeneralEasyblockTest(EnhancedTestCase):
         # importing EB_R class from easybuild.easyblocks.r still works fine
         run_cmd("python -c 'from easybuild.easyblocks.r import EB_R'")
 
+    def test_easyblocks_index(self):
+        """Test index of easyblocks."""
+        import easybuild.easyblocks
+        from easybuild.easyblocks import build_easyblocks_index, det_easyblock_module, get_easyblocks_index
+        from easybuild.easyblocks import EASYBLOCKS_INDEX_FILENAME, EASYBLOCKS_INDEX_VERSION, EasyblocksIndexImporter
+        from easybuild.easyblocks import write_easyblocks_index
+
+        easyblocks_path = os.path.dirname(easybuild.easyblocks.__file__)
+        index = build_easyblocks_index(easyblocks_path)
+        self.assertEqual(index['index_version'], EASYBLOCKS_INDEX_VERSION)
+        self.assertEqual(index['modules']['gcc'], os.path.join('g', 'gcc.py'))
+        self.assertEqual(index['software']['gamess-us'], 'easybuild.easyblocks.gamess_us')
+        self.assertEqual(index['classes']['EB_GCC'], 'easybuild.easyblocks.gcc')
+        self.assertEqual(index['classes']['PythonPackage'], 'easybuild.easyblocks.generic.pythonpackage')
+        self.assertFalse('pythonpackage' in index['modules'])
+
+        self.assertEqual(det_easyblock_module(software='GCC'), 'easybuild.easyblocks.gcc')
+        self.assertEqual(det_easyblock_module(class_name='EB_R'), 'easybuild.easyblocks.r')
+        self.assertEqual(det_easyblock_module(class_name='Bundle'), 'easybuild.easyblocks.generic.bundle')
+        self.assertEqual(det_easyblock_module(software='nosuchsoftwarefoobar'), None)
+
+        # index written at build time is used as is
+        test_easyblocks = os.path.join(self.tmpdir, 'easyblocks')
+        os.makedirs(os.path.join(test_easyblocks, 'f'))
+        write_easyblocks_index(test_easyblocks)
+        index_path = os.path.join(test_easyblocks, EASYBLOCKS_INDEX_FILENAME)
+        self.assertTrue(os.path.exists(index_path))
+        self.assertEqual(get_easyblocks_index(test_easyblocks)['modules'], {})
+
+        # index is never written when it's obtained (i.e. at import time), even if it's missing or outdated
+        os.remove(index_path)
+        del easybuild.easyblocks._easyblocks_index[test_easyblocks]
+        self.assertEqual(get_easyblocks_index(test_easyblocks)['modules'], {})
+        self.assertFalse(os.path.exists(index_path))
+
+        handle = open(os.path.join(test_easyblocks, 'f', 'foobar.py'), 'w')
+        handle.write(EASYBLOCK_BODY % 'foobar')
+        handle.close()
+
+        outdated_index = {'index_version': EASYBLOCKS_INDEX_VERSION - 1, 'modules': {}}
+        handle = open(index_path, 'w')
+        handle.write(json.dumps(outdated_index))
+        handle.close()
+        del easybuild.easyblocks._easyblocks_index[test_easyblocks]
+        index = get_easyblocks_index(test_easyblocks)
+        self.assertEqual(index['modules'], {'foobar': os.path.join('f', 'foobar.py')})
+        self.assertEqual(index['classes'], {'EB_foobar': 'easybuild.easyblocks.foobar'})
+        handle = open(index_path, 'r')
+        self.assertEqual(json.loads(handle.read()), outdated_index)
+        handle.close()
+
+        # easyblocks that are added after generating the index are picked up by the import hook
+        os.remove(os.path.join(test_easyblocks, 'f', 'foobar.py'))
+        write_easyblocks_index(test_easyblocks)
+        del easybuild.easyblocks._easyblocks_index[test_easyblocks]
+        self.assertEqual(get_easyblocks_index(test_easyblocks)['modules'], {})
+        handle = open(os.path.join(test_easyblocks, 'f', 'foobar.py'), 'w')
+        handle.write(EASYBLOCK_BODY % 'foobar')
+        handle.close()
+        importer = EasyblocksIndexImporter('easybuild.easyblocks', test_easyblocks)
+        self.assertTrue(importer.find_module('easybuild.easyblocks.foobar', path=[test_easyblocks]) is importer)
+        self.assertEqual(get_easyblocks_index(test_easyblocks)['modules'], {'foobar': os.path.join('f', 'foobar.py')})
+
+        # easyblock class lookups (cfr. get_easyblock_class in EasyBuild framework) are resolved via the index
+        importer = EasyblocksIndexImporter('easybuild.easyblocks', easyblocks_path)
+        self.assertTrue(importer.find_module('easybuild.easyblocks.gcc', path=[easyblocks_path]) is importer)
+        self.assertEqual(importer.load_module('easybuild.easyblocks.gcc').__name__, 'easybuild.easyblocks.gcc')
+
+        # importing an easyblock module that is not included in the index fails straight away
+        self.assertErrorRegex(ImportError, "No module named", __import__, 'easybuild.easyblocks.nosuchsoftwarefoobar')
+
+        # import hook that uses the index is only installed if an up-to-date index is available;
+        # if not (e.g. in a git working copy), all subdirectories are added to the package search path instead
+        site_dir = os.path.join(self.tmpdir, 'site')
+        test_easyblocks = os.path.join(site_dir, 'easybuild', 'easyblocks_test')
+        for subdir in ['a', 'g', 'generic']:
+            os.makedirs(os.path.join(test_easyblocks, subdir))
+            open(os.path.join(test_easyblocks, subdir, '__init__.py'), 'w').close()
+        expected_path = [test_easyblocks, os.path.join(test_easyblocks, 'a'), os.path.join(test_easyblocks, 'g')]
+
+        def find_importers():
+            """Find import hooks for test easyblocks package."""
+            return [x for x in sys.meta_path if getattr(x, 'package_name', None) == 'easybuild.easyblocks_test']
+
+        orig_meta_path = sys.meta_path[:]
+        sys.path.insert(0, site_dir)
+        try:
+            path = easybuild.easyblocks._init_easyblocks_path([test_easyblocks], 'easybuild.easyblocks_test',
+                                                              test_easyblocks)
+            self.assertEqual(path, expected_path)
+            self.assertEqual(find_importers(), [])
+            self.assertFalse(test_easyblocks in easybuild.easyblocks._easyblocks_index)
+
+            write_easyblocks_index(test_easyblocks)
+            path = easybuild.easyblocks._init_easyblocks_path([test_easyblocks], 'easybuild.easyblocks_test',
+                                                              test_easyblocks)
+            self.assertEqual(path, expected_path)
+            self.assertEqual(len(find_importers()), 1)
+            self.assertEqual(find_importers()[0].easyblocks_dir, test_easyblocks)
+        finally:
+            sys.path.remove(site_dir)
+            sys.meta_path[:] = orig_meta_path
+
+    def test_verbose_version(self):
+        """Test lazy determination of verbose easyblocks version."""
+        import easybuild.easyblocks
+        from easybuild.easyblocks import UNKNOWN, VerboseVersion
+
+        orig_read_git_revision_stamp = easybuild.easyblocks.read_git_revision_stamp
+        git_revs = []
+
+        def mocked_read_git_revision_stamp():
+            """Mocked version of read_git_revision_stamp, which keeps track of how often it was called."""
+            git_revs.append('aab4afc016b742c6d4b157427e192942d0e131fe')
+            return git_revs[-1]
+
+        easybuild.easyblocks.read_git_revision_stamp = mocked_read_git_revision_stamp
+        try:
+            # git revision is not determined when verbose version is created
+            version = VerboseVersion('1.2.3')
+            self.assertEqual(git_revs, [])
+            self.assertFalse('vstring' in version.__dict__)
+
+            # git revision is determined (only once) on first use
+            self.assertEqual(str(version), '1.2.3-raab4afc016b742c6d4b157427e192942d0e131fe')
+            self.assertEqual(version.version[:3], [1, 2, 3])
+            self.assertTrue(version > VerboseVersion('1.2.2'))
+            self.assertEqual(len(git_revs), 2)
+
+            easybuild.easyblocks.read_git_revision_stamp = lambda: UNKNOWN
+            self.assertEqual(str(VerboseVersion('1.2.3')), '1.2.3')
+        finally:
+            easybuild.easyblocks.read_git_revision_stamp = orig_read_git_revision_stamp
+
+    def test_git_revision_stamp(self):
+        """Test writing and reading of stamp file for git revision."""
+        from easybuild.easyblocks import GIT_REVISION_STAMP_FILENAME, UNKNOWN
+        from easybuild.easyblocks import read_git_revision_stamp, write_git_revision_stamp
+
+        # no git working copy for this easyblocks directory, so stamp file is used
+        easyblocks_dir = os.path.join(self.tmpdir, 'easybuild', 'easyblocks')
+        os.makedirs(easyblocks_dir)
+        stamp_path = os.path.join(easyblocks_dir, GIT_REVISION_STAMP_FILENAME)
+
+        git_rev = 'aab4afc016b742c6d4b157427e192942d0e131fe'
+        write_git_revision_stamp(git_rev=git_rev, easyblocks_dir=easyblocks_dir)
+        handle = open(stamp_path, 'r')
+        self.assertEqual(handle.read(), git_rev + '\n')
+        handle.close()
+        self.assertEqual(read_git_revision_stamp(easyblocks_dir=easyblocks_dir), git_rev)
+
+        # existing stamp file is not overwritten if git revision is unknown
+        write_git_revision_stamp(git_rev=UNKNOWN, easyblocks_dir=easyblocks_dir)
+        self.assertEqual(read_git_revision_stamp(easyblocks_dir=easyblocks_dir), git_rev)
+
+        # an empty stamp file results in an unknown git revision
+        os.remove(stamp_path)
+        write_git_revision_stamp(git_rev='', easyblocks_dir=easyblocks_dir)
+        self.assertEqual(read_git_revision_stamp(easyblocks_dir=easyblocks_dir), UNKNOWN)
+
+        # stamp file is ignored for a git working copy
+        os.makedirs(os.path.join(self.tmpdir, '.git'))
+        write_git_revision_stamp(git_rev=git_rev, easyblocks_dir=easyblocks_dir)
+        self.assertNotEqual(read_git_revision_stamp(easyblocks_dir=easyblocks_dir), git_rev)
+
+    def test_import_helper_modules(self):
+        """Test importing of helper modules located in easybuild/easyblocks/tools."""
+        import easybuild.easyblocks.tools
+
+        # these modules are not easyblocks, and hence are not covered by tests that cover all easyblocks
+        tools_path = os.path.dirname(easybuild.easyblocks.tools.__file__)
+        helper_modules = [os.path.splitext(os.path.basename(path))[0]
+                          for path in glob.glob(os.path.join(tools_path, '*.py'))]
+        helper_modules = [mod for mod in helper_modules if mod != '__init__']
+        self.assertTrue('cache' in helper_modules, "cache found in %s" % helper_modules)
+
+        for mod in helper_modules:
+            __import__('easybuild.easyblocks.tools.%s' % mod)
+
+
 def suite():
     """Return all general easybuild-easyblocks tests."""
     return TestLoader().loadTestsFromTestCase(GeneralEasyblockTest)
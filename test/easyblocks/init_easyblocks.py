@@ -186,6 +186,8 @@ def suite():
     easyblocks_path = get_paths_for("easyblocks")[0]
     all_pys = glob.glob('%s/*/*.py' % easyblocks_path)
     easyblocks = [eb for eb in all_pys if not eb.endswith('__init__.py') and not '/test/' in eb]
+    # helper modules in easybuild/easyblocks/tools are not easyblocks
+    easyblocks = [eb for eb in easyblocks if '/tools/' not in eb]
 
     for easyblock in easyblocks:
         # dynamically define new inner functions that can be added as class methods to InitTest
@@ -0,0 +1,169 @@
+##
+# Copyright 2018-2018 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+##
+"""
+Unit tests for taking into account available memory in easyblocks (easybuild.easyblocks.tools.memory).
+"""
+import os
+import shutil
+import tempfile
+from unittest import TestLoader, main
+from vsc.utils.testing import EnhancedTestCase
+
+import easybuild.easyblocks.tools.memory as memory
+from easybuild.easyblocks.tools.memory import det_available_memory, det_cgroup_memory_limit
+from easybuild.easyblocks.tools.memory import det_memory_aware_parallelism
+
+
+MEMINFO = """MemTotal:       16384000 kB
+MemFree:         1024000 kB
+MemAvailable:    8192000 kB
+Buffers:          102400 kB
+"""
+
+
+class MemoryTest(EnhancedTestCase):
+    """Tests for easybuild.easyblocks.tools.memory."""
+
+    def setUp(self):
+        """Test setup."""
+        super(MemoryTest, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.orig_paths = (memory.MEMINFO_PATH, memory.PROC_CGROUP_PATH, memory.CGROUP_ROOT)
+        memory.MEMINFO_PATH = os.path.join(self.tmpdir, 'meminfo')
+        memory.PROC_CGROUP_PATH = os.path.join(self.tmpdir, 'cgroup')
+        memory.CGROUP_ROOT = os.path.join(self.tmpdir, 'sys', 'fs', 'cgroup')
+
+    def tearDown(self):
+        """Test cleanup."""
+        super(MemoryTest, self).tearDown()
+        memory.MEMINFO_PATH, memory.PROC_CGROUP_PATH, memory.CGROUP_ROOT = self.orig_paths
+        shutil.rmtree(self.tmpdir)
+
+    def write_file(self, path, txt):
+        """Write specified contents to specified (fake) file."""
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        handle = open(path, 'w')
+        handle.write(txt)
+        handle.close()
+
+    def write_meminfo(self, txt):
+        """Write specified contents to (fake) /proc/meminfo."""
+        self.write_file(memory.MEMINFO_PATH, txt)
+
+    def test_det_available_memory(self):
+        """Test det_available_memory function."""
+        # no meminfo available
+        self.assertEqual(det_available_memory(), None)
+
+        # MemAvailable is used if it's available (8000 MiB)
+        self.write_meminfo(MEMINFO)
+        self.assertEqual(det_available_memory(), 8000)
+
+        # fall back to MemTotal if MemAvailable is not reported (16000 MiB)
+        self.write_meminfo('\n'.join(l for l in MEMINFO.split('\n') if not l.startswith('MemAvailable')))
+        self.assertEqual(det_available_memory(), 16000)
+
+        self.write_meminfo("this is not what we're looking for")
+        self.assertEqual(det_available_memory(), None)
+
+    def test_det_cgroup_memory_limit(self):
+        """Test det_cgroup_memory_limit function."""
+        # no cgroups
+        self.assertEqual(det_cgroup_memory_limit(), None)
+
+        # cgroup v1, no memory limit
+        self.write_file(memory.PROC_CGROUP_PATH, "5:cpu,cpuacct:/\n4:memory:/slurm/uid_1000/job_123/step_0\n0::/\n")
+        memory_root = os.path.join(memory.CGROUP_ROOT, 'memory')
+        self.write_file(os.path.join(memory_root, 'memory.limit_in_bytes'), '9223372036854771712\n')
+        self.assertEqual(det_cgroup_memory_limit(), None)
+
+        # limit set for job is also taken into account for job step
+        job_dir = os.path.join(memory_root, 'slurm', 'uid_1000', 'job_123')
+        self.write_file(os.path.join(job_dir, 'memory.limit_in_bytes'), '%d\n' % (4000 * 1048576))
+        self.write_file(os.path.join(job_dir, 'step_0', 'memory.limit_in_bytes'), '9223372036854771712\n')
+        self.assertEqual(det_cgroup_memory_limit(), 4000)
+
+        # smallest limit wins
+        self.write_file(os.path.join(job_dir, 'step_0', 'memory.limit_in_bytes'), '%d\n' % (3000 * 1048576))
+        self.assertEqual(det_cgroup_memory_limit(), 3000)
+
+        # cgroup v2
+        self.write_file(memory.PROC_CGROUP_PATH, "0::/system.slice/job_456\n")
+        self.write_file(os.path.join(memory.CGROUP_ROOT, 'system.slice', 'job_456', 'memory.max'), 'max\n')
+        self.assertEqual(det_cgroup_memory_limit(), None)
+        self.write_file(os.path.join(memory.CGROUP_ROOT, 'system.slice', 'memory.max'), '%d\n' % (2000 * 1048576))
+        self.assertEqual(det_cgroup_memory_limit(), 2000)
+
+        # cgroup that is not visible (e.g. in a container): limit at root of hierarchy is used
+        self.write_file(memory.PROC_CGROUP_PATH, "4:memory:/docker/abcdef\n")
+        self.assertEqual(det_cgroup_memory_limit(), None)
+        self.write_file(os.path.join(memory_root, 'memory.limit_in_bytes'), '%d\n' % (1000 * 1048576))
+        self.assertEqual(det_cgroup_memory_limit(), 1000)
+
+        # available memory is limited by cgroup memory limit
+        self.write_meminfo(MEMINFO)
+        self.assertEqual(det_available_memory(), 1000)
+        self.assertEqual(det_memory_aware_parallelism(16, 500), 2)
+        self.write_file(os.path.join(memory_root, 'memory.limit_in_bytes'), '%d\n' % (10000 * 1048576))
+        self.assertEqual(det_available_memory(), 8000)
+
+        # cgroup memory limit is used if /proc/meminfo is not available
+        os.remove(memory.MEMINFO_PATH)
+        self.assertEqual(det_available_memory(), 10000)
+
+    def test_det_memory_aware_parallelism(self):
+        """Test det_memory_aware_parallelism function."""
+        self.write_meminfo(MEMINFO)
+
+        # no memory per job specified: maximum parallelism is used
+        self.assertEqual(det_memory_aware_parallelism(16, None), 16)
+        self.assertEqual(det_memory_aware_parallelism(16, 0), 16)
+
+        # sufficient memory available (8000 MiB / 1000 MiB per job => 8 jobs)
+        self.assertEqual(det_memory_aware_parallelism(4, 1000), 4)
+        self.assertEqual(det_memory_aware_parallelism(8, 1000), 8)
+
+        # parallelism limited by available memory
+        self.assertEqual(det_memory_aware_parallelism(16, 1000), 8)
+        self.assertEqual(det_memory_aware_parallelism(16, 3000), 2)
+
+        # parallelism is always at least 1
+        self.assertEqual(det_memory_aware_parallelism(16, 10000), 1)
+        self.assertEqual(det_memory_aware_parallelism(None, 1000), 1)
+        self.assertEqual(det_memory_aware_parallelism(0, None), 1)
+
+        # maximum parallelism is used if available memory can not be determined
+        os.remove(memory.MEMINFO_PATH)
+        self.assertEqual(det_memory_aware_parallelism(16, 1000), 16)
+
+
+def suite():
+    """Return all tests for easybuild.easyblocks.tools.memory."""
+    return TestLoader().loadTestsFromTestCase(MemoryTest)
+
+
+if __name__ == '__main__':
+    main()
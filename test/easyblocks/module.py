@@ -307,6 +307,8 @@ def suite():
     easyblocks_path = get_paths_for("easyblocks")[0]
     all_pys = glob.glob('%s/*/*.py' % easyblocks_path)
     easyblocks = [eb for eb in all_pys if os.path.basename(eb) != '__init__.py' and '/test/' not in eb]
+    # helper modules in easybuild/easyblocks/tools are not easyblocks
+    easyblocks = [eb for eb in easyblocks if '/tools/' not in eb]
 
     # filter out no longer supported easyblocks, or easyblocks that are tested in a different way
     excluded_easyblocks = ['versionindependendpythonpackage.py']
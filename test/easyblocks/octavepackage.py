@@ -0,0 +1,89 @@
+##
+# Copyright 2018-2018 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+##
+"""
+Unit tests for the OctavePackage easyblock (easybuild.easyblocks.generic.octavepackage).
+"""
+import os
+from unittest import TestLoader, main
+
+from easybuild.easyblocks.generic.octavepackage import OctavePackage
+from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.filetools import mkdir, read_file, write_file
+from test.easyblocks.utilities import EasyblockTestCase, init_config, write_script
+
+
+class OctavePackageTest(EasyblockTestCase):
+    """Tests for the OctavePackage easyblock (easybuild.easyblocks.generic.octavepackage)."""
+
+    def test_octavepackage_batch_install(self):
+        """Test installing Octave packages in batch, in a single Octave session."""
+        cmds_log = os.path.join(self.tmpdir, 'octave.log')
+        bindir = os.path.join(self.tmpdir, 'fake_octave_bin')
+        mkdir(bindir, parents=True)
+        write_file(cmds_log, '')
+        fake_octave = 'echo "$@" >> %s\nif [[ "$@" == *FAIL* ]]; then exit 1; fi' % cmds_log
+        write_script(os.path.join(bindir, 'octave'), fake_octave)
+        os.environ['PATH'] = os.pathsep.join([bindir, os.getenv('PATH', '')])
+
+        master = self.init_easyblock('Bundle', extratxt="exts_batch_install = True")
+        master.cfg['exts_defaultclass'] = 'OctavePackage'
+        master.exts = [{'name': name, 'version': '1.0', 'src': os.path.join(self.tmpdir, '%s-1.0.tar.gz' % name)}
+                       for name in ['one', 'two', 'three']]
+        master.ext_instances = []
+        for ext_spec in master.exts:
+            ext = OctavePackage(master, ext_spec)
+            ext.run()
+            ext.postrun()
+            master.ext_instances.append(ext)
+
+        # all packages are installed with a single 'pkg install' command
+        octave_cmds = read_file(cmds_log).splitlines()
+        self.assertEqual(len(octave_cmds), 1)
+        self.assertEqual(octave_cmds[0].count('pkg install -global'), 1)
+        self.assertTrue(octave_cmds[0].endswith(' '.join(ext['src'] for ext in master.exts)))
+        self.assertEqual(master.octave_exts_batch, [])
+
+        # if installing the batch fails, packages are installed one by one
+        write_file(cmds_log, '')
+        exts = [OctavePackage(master, ext_spec) for ext_spec in master.exts]
+        exts[1].pkg_src = exts[1].src.replace('two', 'twoFAIL')
+        for ext in exts[0::2]:
+            ext.pkg_src = ext.src
+        master.octave_exts_batch = exts[:]
+        self.assertErrorRegex(EasyBuildError, "cmd .* exited with exit code 1", exts[0].install_batch)
+        octave_cmds = read_file(cmds_log).splitlines()
+        self.assertEqual(len(octave_cmds), 3)
+        self.assertTrue(octave_cmds[1].endswith('pkg install -global %s' % exts[0].pkg_src))
+        self.assertTrue(octave_cmds[2].endswith('pkg install -global %s' % exts[1].pkg_src))
+
+
+def suite():
+    """Return all tests for the OctavePackage easyblock."""
+    init_config()
+    return TestLoader().loadTestsFromTestCase(OctavePackageTest)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+##
+# Copyright 2018-2018 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+##
+"""
+Unit tests for the PerlModule easyblock (easybuild.easyblocks.generic.perlmodule).
+"""
+import os
+from unittest import TestLoader, main
+
+from easybuild.easyblocks.generic.configuremake import ConfigureMake
+from easybuild.easyblocks.generic.perlmodule import PerlModule
+from easybuild.tools.filetools import change_dir, read_file, remove_file, write_file
+from test.easyblocks.utilities import EasyblockTestCase, init_config
+
+
+class PerlModuleTest(EasyblockTestCase):
+    """Tests for the PerlModule easyblock (easybuild.easyblocks.generic.perlmodule)."""
+
+    def test_perlmodule_parallel_test(self):
+        """Test running tests in parallel for Perl modules."""
+        cmds_log = self.setup_fake_cmds(['make', 'perl'])
+        for var in ['HARNESS_OPTIONS', 'TEST_JOBS']:
+            if var in os.environ:
+                del os.environ[var]
+
+        default = ConfigureMake.extra_options()['parallel_test'][0]
+
+        # when installed as an extension, 'parallel_test' is taken from parent (which may not define it)
+        for (easyblock, name) in [('EB_Perl', 'Perl'), ('Bundle', 'foo')]:
+            master = self.init_easyblock(easyblock, name=name, extratxt="parallel = 4")
+            ext = PerlModule(master, {'name': 'Foo::Bar', 'version': '1.0'})
+            self.assertEqual(ext.cfg['parallel_test'], default)
+            self.assertEqual(ext.parallel_test_jobs(), (None, 4)[default])
+
+        master = self.init_easyblock('EB_Perl', name='Perl', extratxt="parallel = 4\nparallel_test = True")
+        ext = PerlModule(master, {'name': 'Foo::Bar', 'version': '1.0', 'options': {'runtest': 'test'}})
+        self.assertEqual(ext.parallel_test_jobs(), 4)
+
+        # $HARNESS_OPTIONS is used when installing with Makefile.PL, --jobs when installing with Build.PL
+        srcdir = os.path.join(self.tmpdir, 'Foo-Bar-1.0')
+        write_file(os.path.join(srcdir, 'Makefile.PL'), '')
+        change_dir(srcdir)
+        ext.install_perl_module()
+        self.assertTrue("HARNESS_OPTIONS=j4 TEST_JOBS= make test" in read_file(cmds_log).splitlines())
+
+        write_file(cmds_log, '')
+        remove_file(os.path.join(srcdir, 'Makefile.PL'))
+        write_file(os.path.join(srcdir, 'Build.PL'), '')
+        ext.install_perl_module()
+        self.assertTrue("HARNESS_OPTIONS= TEST_JOBS= perl Build test --jobs 4" in read_file(cmds_log).splitlines())
+
+        master = self.init_easyblock('EB_Perl', name='Perl', extratxt="parallel = 4\nparallel_test = False")
+        ext = PerlModule(master, {'name': 'Foo::Bar', 'version': '1.0'})
+        self.assertEqual(ext.parallel_test_jobs(), None)
+
+        # tests for Perl itself are run in parallel via $TEST_JOBS
+        write_file(cmds_log, '')
+        master = self.init_easyblock('EB_Perl', name='Perl', extratxt="parallel = 4\nparallel_test = True")
+        master.test_step()
+        self.assertEqual(read_file(cmds_log).splitlines(), ["HARNESS_OPTIONS= TEST_JOBS=4 make test"])
+
+
+def suite():
+    """Return all tests for the PerlModule easyblock."""
+    init_config()
+    return TestLoader().loadTestsFromTestCase(PerlModuleTest)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+##
+# Copyright 2018-2018 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+##
+"""
+Unit tests for profiling installations performed with easyblocks (easybuild.easyblocks.tools.profiling).
+"""
+import os
+import re
+import shutil
+import tempfile
+import types
+from unittest import TestLoader, main
+from vsc.utils.testing import EnhancedTestCase
+
+import easybuild.easyblocks.tools.profiling as profiling
+import easybuild.tools.run
+from easybuild.easyblocks.tools.cache import read_json_cache
+from easybuild.easyblocks.tools.profiling import PROFILED_RUN_FUNCTIONS, det_profile_summary, end_step, format_metrics
+from easybuild.easyblocks.tools.profiling import profile_run_functions, profiled, start_step
+
+
+def fake_run_cmd(cmd, *args, **kwargs):
+    """Fake function to run commands."""
+    return ('output for %s' % cmd, kwargs.get('exit_code', 0))
+
+
+class FakeEasyBlock(object):
+    """Fake easyblock, which only provides what's required for profiling."""
+
+    def __init__(self, logfile):
+        self.cfg = {'name': 'foo', 'version': '1.2.3'}
+        self.logfile = logfile
+
+
+class ProfilingTest(EnhancedTestCase):
+    """Tests for easybuild.easyblocks.tools.profiling."""
+
+    def setUp(self):
+        """Test setup."""
+        super(ProfilingTest, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+
+        # use fake functions to run commands, to avoid actually running anything
+        self.orig_run_functions = dict((name, getattr(easybuild.tools.run, name)) for name in PROFILED_RUN_FUNCTIONS)
+        self.orig_saved_run_functions = profiling._run_functions.copy()
+        profiling._run_functions.clear()
+        self.fake_run_functions = {}
+        for name in PROFILED_RUN_FUNCTIONS:
+            func = types.FunctionType(fake_run_cmd.func_code, fake_run_cmd.func_globals, name)
+            self.fake_run_functions[name] = func
+            setattr(easybuild.tools.run, name, func)
+
+    def tearDown(self):
+        """Test cleanup."""
+        super(ProfilingTest, self).tearDown()
+        for name, func in self.orig_run_functions.items():
+            setattr(easybuild.tools.run, name, func)
+        profiling._run_functions.clear()
+        profiling._run_functions.update(self.orig_saved_run_functions)
+        del profiling._profiles[:]
+        shutil.rmtree(self.tmpdir)
+
+    def test_profile_run_functions(self):
+        """Test replacing functions to run commands with profiled versions."""
+        # (easyblock) module that imports run_cmd by name
+        mod = types.ModuleType('easybuild.easyblocks.fakeeasyblock')
+        mod.run_cmd = self.fake_run_functions['run_cmd']
+        mod.other_run_cmd = fake_run_cmd
+
+        profile_run_functions(modules=[mod])
+        for name in PROFILED_RUN_FUNCTIONS:
+            func = getattr(easybuild.tools.run, name)
+            self.assertTrue(func.profiled)
+            self.assertEqual(func.__name__, name)
+            self.assertTrue(profiling._run_functions[name] is self.fake_run_functions[name])
+        self.assertTrue(mod.run_cmd is easybuild.tools.run.run_cmd)
+        # other functions are left untouched
+        self.assertTrue(mod.other_run_cmd is fake_run_cmd)
+
+        # functions are not wrapped again
+        profiled_run_cmd = easybuild.tools.run.run_cmd
+        profile_run_functions(modules=[mod])
+        self.assertTrue(easybuild.tools.run.run_cmd is profiled_run_cmd)
+        self.assertTrue(mod.run_cmd is profiled_run_cmd)
+        self.assertTrue(profiled(profiled_run_cmd) is profiled_run_cmd)
+
+        # without an ongoing profile, nothing is recorded
+        self.assertEqual(mod.run_cmd("echo foo"), ('output for echo foo', 0))
+        self.assertEqual(profiling._profiles, [])
+
+    def test_profile(self):
+        """Test profiling steps and commands for an installation."""
+        profile_run_functions(modules=[])
+        run_cmd = easybuild.tools.run.run_cmd
+
+        eb = FakeEasyBlock(os.path.join(self.tmpdir, 'easybuild-foo-1.2.3.log'))
+        start_step(eb, 'configure')
+        self.assertEqual(run_cmd("./configure"), ('output for ./configure', 0))
+        end_step(eb, 'configure')
+        start_step(eb, 'build')
+        self.assertEqual(run_cmd(['make', '-j', '4'], exit_code=2), ('output for [\'make\', \'-j\', \'4\']', 2))
+        # ending another step than the current one is ignored
+        end_step(eb, 'install')
+        end_step(eb, 'build')
+
+        self.assertEqual(len(profiling._profiles), 1)
+        profile = profiling._profiles[0]
+        self.assertEqual((profile['name'], profile['version'], profile['easyblock']), ('foo', '1.2.3', 'FakeEasyBlock'))
+        self.assertEqual([step['step'] for step in profile['steps']], ['configure', 'build'])
+        self.assertEqual([cmd['cmd'] for cmd in profile['commands']], ['./configure', 'make -j 4'])
+        self.assertEqual([cmd['step'] for cmd in profile['commands']], ['configure', 'build'])
+        self.assertEqual([cmd['exit_code'] for cmd in profile['commands']], [0, 2])
+        for entry in profile['steps'] + profile['commands']:
+            for key in ['wall_time', 'user_time', 'sys_time', 'peak_rss']:
+                self.assertTrue(entry[key] >= 0)
+        regex = re.compile(r':[0-9]+ \(test_profile\)$')
+        for cmd in profile['commands']:
+            self.assertEqual(cmd['function'], 'run_cmd')
+            self.assertTrue(regex.search(cmd['caller']), "Pattern '%s' found in: %s" % (regex.pattern, cmd['caller']))
+
+        # profile is written next to build log
+        profile_path = os.path.join(self.tmpdir, 'easybuild-foo-1.2.3-profile.json')
+        self.assertEqual(profile['path'], profile_path)
+        data = read_json_cache(profile_path)
+        self.assertEqual(len(data['steps']), 2)
+        self.assertEqual([cmd['cmd'] for cmd in data['commands']], ['./configure', 'make -j 4'])
+
+        # profile for another installation is started when steps are run for another easyblock instance
+        eb2 = FakeEasyBlock(None)
+        start_step(eb2, 'build')
+        end_step(eb2, 'build')
+        self.assertEqual(len(profiling._profiles), 2)
+        self.assertEqual(profiling._profiles[1]['path'], None)
+        self.assertEqual(profiling._profiles[1]['commands'], [])
+
+    def test_profile_hooks(self):
+        """Test profiling installations via the hooks, including failing steps (for which no post-step hook is run)."""
+        profiling.start_hook()
+        self.assertTrue(profiling._state['exit_handler'])
+        run_cmd = easybuild.tools.run.run_cmd
+        self.assertTrue(run_cmd.profiled)
+
+        eb = FakeEasyBlock(os.path.join(self.tmpdir, 'easybuild-foo-1.2.3.log'))
+        profile_path = os.path.join(self.tmpdir, 'easybuild-foo-1.2.3-profile.json')
+        profiling.pre_configure_hook(eb)
+        run_cmd("./configure")
+        profiling.post_configure_hook(eb)
+        self.assertEqual([step['step'] for step in read_json_cache(profile_path)['steps']], ['configure'])
+
+        # build step fails, so post-build hook is not run
+        profiling.pre_build_hook(eb)
+        run_cmd("make", exit_code=2)
+        self.assertEqual(profiling._profiles[0]['current_step'], 'build')
+        self.assertEqual(len(read_json_cache(profile_path)['steps']), 1)
+
+        # measurement for failed step is stopped (and written) when next installation is started
+        eb2 = FakeEasyBlock(os.path.join(self.tmpdir, 'easybuild-bar-4.5.log'))
+        eb2.cfg.update({'name': 'bar', 'version': '4.5'})
+        profiling.pre_fetch_hook(eb2)
+        profiling.post_fetch_hook(eb2)
+        data = read_json_cache(profile_path)
+        self.assertEqual([step['step'] for step in data['steps']], ['configure', 'build'])
+        self.assertEqual([step.get('failed') for step in data['steps']], [None, True])
+        self.assertEqual([cmd['cmd'] for cmd in data['commands']], ['./configure', 'make'])
+        self.assertFalse('measurement' in profiling._profiles[0])
+
+        # measurement for failed step of last installation is stopped (and written) by end hook
+        profiling.pre_install_hook(eb2)
+        self.mock_stdout(True)
+        profiling.end_hook()
+        stdout = self.get_stdout()
+        self.mock_stdout(False)
+
+        data = read_json_cache(os.path.join(self.tmpdir, 'easybuild-bar-4.5-profile.json'))
+        self.assertEqual([step['step'] for step in data['steps']], ['fetch', 'install'])
+        self.assertEqual(data['steps'][-1]['failed'], True)
+        self.assertEqual(profiling._active, [])
+
+        self.assertTrue("Profile for foo v1.2.3 (FakeEasyBlock easyblock), see %s" % profile_path in stdout)
+        self.assertTrue("  - build step (failed): " in stdout)
+        self.assertTrue("  - install step (failed): " in stdout)
+        self.assertTrue("  - configure step: " in stdout)
+
+        # stopping measurements for failed steps is harmless if there are none (e.g. when EasyBuild exits)
+        profiling.end_profiling()
+        self.assertEqual(len(read_json_cache(profile_path)['steps']), 2)
+
+    def test_profile_summary(self):
+        """Test composing profile summary."""
+        entry = {
+            'wall_time': 12.34,
+            'user_time': 40.0,
+            'sys_time': 1.2,
+            'peak_rss': 2 * 1048576,
+            'bytes_written': 3 * 1048576,
+        }
+        self.assertEqual(format_metrics(entry), "12.3s wall, 40.0s user, 1.2s sys, 2.0 MiB peak RSS, 3.0 MiB written")
+        entry['bytes_written'] = None
+        self.assertEqual(format_metrics(entry), "12.3s wall, 40.0s user, 1.2s sys, 2.0 MiB peak RSS")
+
+        profile = {
+            'name': 'foo',
+            'version': '1.2.3',
+            'easyblock': 'ConfigureMake',
+            'path': '/tmp/easybuild-foo-1.2.3-profile.json',
+            'steps': [dict(entry, step='configure', wall_time=1.0), dict(entry, step='build', wall_time=10.0)],
+            'commands': [
+                dict(entry, step='configure', caller='mod:1 (f)', cmd='./configure', wall_time=0.5),
+                dict(entry, step='build', caller='mod:2 (g)', cmd='make -j 4 ', wall_time=9.5),
+            ],
+        }
+        expected = '\n'.join([
+            "Profile for foo v1.2.3 (ConfigureMake easyblock), see /tmp/easybuild-foo-1.2.3-profile.json:",
+            "* top 1 steps:",
+            "  - build step: 10.0s wall, 40.0s user, 1.2s sys, 2.0 MiB peak RSS",
+            "* top 1 commands:",
+            "  - [build step, mod:2 (g)] make -j 4",
+            "    9.5s wall, 40.0s user, 1.2s sys, 2.0 MiB peak RSS",
+        ])
+        self.assertEqual(det_profile_summary(profile, top=1), expected)
+
+        # number of steps/commands to include in summary can be controlled via environment variable
+        os.environ['EASYBUILD_EASYBLOCKS_PROFILE_TOP'] = '2'
+        try:
+            summary = det_profile_summary(profile)
+        finally:
+            del os.environ['EASYBUILD_EASYBLOCKS_PROFILE_TOP']
+        self.assertTrue("* top 2 steps:\n  - build step: 10.0s wall" in summary)
+        self.assertTrue("  - configure step: 1.0s wall" in summary)
+        self.assertTrue("* top 2 commands:" in summary)
+
+
+def suite():
+    """Return all tests for easybuild.easyblocks.tools.profiling."""
+    return TestLoader().loadTestsFromTestCase(ProfilingTest)
+
+
+if __name__ == '__main__':
+    main()
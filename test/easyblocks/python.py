@@ -0,0 +1,111 @@
+##
+# Copyright 2018-2018 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+##
+"""
+Unit tests for the Python easyblock (easybuild.easyblocks.python).
+"""
+import compileall
+import glob
+import os
+import sys
+import tempfile
+from unittest import TestLoader, main
+
+from easybuild.easyblocks.python import PRECOMPILE_SCRIPT, precompile_bytecode
+from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.filetools import write_file
+from test.easyblocks.utilities import EasyblockTestCase, init_config
+
+
+class PythonTest(EasyblockTestCase):
+    """Tests for the Python easyblock (easybuild.easyblocks.python)."""
+
+    def test_python_precompile_bytecode(self):
+        """Test precompiling Python modules in parallel."""
+        moddir = os.path.join(self.tmpdir, 'site-packages')
+        write_file(os.path.join(moddir, 'foo', '__init__.py'), "import os\n")
+        write_file(os.path.join(moddir, 'foo', 'bar.py'), "x = 1\n")
+        # modules that are not valid Python code on purpose are not byte-compiled
+        write_file(os.path.join(moddir, 'test', 'badsyntax_foo.py'), "this is not Python code\n")
+        write_file(os.path.join(moddir, 'lib2to3', 'tests', 'data', 'py3_test.py'), "print 'foo' if True\n")
+
+        def pyc_files():
+            """Return sorted list of byte-compiled files in test directory."""
+            return sorted(os.path.relpath(os.path.join(dirpath, fn), moddir)
+                          for (dirpath, _, filenames) in os.walk(moddir) for fn in filenames if fn.endswith('.pyc'))
+
+        def precompile_tmpdirs():
+            """Return list of temporary directories used for precompiling Python modules."""
+            return glob.glob(os.path.join(tempfile.gettempdir(), 'eb-precompile-*'))
+
+        self.mock_stderr(True)
+        precompile_bytecode(sys.executable, [moddir, os.path.join(self.tmpdir, 'nosuchdir')], 2)
+        stderr = self.get_stderr()
+        self.mock_stderr(False)
+
+        self.assertEqual(stderr, '')
+        self.assertEqual(pyc_files(), [os.path.join('foo', '__init__.pyc'), os.path.join('foo', 'bar.pyc')])
+        self.assertEqual(precompile_tmpdirs(), [])
+
+        # up-to-date byte-compiled files are retained
+        bar_pyc = os.path.join(moddir, 'foo', 'bar.pyc')
+        os.utime(bar_pyc, (12345, 12345))
+        precompile_bytecode(sys.executable, [moddir], 2)
+        self.assertEqual(os.path.getmtime(bar_pyc), 12345)
+
+        # temporary directory is also cleaned up when precompiling fails
+        error_pattern = "Precompiling Python modules with .* failed"
+        self.assertErrorRegex(EasyBuildError, error_pattern, precompile_bytecode, 'nosuchpython', [moddir], 2)
+        self.assertEqual(precompile_tmpdirs(), [])
+
+    def test_python_precompile_script_without_compile_file(self):
+        """Test precompile script in absence of compileall.compile_file (Python 2.6)."""
+        namespace = {'__name__': 'precompile'}
+        exec PRECOMPILE_SCRIPT in namespace
+
+        good_py, bad_py = os.path.join(self.tmpdir, 'good.py'), os.path.join(self.tmpdir, 'bad.py')
+        write_file(good_py, "x = 1\n")
+        write_file(bad_py, "this is not Python code\n")
+
+        orig_compile_file = compileall.compile_file
+        del compileall.compile_file
+        try:
+            # compiled files have a .pyo extension when Python is run with -O (as is done in Travis)
+            suffix = __debug__ and 'c' or 'o'
+            self.assertTrue(namespace['compile_file'](good_py))
+            self.assertTrue(os.path.exists(good_py + suffix))
+            self.assertFalse(namespace['compile_file'](bad_py))
+            self.assertFalse(os.path.exists(bad_py + suffix))
+        finally:
+            compileall.compile_file = orig_compile_file
+
+
+def suite():
+    """Return all tests for the Python easyblock."""
+    init_config()
+    return TestLoader().loadTestsFromTestCase(PythonTest)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,469 @@
+##
+# Copyright 2018-2018 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+##
+"""
+Unit tests for the PythonPackage easyblock (easybuild.easyblocks.generic.pythonpackage).
+"""
+import os
+import sys
+from unittest import TestLoader, main
+
+import easybuild.easyblocks.generic.pythonpackage as pythonpackage
+from easybuild.easyblocks.generic.pythonpackage import PYTHON_PROBE_CACHE, PythonPackage, det_cache_key
+from easybuild.easyblocks.generic.pythonpackage import det_install_requires, det_pip_version, det_python_facts
+from easybuild.easyblocks.generic.pythonpackage import merge_staged_install, pick_python_cmd, relocate_install
+from easybuild.easyblocks.generic.pythonpackage import scan_file
+from easybuild.easyblocks.tools.cache import read_json_cache
+from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.filetools import change_dir, read_file, rmtree2, write_file
+from test.easyblocks.utilities import EasyblockTestCase, init_config, write_script
+
+
+class PythonPackageTest(EasyblockTestCase):
+    """Tests for the PythonPackage easyblock (easybuild.easyblocks.generic.pythonpackage)."""
+
+    def test_pythonpackage_python_probe_cache(self):
+        """Test caching of results of probing Python interpreters."""
+        self.assertEqual(det_cache_key(os.path.join(self.tmpdir, 'nosuchpython')), None)
+        self.assertTrue(det_cache_key(sys.executable).startswith(os.path.realpath(sys.executable) + ':'))
+
+        # wrapper for Python command that keeps track of how often it was run
+        python = os.path.join(self.tmpdir, 'python')
+        python_log = os.path.join(self.tmpdir, 'python.log')
+        write_script(python, 'echo "$@" >> %s\nexec %s "$@"\n' % (python_log, sys.executable))
+
+        facts = det_python_facts(python)
+        self.assertEqual(facts['version'], '%s.%s.%s' % sys.version_info[:3])
+        for key in ['purelib', 'platlib']:
+            self.assertTrue(facts[key].startswith('lib') and facts[key].endswith('site-packages'))
+
+        # result is cached in memory and on disk, so Python command is only run once
+        self.assertEqual(det_python_facts(python), facts)
+        pythonpackage._python_probe_cache.clear()
+        self.assertEqual(det_python_facts(python), facts)
+        self.assertEqual(len(read_file(python_log).splitlines()), 1)
+        self.assertEqual(read_json_cache(os.path.join(self.cache_dir, PYTHON_PROBE_CACHE)).values(), [facts])
+
+        # cache entry is no longer used when Python command is changed
+        os.utime(python, (0, 0))
+        pythonpackage._python_probe_cache.clear()
+        self.assertEqual(det_python_facts(python), facts)
+        self.assertEqual(len(read_file(python_log).splitlines()), 2)
+
+        # Python commands that can not be probed are skipped by pick_python_cmd, and failures are not cached
+        bindir = os.path.join(self.tmpdir, 'bin')
+        os.mkdir(bindir)
+        write_script(os.path.join(bindir, 'python'), 'echo "broken" >> %s\nexit 1\n' % python_log)
+        os.environ['PATH'] = os.pathsep.join([bindir, os.getenv('PATH', '')])
+        for _ in range(2):
+            res = pick_python_cmd(sys.version_info[0])
+            self.assertTrue(res is not None)
+            self.assertNotEqual(res, os.path.join(bindir, 'python'))
+        self.assertEqual(read_file(python_log).count('broken'), 2)
+
+    def test_pythonpackage_pip_version(self):
+        """Test determining pip version."""
+        pip = os.path.join(self.tmpdir, 'pip')
+        pip_log = os.path.join(self.tmpdir, 'pip.log')
+        write_script(pip, 'echo "$@" >> %s\necho "pip $(cat $PYTHONPATH/pip_version) from $PYTHONPATH"\n' % pip_log)
+
+        # pip version depends on pip package that is picked up via $PYTHONPATH
+        for (subdir, version) in [('one', '9.0.1'), ('two', '18.0')]:
+            write_file(os.path.join(self.tmpdir, subdir, 'pip_version'), version)
+
+        os.environ['PYTHONPATH'] = os.path.join(self.tmpdir, 'one')
+        self.assertEqual(det_pip_version(pip), '9.0.1')
+        self.assertEqual(det_pip_version(pip), '9.0.1')
+        self.assertEqual(len(read_file(pip_log).splitlines()), 1)
+
+        os.environ['PYTHONPATH'] = os.path.join(self.tmpdir, 'two')
+        self.assertEqual(det_pip_version(pip), '18.0')
+        os.environ['PYTHONPATH'] = os.path.join(self.tmpdir, 'one')
+        self.assertEqual(det_pip_version(pip), '9.0.1')
+        self.assertEqual(len(read_file(pip_log).splitlines()), 2)
+
+        # pip version is not cached on disk
+        self.assertFalse(os.path.exists(os.path.join(self.cache_dir, PYTHON_PROBE_CACHE)))
+        pythonpackage._pip_version_cache.clear()
+        self.assertEqual(det_pip_version(pip), '9.0.1')
+        self.assertEqual(len(read_file(pip_log).splitlines()), 3)
+
+        write_script(pip, 'echo "this is not pip"\n')
+        pythonpackage._pip_version_cache.clear()
+        self.assertEqual(det_pip_version(pip), None)
+
+    def test_pythonpackage_batch_install(self):
+        """Test installing Python extensions in batch, with a single 'pip install' command."""
+        pip_log = self.setup_fake_pip()
+        master = self.init_easyblock('Bundle', extratxt="exts_batch_install = True")
+
+        exts = self.init_python_exts(master, ['one', 'two', 'three'])
+        master.python_exts_batch = exts[:]
+        exts[0].install_batch()
+        self.assertEqual(master.python_exts_batch, [])
+
+        # all extensions are installed with a single 'pip install' command
+        pip_cmds = [line for line in read_file(pip_log).splitlines() if ' install ' in line]
+        self.assertEqual(len(pip_cmds), 1)
+        self.assertTrue(pip_cmds[0].endswith(' '.join(ext.batch_install_loc for ext in exts)))
+
+        # output of batch installation is attributed to the right extension
+        for ext in exts:
+            self.assertTrue("Processing %s" % ext.batch_install_loc in ext.install_cmd_output)
+            for other_ext in exts:
+                if other_ext is not ext:
+                    self.assertFalse(other_ext.batch_install_loc in ext.install_cmd_output)
+            self.assertTrue("Successfully installed" in ext.install_cmd_output)
+
+        # batch is split if an extension is required at build time by an earlier extension in the batch
+        write_file(pip_log, '')
+        exts[2].ext_setup_deps = ['one']
+        master.python_exts_batch = exts[:]
+        exts[0].install_batch()
+        pip_cmds = [line for line in read_file(pip_log).splitlines() if ' install ' in line]
+        self.assertEqual(len(pip_cmds), 2)
+        self.assertTrue(pip_cmds[0].endswith(' '.join(ext.batch_install_loc for ext in exts[:2])))
+        self.assertTrue(pip_cmds[1].startswith(exts[2].batch_install_cwd + ' '))
+        self.assertTrue(pip_cmds[1].endswith(' .'))
+
+    def test_pythonpackage_batch_install_fallback(self):
+        """Test falling back to installing Python extensions one by one if batch installation fails."""
+        pip_log = self.setup_fake_pip()
+        master = self.init_easyblock('Bundle', extratxt="exts_batch_install = True")
+
+        exts = self.init_python_exts(master, ['one', 'two', 'three'])
+        write_file(os.path.join(exts[1].batch_install_cwd, 'FAIL'), '')
+        master.python_exts_batch = exts[:]
+
+        # failure is attributed to the extension that fails to install
+        self.assertErrorRegex(EasyBuildError, "Failed to install %s" % exts[1].batch_install_cwd,
+                              exts[0].install_batch)
+        pip_cmds = [line for line in read_file(pip_log).splitlines() if ' install ' in line]
+        self.assertEqual(len(pip_cmds), 3)
+        self.assertTrue(pip_cmds[1].startswith(exts[0].batch_install_cwd + ' '))
+        self.assertTrue(pip_cmds[2].startswith(exts[1].batch_install_cwd + ' '))
+        self.assertEqual(exts[0].install_cmd_output.strip().splitlines()[0],
+                         "Processing %s" % exts[0].batch_install_cwd)
+
+    def test_pythonpackage_batch_install_ok(self):
+        """Test checking whether Python extensions can be installed in batch."""
+        master = self.init_easyblock('Bundle')
+        self.assertFalse(self.init_python_exts(master, ['one'])[0].batch_install_ok())
+
+        master = self.init_easyblock('Bundle', extratxt="exts_batch_install = True")
+        options = {
+            'nopip': {'use_pip': False},
+            'preinstallopts': {'preinstallopts': 'export FOO=bar && '},
+        }
+        exts = self.init_python_exts(master, ['one', 'nopip', 'preinstallopts'], options=options)
+        master.python_exts_batch = []
+        self.assertEqual([ext.batch_install_ok() for ext in exts], [True, False, False])
+
+        # different installation options start a new batch
+        pip_log = self.setup_fake_pip()
+        exts = self.init_python_exts(master, ['one', 'two'], options={'two': {'installopts': '--no-compile'}})
+        master.python_exts_batch = [exts[0]]
+        self.assertTrue(exts[1].batch_install_ok())
+        self.assertEqual(master.python_exts_batch, [])
+        self.assertTrue(read_file(pip_log).strip().endswith(' .'))
+
+    def test_pythonpackage_batch_install_tests(self):
+        """Test whether queued Python extensions are installed before running tests for an extension."""
+        pip_log = self.setup_fake_pip()
+        master = self.init_easyblock('Bundle', extratxt="exts_batch_install = True")
+
+        # create source tarball for extension that will be tested
+        srcdir = os.path.join(self.tmpdir, 'src', 'tested-1.0')
+        write_file(os.path.join(srcdir, 'setup.py'), "from setuptools import setup; setup()")
+        tarball = os.path.join(self.tmpdir, 'tested-1.0.tar.gz')
+        change_dir(os.path.dirname(srcdir))
+        os.system("tar cfz %s tested-1.0" % tarball)
+
+        queued = self.init_python_exts(master, ['one', 'two'])
+        master.python_exts_batch = queued[:]
+
+        # test command checks whether queued extensions were already installed
+        test_log = os.path.join(self.tmpdir, 'test.log')
+        testcmd = "grep ' install ' %s | grep -c '%s' > %s" % (pip_log, queued[1].batch_install_loc, test_log)
+        ext = PythonPackage(master, {'name': 'tested', 'version': '1.0', 'src': tarball,
+                                     'options': {'use_pip': True, 'runtest': testcmd}})
+        ext.python_cmd = sys.executable
+        ext.set_pylibdirs()
+        master.ext_instances, master.exts = [], []
+        ext.run()
+
+        self.assertEqual(read_file(test_log).strip(), '1')
+        self.assertEqual(master.python_exts_batch, [ext])
+        self.assertTrue(ext.has_tests())
+        self.assertFalse(queued[0].has_tests())
+
+    def test_pythonpackage_wheel_cache(self):
+        """Test use of wheel cache for Python packages."""
+        pip_log = self.setup_fake_pip()
+        tarball = os.path.join(self.tmpdir, 'one-1.0.tar.gz')
+        write_file(tarball, 'not really a tarball')
+
+        def init_ext(extratxt=''):
+            """Create PythonPackage instance for extension 'one', with wheel cache enabled."""
+            master = self.init_easyblock('Bundle', extratxt=extratxt)
+            master.ext_instances = []
+            ext = self.init_python_exts(master, ['one'], options={'one': {'use_wheel_cache': True}})[0]
+            ext.src = tarball
+            change_dir(ext.batch_install_cwd)
+            return ext
+
+        # key for wheel cache depends on dependencies, and on extensions that were installed earlier
+        ext = init_ext()
+        key = ext.det_wheel_cache_key()
+        self.assertEqual(init_ext().det_wheel_cache_key(), key)
+        self.assertNotEqual(init_ext(extratxt='dependencies = [("bar", "1.0")]').det_wheel_cache_key(), key)
+        ext.master.ext_instances = self.init_python_exts(ext.master, ['zero'])
+        self.assertNotEqual(ext.det_wheel_cache_key(), key)
+
+        # wheel is built in build directory (not in /tmp), and stored in the cache
+        ext = init_ext()
+        ext.build_step()
+        wheel_cmds = [line for line in read_file(pip_log).splitlines() if ' wheel ' in line]
+        self.assertEqual(len(wheel_cmds), 1)
+        self.assertTrue(' --wheel-dir=%s' % os.path.join(ext.builddir, 'wheel-') in wheel_cmds[0])
+        self.assertEqual([x for x in os.listdir(ext.builddir) if x.startswith('wheel-')], [])
+        self.assertTrue(ext.wheel_path.startswith(os.path.join(self.det_cache_dir('wheels'), key)))
+        self.assertEqual(ext.det_install_location(), ext.wheel_path)
+        self.assertEqual(ext.master.wheel_cache_stats, {'hits': [], 'misses': ['one']})
+
+        # no wheel is built on cache hit
+        ext = init_ext()
+        ext.build_step()
+        self.assertEqual(len([line for line in read_file(pip_log).splitlines() if ' wheel ' in line]), 1)
+        self.assertTrue(ext.wheel_path.startswith(os.path.join(self.det_cache_dir('wheels'), key)))
+        # statistics for wheel cache are kept track of per parent easyblock
+        self.assertEqual(ext.master.wheel_cache_stats, {'hits': ['one'], 'misses': []})
+
+    def test_pythonpackage_det_install_requires(self):
+        """Test determining requirements of Python packages."""
+        pkgdir = os.path.join(self.tmpdir, 'pkg')
+        setup_py = os.path.join(pkgdir, 'setup.py')
+        write_file(setup_py, "setup(name='foo', install_requires=['numpy>=1.10', \"Six\", 'python_dateutil'])")
+        self.assertEqual(det_install_requires(pkgdir), ['numpy', 'six', 'python-dateutil'])
+
+        # setup.cfg has precedence over setup.py
+        write_file(os.path.join(pkgdir, 'setup.cfg'), '\n'.join([
+            "[metadata]",
+            "name = foo",
+            "[options]",
+            "install_requires =",
+            "    scipy",
+            "    pandas >= 0.20",
+        ]))
+        self.assertEqual(det_install_requires(pkgdir), ['scipy', 'pandas'])
+
+        # *.egg-info metadata has precedence over everything else, extras are not taken into account
+        write_file(os.path.join(pkgdir, 'foo.egg-info', 'requires.txt'), "mpi4py\n\n[test]\npytest\n")
+        self.assertEqual(det_install_requires(pkgdir), ['mpi4py'])
+
+        self.assertEqual(det_install_requires(os.path.join(self.tmpdir, 'nosuchpkg')), [])
+
+    def test_pythonpackage_merge_staged_install(self):
+        """Test merging of installation in staging directory into installation directory."""
+        staging_dir, target_dir = os.path.join(self.tmpdir, 'staging'), os.path.join(self.tmpdir, 'target')
+        write_file(os.path.join(staging_dir, 'lib', 'foo', '__init__.py'), "# new")
+        write_file(os.path.join(staging_dir, 'lib', 'easy-install.pth'), "./foo.egg\n./bar.egg\n")
+        write_file(os.path.join(staging_dir, 'bin', 'foo'), "foo")
+        os.symlink('foo', os.path.join(staging_dir, 'bin', 'foo-link'))
+        os.symlink('foo', os.path.join(staging_dir, 'lib', 'foo-link'))
+
+        write_file(os.path.join(target_dir, 'lib', 'foo', '__init__.py'), "# old")
+        write_file(os.path.join(target_dir, 'lib', 'easy-install.pth'), "./bar.egg\n./baz.egg\n")
+        write_file(os.path.join(target_dir, 'lib', 'baz.py'), "# baz")
+        os.symlink('baz.py', os.path.join(target_dir, 'lib', 'foo-link'))
+
+        merge_staged_install(staging_dir, target_dir)
+
+        self.assertEqual(read_file(os.path.join(target_dir, 'lib', 'foo', '__init__.py')), "# new")
+        self.assertEqual(read_file(os.path.join(target_dir, 'lib', 'baz.py')), "# baz")
+        # *.pth files are merged rather than overwritten
+        pth_lines = read_file(os.path.join(target_dir, 'lib', 'easy-install.pth')).splitlines()
+        self.assertEqual(pth_lines, ['./bar.egg', './baz.egg', './foo.egg'])
+        # symlinks are copied as symlinks (also symlinks to directories)
+        self.assertEqual(os.readlink(os.path.join(target_dir, 'bin', 'foo-link')), 'foo')
+        self.assertEqual(os.readlink(os.path.join(target_dir, 'lib', 'foo-link')), 'foo')
+        self.assertTrue(os.path.isdir(os.path.join(target_dir, 'lib', 'foo-link')))
+
+    def test_pythonpackage_parallel_install(self):
+        """Test installing Python extensions in parallel, taking into account dependencies."""
+        pip_log = self.setup_fake_pip()
+        master = self.init_easyblock('Bundle', extratxt="exts_parallel_install = True\nparallel = 4")
+
+        exts = self.init_python_exts(master, ['one', 'two', 'three', 'four'])
+        for ext in exts:
+            ext.installdir = master.installdir
+        # 'three' requires 'one' and 'two', 'four' requires an extension that is not part of this batch
+        write_file(os.path.join(exts[2].batch_install_cwd, 'REQUIRES'), "one\ntwo\n")
+        exts[2].ext_deps = ['one', 'two']
+        exts[3].ext_deps = ['numpy']
+
+        master.python_exts_batch = exts[:]
+        exts[0].install_batch()
+        self.assertEqual(master.python_exts_batch, [])
+
+        # one 'pip install' command per extension, each with a separate staging area as prefix
+        pip_cmds = [line for line in read_file(pip_log).splitlines() if ' install ' in line]
+        self.assertEqual(len(pip_cmds), 4)
+        prefixes = [cmd.split('--prefix=')[1].split(' ')[0] for cmd in pip_cmds]
+        self.assertEqual(len(set(prefixes)), 4)
+        for prefix in prefixes:
+            self.assertTrue(prefix.startswith(os.path.join(master.builddir, 'eb-staging-')))
+            self.assertFalse(prefix.startswith(master.installdir))
+        self.assertTrue(pip_cmds[-1].startswith(exts[2].batch_install_cwd + ' '))
+
+        # staging areas are merged into installation directory (and cleaned up)
+        installed = os.path.join(master.installdir, exts[0].pylibdir)
+        self.assertEqual(sorted(os.listdir(installed)), ['easy-install.pth', 'four.py', 'one.py', 'three.py', 'two.py'])
+        self.assertEqual(sorted(read_file(os.path.join(installed, 'easy-install.pth')).split()),
+                         ['four', 'one', 'three', 'two'])
+        self.assertEqual([x for x in os.listdir(master.builddir) if x.startswith('eb-staging-')], [])
+        for ext in exts:
+            self.assertTrue("Successfully installed" in ext.install_cmd_output)
+
+        # extensions that depend on an extension that failed to install are skipped
+        rmtree2(master.installdir)
+        write_file(pip_log, '')
+        write_file(os.path.join(exts[1].batch_install_cwd, 'FAIL'), '')
+        master.python_exts_batch = exts[:]
+        error_pattern = r"Failed to install extension\(s\) two in parallel \(skipped: three\)"
+        self.assertErrorRegex(EasyBuildError, error_pattern, exts[0].install_batch)
+        pip_cmds = [line for line in read_file(pip_log).splitlines() if ' install ' in line]
+        self.assertEqual(len(pip_cmds), 3)
+        self.assertEqual(sorted(os.listdir(installed)), ['easy-install.pth', 'four.py', 'one.py'])
+
+    def test_pythonpackage_relocate_install(self):
+        """Test relocating an installation of a Python package."""
+        old_prefix, new_prefix = os.path.join(self.tmpdir, 'old'), os.path.join(self.tmpdir, 'new')
+        script, pth_file = os.path.join(old_prefix, 'bin', 'foo'), os.path.join(old_prefix, 'lib', 'foo.pth')
+        pyc_file, libfoo = os.path.join(old_prefix, 'lib', 'foo.pyc'), os.path.join(old_prefix, 'lib', 'libfoo.so')
+        write_file(script, "#!%s/bin/python\nimport foo\n" % old_prefix)
+        write_file(pth_file, "%s/lib/foo.egg\n" % old_prefix)
+        write_file(pyc_file, "\0\0%s/lib/foo.py\0" % old_prefix)
+        write_file(libfoo, "\0ELF\0RPATH=/usr/lib\0")
+
+        # files are scanned in chunks, text spanning two chunks is found too
+        self.assertEqual(scan_file(script, old_prefix), (True, False))
+        self.assertEqual(scan_file(script, old_prefix, chunk_size=7), (True, False))
+        self.assertEqual(scan_file(script, new_prefix, chunk_size=7), (False, False))
+        self.assertEqual(scan_file(pyc_file, old_prefix, chunk_size=4), (True, True))
+        self.assertEqual(scan_file(libfoo, old_prefix), (False, True))
+
+        self.assertEqual(relocate_install(old_prefix, old_prefix, new_prefix), [pyc_file])
+        self.assertEqual(read_file(script), "#!%s/bin/python\nimport foo\n" % new_prefix)
+        self.assertEqual(read_file(pth_file), "%s/lib/foo.egg\n" % new_prefix)
+        self.assertFalse(os.path.exists(pyc_file))
+        self.assertEqual(read_file(libfoo), "\0ELF\0RPATH=/usr/lib\0")
+
+        # binary files that refer to old prefix can not be relocated, nothing is changed in that case
+        write_file(pth_file, "%s/lib/foo.egg\n" % old_prefix)
+        write_file(libfoo, "\0ELF\0RPATH=%s/lib\0" % old_prefix)
+        error_pattern = "Binary files that refer to %s can not be relocated: %s" % (old_prefix, libfoo)
+        self.assertErrorRegex(EasyBuildError, error_pattern, relocate_install, old_prefix, old_prefix, new_prefix)
+        self.assertEqual(read_file(pth_file), "%s/lib/foo.egg\n" % old_prefix)
+
+    def test_pythonpackage_promote_test_install(self):
+        """Test promoting test installation of Python package to installation directory."""
+        pip_log = self.setup_fake_pip()
+        master = self.init_easyblock('Bundle')
+        ext = self.init_python_exts(master, ['one'], options={'one': {'reuse_test_install': True}})[0]
+        ext.installdir = master.installdir
+        change_dir(ext.batch_install_cwd)
+
+        testinstalldir = os.path.join(self.tmpdir, 'testinstall')
+        write_file(os.path.join(testinstalldir, 'bin', 'one'), "#!%s/bin/python" % testinstalldir)
+        ext.reusable_test_install = (testinstalldir, "output of test installation")
+        ext.install_step()
+
+        self.assertEqual(read_file(os.path.join(ext.installdir, 'bin', 'one')), "#!%s/bin/python" % ext.installdir)
+        self.assertEqual(ext.install_cmd_output, "output of test installation")
+        self.assertFalse(os.path.exists(testinstalldir))
+        self.assertEqual([line for line in read_file(pip_log).splitlines() if ' install ' in line], [])
+
+        # test installation that includes binary file that refers to it is not promoted, but installed again
+        rmtree2(ext.installdir)
+        write_file(os.path.join(testinstalldir, 'bin', 'one'), "#!%s/bin/python" % testinstalldir)
+        write_file(os.path.join(testinstalldir, 'lib', 'libone.so'), "\0ELF\0RPATH=%s/lib\0" % testinstalldir)
+        ext.reusable_test_install = (testinstalldir, "output of test installation")
+        ext.install_step()
+
+        self.assertFalse(os.path.exists(os.path.join(ext.installdir, 'lib', 'libone.so')))
+        self.assertFalse(os.path.exists(testinstalldir))
+        self.assertTrue("Successfully installed" in ext.install_cmd_output)
+        pip_cmds = [line for line in read_file(pip_log).splitlines() if ' install ' in line]
+        self.assertEqual(len(pip_cmds), 1)
+        self.assertTrue(' --prefix=%s ' % ext.installdir in pip_cmds[0])
+
+    def test_pythonpackage_parallel_build_ext_pip(self):
+        """Test building extensions in parallel when installing Python packages with pip."""
+        pip_log = self.setup_fake_pip()
+        master = self.init_easyblock('Bundle', extratxt="parallel = 4")
+        exts = self.init_python_exts(master, ['one', 'two'])
+
+        # packages that do not use numpy.distutils are not probed for build_ext --parallel support
+        python_log = os.path.join(self.tmpdir, 'python.log')
+        fake_python = os.path.join(self.tmpdir, 'fake_python')
+        write_script(fake_python, 'echo "$@" >> %s; exit 1' % python_log)
+        for ext in exts:
+            ext.python_cmd = fake_python
+            ext.installdir = master.installdir
+
+        write_file(os.path.join(exts[0].batch_install_cwd, 'setup.py'), "from setuptools import setup")
+        write_file(os.path.join(exts[1].batch_install_cwd, 'setup.py'), "from numpy.distutils.core import setup")
+        for ext in exts:
+            change_dir(ext.batch_install_cwd)
+            ext.build_step()
+        self.assertFalse(os.path.exists(python_log))
+        self.assertEqual([ext.parallel_build_env for ext in exts], ['', 'NPY_NUM_BUILD_JOBS=4'])
+
+        # $NPY_NUM_BUILD_JOBS is defined for 'pip install', also when installing in batch
+        for ext in exts:
+            ext.python_cmd = sys.executable
+            change_dir(ext.batch_install_cwd)
+            ext.install_step()
+        master.python_exts_batch = exts[:]
+        exts[0].install_batch_part(exts)
+        self.assertEqual([line for line in read_file(pip_log).splitlines() if line.startswith('NPY_')],
+                         ['NPY_NUM_BUILD_JOBS=4', 'NPY_NUM_BUILD_JOBS=4'])
+
+        # $NPY_NUM_BUILD_JOBS is left alone if it's already defined
+        exts = self.init_python_exts(master, ['three'], options={'three': {'preinstallopts': 'NPY_NUM_BUILD_JOBS=2'}})
+        change_dir(exts[0].batch_install_cwd)
+        write_file('setup.py', "from numpy.distutils.core import setup")
+        exts[0].build_step()
+        self.assertEqual(exts[0].parallel_build_env, '')
+
+
+def suite():
+    """Return all tests for the PythonPackage easyblock."""
+    init_config()
+    return TestLoader().loadTestsFromTestCase(PythonPackageTest)
+
+
+if __name__ == '__main__':
+    main()
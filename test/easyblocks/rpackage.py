@@ -0,0 +1,210 @@
+##
+# Copyright 2018-2018 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+##
+"""
+Unit tests for the RPackage easyblock (easybuild.easyblocks.generic.rpackage).
+"""
+import glob
+import os
+from unittest import TestLoader, main
+
+from easybuild.easyblocks.generic.rpackage import RPackage, det_R_package_deps
+from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.filetools import read_file, write_file
+from test.easyblocks.utilities import EasyblockTestCase, init_config
+
+
+class RPackageTest(EasyblockTestCase):
+    """Tests for the RPackage easyblock (easybuild.easyblocks.generic.rpackage)."""
+
+    def test_rpackage_batch_install(self):
+        """Test installing R extensions in batch, in a single R session."""
+        r_log = self.setup_fake_r()
+        if 'MAKEFLAGS' in os.environ:
+            del os.environ['MAKEFLAGS']
+        master = self.init_easyblock('Bundle', extratxt="exts_batch_install = True\nparallel = 3")
+
+        exts = self.init_r_exts(master, ['foo', 'bar', 'baz'])
+        master.r_exts_batch = exts[:]
+        exts[0].install_batch()
+        self.assertEqual(master.r_exts_batch, [])
+
+        # packages are installed with a single install.packages call, compilation is done in parallel
+        r_cmds = read_file(r_log).splitlines()
+        self.assertEqual(r_cmds[0], "MAKEFLAGS=-j3 -q --no-save")
+        r_script = '\n'.join(r_cmds[1:])
+        self.assertEqual(r_script.count('install.packages('), 1)
+        for ext in exts:
+            self.assertTrue('"%s"' % ext.ext_src in r_script)
+        self.assertTrue('repos=NULL' in r_script)
+        self.assertFalse('Ncpus' in r_script)
+
+        # $MAKEFLAGS is left alone if it's already defined
+        write_file(r_log, '')
+        os.environ['MAKEFLAGS'] = '-j2'
+        master.r_exts_batch = exts[:]
+        exts[0].install_batch()
+        self.assertEqual(read_file(r_log).splitlines()[0], "MAKEFLAGS=-j2 -q --no-save")
+
+        # packages with errors are removed and installed again one by one, so the failure is attributed correctly
+        write_file(r_log, '')
+        exts = self.init_r_exts(master, ['foo', 'barFAIL', 'baz'])
+        master.r_exts_batch = exts[:]
+        error_pattern = "Errors detected during installation of R package barFAIL"
+        self.assertErrorRegex(EasyBuildError, error_pattern, exts[0].install_batch)
+        r_log_txt = read_file(r_log)
+        self.assertEqual(r_log_txt.count('install.packages('), 1)
+        self.assertEqual(r_log_txt.count('remove.library('), 2)
+        self.assertFalse('remove.library(foo)' in r_log_txt)
+        self.assertFalse('remove.library(baz)' in r_log_txt)
+        cmd_install = 'CMD INSTALL %s' % exts[1].ext_src
+        self.assertEqual(len([line for line in r_log_txt.splitlines() if cmd_install in line]), 1)
+
+    def test_rpackage_det_deps(self):
+        """Test determining dependencies of R packages."""
+        description = '\n'.join([
+            "Package: foo",
+            "Version: 1.0",
+            "Depends: R (>= 3.1.0), methods",
+            "Imports: Rcpp (>= 0.12.0),",
+            "    stats, utils,",
+            "\tbar",
+            "LinkingTo: Rcpp, RcppArmadillo",
+            "Suggests: testthat",
+        ])
+        expected = ['methods', 'Rcpp', 'stats', 'utils', 'bar', 'RcppArmadillo']
+
+        # dependencies can be determined from source tarball or directory
+        tarball = self.write_r_tarball('foo', description)
+        self.assertEqual(det_R_package_deps(tarball), expected)
+        self.assertEqual(det_R_package_deps(os.path.join(self.tmpdir, 'unpacked', 'foo')), expected)
+
+        # no errors for invalid/missing sources
+        write_file(os.path.join(self.tmpdir, 'sources', 'bar_1.0.tar.gz'), 'this is not a tarball')
+        self.assertEqual(det_R_package_deps(os.path.join(self.tmpdir, 'sources', 'bar_1.0.tar.gz')), [])
+        self.assertEqual(det_R_package_deps(os.path.join(self.tmpdir, 'nosuchpkg')), [])
+
+    def test_rpackage_parallel_install(self):
+        """Test installing R extensions in parallel, taking into account dependencies."""
+        r_log = self.setup_fake_r()
+        master = self.init_easyblock('Bundle', extratxt="exts_parallel_install = True\nparallel = 3")
+
+        deps = {'bar': ['foo', 'Rcpp'], 'baz': ['bar']}
+        exts = self.init_r_exts(master, ['foo', 'bar', 'baz', 'qux'], deps=deps)
+        master.r_exts_batch = exts[:]
+        exts[0].install_batch()
+        self.assertEqual(master.r_exts_batch, [])
+
+        # one 'R CMD INSTALL' command per extension, dependencies are installed first
+        installed = [line.split()[3] for line in read_file(r_log).splitlines() if ' CMD INSTALL ' in line]
+        self.assertEqual(sorted(installed), sorted(ext.ext_src for ext in exts))
+        for (dep, ext) in [(exts[0], exts[1]), (exts[1], exts[2])]:
+            self.assertTrue(installed.index(dep.ext_src) < installed.index(ext.ext_src))
+
+        # failing to install an extension only prevents installing the extensions that depend on it
+        write_file(r_log, '')
+        deps = {'barFAIL': ['foo'], 'baz': ['barFAIL']}
+        exts = self.init_r_exts(master, ['foo', 'barFAIL', 'baz', 'qux'], deps=deps)
+        master.r_exts_batch = exts[:]
+        error_pattern = r"Failed to install R extension\(s\) barFAIL in parallel \(skipped: baz\)"
+        self.assertErrorRegex(EasyBuildError, error_pattern, exts[0].install_batch)
+
+        r_log_txt = read_file(r_log)
+        installed = sorted(line.split()[3] for line in r_log_txt.splitlines() if ' CMD INSTALL ' in line)
+        self.assertEqual(installed, sorted([exts[0].ext_src, exts[1].ext_src, exts[3].ext_src]))
+        self.assertTrue('remove.library(barFAIL)' in r_log_txt)
+
+    def test_rpackage_binary_cache(self):
+        """Test use of binary package cache for R packages."""
+        r_log = self.setup_fake_r()
+        master = self.init_easyblock('Bundle')
+        cache_dir = os.path.join(self.tmpdir, 'R-binaries')
+
+        def init_ext(name, tarball=None):
+            """Create RPackage instance for specified extension, with binary package cache enabled."""
+            if tarball:
+                # use existing source tarball, so key for binary package cache is the same
+                ext = RPackage(master, {'name': name, 'version': '1.0', 'src': tarball})
+                ext.lib_install_prefix = os.path.join(master.installdir, 'library')
+                ext.ext_src = tarball
+            else:
+                ext = self.init_r_exts(master, [name])[0]
+            ext.cfg['use_binary_cache'] = True
+            ext.cfg['binary_cache_dir'] = cache_dir
+            return ext
+
+        def binary_build_dirs():
+            """Return list of directories in which binary packages are built."""
+            return glob.glob(os.path.join(master.builddir, 'R-binary-*'))
+
+        # cache miss, binary package is built in build directory and stored in cache
+        ext = init_ext('foo')
+        ext.lookup_binary_cached()
+        self.assertEqual(ext.binary_build_dir, os.path.join(master.builddir, 'R-binary-foo'))
+        # composing the install command does not create any directories
+        (cmd, _) = ext.make_cmdline_cmd(prefix=ext.lib_install_prefix)
+        self.assertTrue(cmd.startswith("mkdir -p %s && cd %s && " % (ext.binary_build_dir, ext.binary_build_dir)))
+        self.assertTrue(cmd.endswith(' --build'))
+        self.assertEqual(binary_build_dirs(), [])
+
+        ext.install_R_package(cmd)
+        cached = glob.glob(os.path.join(cache_dir, '*', 'foo_1.0_R_*.tar.gz'))
+        self.assertEqual(len(cached), 1)
+        self.assertEqual(binary_build_dirs(), [])
+        self.assertEqual(ext.binary_build_dir, None)
+
+        # cache hit, binary package is installed
+        ext = init_ext('foo', tarball=ext.src)
+        ext.lookup_binary_cached()
+        self.assertEqual(ext.binary_path, cached[0])
+        self.assertEqual(ext.binary_build_dir, None)
+        (cmd, _) = ext.make_cmdline_cmd(prefix=ext.lib_install_prefix)
+        self.assertTrue("R CMD INSTALL %s " % cached[0] in cmd)
+        self.assertFalse("--build" in cmd)
+
+        # directory in which binary package is built is also cleaned up when installation fails
+        ext = init_ext('barFAIL')
+        ext.lookup_binary_cached()
+        (cmd, _) = ext.make_cmdline_cmd(prefix=ext.lib_install_prefix)
+        self.assertErrorRegex(EasyBuildError, "Errors detected", ext.install_R_package, cmd)
+        self.assertEqual(binary_build_dirs(), [])
+        self.assertEqual(glob.glob(os.path.join(cache_dir, '*', 'barFAIL_*')), [])
+
+        # binary package cache is not used in dry run mode
+        write_file(r_log, '')
+        ext = init_ext('baz')
+        ext.dry_run = True
+        ext.install_step()
+        self.assertEqual(ext.binary_cache_key, None)
+        self.assertEqual(binary_build_dirs(), [])
+
+
+def suite():
+    """Return all tests for the RPackage easyblock."""
+    init_config()
+    return TestLoader().loadTestsFromTestCase(RPackageTest)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+##
+# Copyright 2018-2018 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+##
+"""
+Unit tests for the RubyGem easyblock (easybuild.easyblocks.generic.rubygem).
+"""
+import os
+from unittest import TestLoader, main
+
+from easybuild.easyblocks.generic.pythonpackage import PythonPackage
+from easybuild.easyblocks.generic.rpackage import RPackage
+from easybuild.easyblocks.generic.rubygem import RubyGem
+from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.filetools import mkdir, read_file, write_file
+from test.easyblocks.utilities import EasyblockTestCase, init_config, write_script
+
+
+# fake 'gem' command, which keeps track of how it was called,
+# and fails to install gems that have 'FAIL' in the name of their gem file
+FAKE_GEM = '\n'.join([
+    'echo "$@" >> %(log)s',
+    'ec=0',
+    'for arg in "$@"; do',
+    '    if [[ $arg == *.gem ]]; then',
+    '        if [[ $arg == *FAIL* ]]; then echo "ERROR: failed to install $arg"; ec=1;',
+    '        else echo "Successfully installed $(basename $arg .gem)"; fi',
+    '    fi',
+    'done',
+    'exit $ec',
+])
+
+
+class RubyGemTest(EasyblockTestCase):
+    """Tests for the RubyGem easyblock (easybuild.easyblocks.generic.rubygem)."""
+
+    def test_rubygem_batch_install(self):
+        """Test installing Ruby gems in batch, with a single 'gem install' command."""
+        bindir = os.path.join(self.tmpdir, 'fake_gem_bin')
+        gem_log = os.path.join(self.tmpdir, 'gem.log')
+        mkdir(bindir, parents=True)
+        write_file(gem_log, '')
+        write_script(os.path.join(bindir, 'gem'), FAKE_GEM % {'log': gem_log})
+        os.environ['PATH'] = os.pathsep.join([bindir, os.getenv('PATH', '')])
+        os.environ['EBROOTRUBY'] = self.tmpdir
+        if 'MAKEFLAGS' in os.environ:
+            del os.environ['MAKEFLAGS']
+
+        master = self.init_easyblock('Bundle', extratxt="exts_batch_install = True\nparallel = 1")
+        master.cfg['exts_defaultclass'] = 'RubyGem'
+
+        # only extensions that will be installed with RubyGem are candidates for batch installation
+        self.assertTrue(RubyGem.is_batch_install_candidate({'name': 'one'}, 'RubyGem'))
+        self.assertFalse(RubyGem.is_batch_install_candidate({'name': 'one'}, 'PythonPackage'))
+        pip_ext = {'name': 'one', 'options': {'easyblock': 'PythonPackage', 'use_pip': True}}
+        self.assertFalse(RubyGem.is_batch_install_candidate(pip_ext, 'RubyGem'))
+        self.assertTrue(PythonPackage.is_batch_install_candidate(pip_ext, 'RubyGem'))
+        self.assertFalse(PythonPackage.is_batch_install_candidate({'name': 'one'}, 'PythonPackage'))
+        self.assertFalse(RPackage.is_batch_install_candidate({'name': 'one', 'options': {'patches': ['x.patch']}},
+                                                             'RPackage'))
+
+        master.exts = []
+        for name in ['one', 'two', 'bar', 'three']:
+            master.exts.append({'name': name, 'version': '1.0', 'src': os.path.join(self.tmpdir, '%s-1.0.gem' % name)})
+        master.exts[2]['options'] = {'easyblock': 'ConfigureMake'}
+        master.ext_instances = []
+
+        def install_ext(idx):
+            """Install extension with specified index, like the parent does."""
+            ext = RubyGem(master, master.exts[idx])
+            ext.run()
+            ext.postrun()
+            master.ext_instances.append(ext)
+
+        # first gem is queued, since next extension is a candidate for batch installation
+        install_ext(0)
+        self.assertEqual(read_file(gem_log), '')
+        self.assertEqual([ext.name for ext in master.ruby_exts_batch], ['one'])
+
+        # batch is installed once next extension is not a candidate
+        install_ext(1)
+        self.assertEqual(master.ruby_exts_batch, [])
+        gem_cmds = read_file(gem_log).splitlines()
+        self.assertEqual(len(gem_cmds), 1)
+        self.assertTrue(gem_cmds[0].startswith('install --bindir '))
+        self.assertTrue(gem_cmds[0].endswith(' --local --ignore-dependencies %s %s' % tuple(
+            ext['src'] for ext in master.exts[:2])))
+
+        # batch is also installed for the last extension
+        master.ext_instances.append(None)
+        install_ext(3)
+        self.assertEqual(master.ruby_exts_batch, [])
+        self.assertEqual(len(read_file(gem_log).splitlines()), 2)
+
+        # command to install gems does not start with whitespace when $MAKEFLAGS is not set
+        cmd = master.ext_instances[-1].compose_install_cmd(['four-1.0.gem'])
+        self.assertTrue(cmd.startswith('gem install --bindir '))
+        os.environ['MAKEFLAGS'] = '-j2'
+        master.cfg['parallel'] = 4
+        self.assertTrue(master.ext_instances[-1].compose_install_cmd(['four-1.0.gem']).startswith('gem install '))
+
+        # gems that fail to install in batch are installed again one by one
+        write_file(gem_log, '')
+        master.exts[1]['src'] = os.path.join(self.tmpdir, 'twoFAIL-1.0.gem')
+        master.ext_instances = []
+        install_ext(0)
+        self.assertErrorRegex(EasyBuildError, "cmd .* exited with exit code 1", install_ext, 1)
+        gem_cmds = read_file(gem_log).splitlines()
+        self.assertEqual(len(gem_cmds), 2)
+        self.assertTrue(gem_cmds[1].endswith(' --local %s' % master.exts[1]['src']))
+
+
+def suite():
+    """Return all tests for the RubyGem easyblock."""
+    init_config()
+    return TestLoader().loadTestsFromTestCase(RubyGemTest)
+
+
+if __name__ == '__main__':
+    main()
@@ -41,9 +41,23 @@ from vsc.utils import fancylogger
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.options import set_tmpdir
 
+import test.easyblocks.bundle as b
+import test.easyblocks.cache as c
+import test.easyblocks.clang as cl
+import test.easyblocks.cmakemake as cmk
+import test.easyblocks.configuremake as cm
+import test.easyblocks.dag as d
 import test.easyblocks.general as g
 import test.easyblocks.init_easyblocks as i
+import test.easyblocks.memory as mem
 import test.easyblocks.module as m
+import test.easyblocks.octavepackage as o
+import test.easyblocks.perlmodule as pm
+import test.easyblocks.profiling as p
+import test.easyblocks.python as py
+import test.easyblocks.pythonpackage as pp
+import test.easyblocks.rpackage as r
+import test.easyblocks.rubygem as rg
 
 # initialize logger for all the unit tests
 fd, log_fn = tempfile.mkstemp(prefix='easybuild-easyblocks-tests-', suffix='.log')
@@ -62,7 +76,7 @@ except EasyBuildError, err:
 os.environ['EASYBUILD_TMP_LOGDIR'] = tempfile.mkdtemp(prefix='easyblocks_test_')
 
 # call suite() for each module and then run them all
-SUITE = unittest.TestSuite([x.suite() for x in [g, i, m]])
+SUITE = unittest.TestSuite([x.suite() for x in [g, i, m, b, c, cl, cmk, cm, d, mem, o, p, pm, py, pp, r, rg]])
 
 # uses XMLTestRunner if possible, so we can output an XML file that can be supplied to Jenkins
 xml_msg = ""
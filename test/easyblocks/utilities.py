@@ -0,0 +1,291 @@
+##
+# Copyright 2018-2018 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+##
+"""
+Shared functionality for unit tests of specific easyblocks.
+"""
+import copy
+import os
+import shutil
+import stat
+import sys
+import tarfile
+import tempfile
+from vsc.utils.testing import EnhancedTestCase
+
+import easybuild.easyblocks.generic.configuremake as configuremake
+import easybuild.easyblocks.generic.pythonpackage as pythonpackage
+import easybuild.tools.options as eboptions
+from easybuild.easyblocks.generic.pythonpackage import PythonPackage, det_python_facts
+from easybuild.easyblocks.generic.rpackage import RPackage
+from easybuild.framework.easyblock import EasyBlock
+from easybuild.framework.easyconfig.easyconfig import EasyConfig, get_easyblock_class
+from easybuild.tools import config
+from easybuild.tools.filetools import change_dir, mkdir, write_file
+from easybuild.tools.module_naming_scheme import GENERAL_CLASS
+from easybuild.tools.options import set_tmpdir
+
+
+TMPDIR = tempfile.gettempdir()
+
+# fake 'pip' command, which keeps track of how it was called,
+# and fails for packages that include a file named 'FAIL'
+FAKE_PIP = '\n'.join([
+    'echo "$PWD $@" >> %(log)s',
+    'if [ ! -z "$NPY_NUM_BUILD_JOBS" ]; then echo "NPY_NUM_BUILD_JOBS=$NPY_NUM_BUILD_JOBS" >> %(log)s; fi',
+    'if [ "$1" == "--version" ]; then echo "pip 10.0.1 from %(log)s"; exit 0; fi',
+    'if [ "$1" == "wheel" ]; then',
+    '    for arg in "$@"; do',
+    '        if [ "${arg:0:12}" == "--wheel-dir=" ]; then touch ${arg:12}/$(basename $PWD)-1.0-py2-none-any.whl; fi',
+    '    done',
+    '    exit 0',
+    'fi',
+    'for arg in "$@"; do',
+    '    if [ "${arg:0:9}" == "--prefix=" ]; then prefix=${arg:9}; fi',
+    '    if [ "$arg" == "." ]; then arg=$PWD; fi',
+    '    if [ -d "$arg" ]; then',
+    '        echo "Processing $arg"',
+    '        if [ -f "$arg/FAIL" ]; then echo "Failed to install $arg"; exit 1; fi',
+    # packages listed in REQUIRES must be available via $PYTHONPATH
+    '        for req in $(cat $arg/REQUIRES 2> /dev/null); do',
+    '            found=$(IFS=:; for path in $PYTHONPATH; do ls $path/$req.py 2> /dev/null; done)',
+    '            if [ -z "$found" ]; then echo "Requirement $req for $arg not found"; exit 1; fi',
+    '        done',
+    '        if [ ! -z "$prefix" ]; then',
+    '            mkdir -p $prefix/%(pylibdir)s',
+    '            touch $prefix/%(pylibdir)s/$(basename $arg).py',
+    '            echo $(basename $arg) >> $prefix/%(pylibdir)s/easy-install.pth',
+    '        fi',
+    '    fi',
+    'done',
+    'echo "Installing collected packages"',
+    'echo "Successfully installed"',
+])
+
+# fake configure script generated by Autoconf, which keeps track of how it was called (incl. contents of cache file),
+# and adds an entry for each argument (and one that refers to the current directory) to the cache file;
+# it fails if the cache file includes an entry for 'ac_cv_broken'
+FAKE_CONFIGURE = '\n'.join([
+    '# Generated by GNU Autoconf',
+    'cache=/dev/null',
+    'for arg in "$@"; do if [ "${arg:0:13}" == "--cache-file=" ]; then cache=${arg:13}; fi; done',
+    'echo "$@" >> %(log)s',
+    'if [ -f "$cache" ]; then cat $cache | sed "s/^/    /g" >> %(log)s; fi',
+    'if grep -q "^ac_cv_broken=" $cache; then echo "configure: error: broken cache" && exit 1; fi',
+    'for arg in "$@"; do',
+    '    if [ "${arg:0:2}" != "--" ]; then echo "ac_cv_func_$arg=\\${ac_cv_func_$arg=yes}" >> $cache; fi',
+    'done',
+    'echo "ac_cv_srcdir=\\${ac_cv_srcdir=$PWD}" >> $cache',
+])
+
+# fake 'R' command, which keeps track of how it was called,
+# and reports errors when installing packages that have 'FAIL' in the name of their source tarball
+FAKE_R = '\n'.join([
+    'echo "MAKEFLAGS=$MAKEFLAGS $@" >> %(log)s',
+    'function install {',
+    '    name=$(basename $1 | sed "s/_.*//g")',
+    '    echo "* installing *source* package \'$name\' ..."',
+    '    if [[ $1 == *FAIL* ]]; then echo "ERROR: compilation failed for package \'$name\'"; fi',
+    '}',
+    'if [ "$1" == "CMD" ]; then',
+    '    install $3',
+    '    if [[ "$@" == *--build* ]]; then touch ${name}_1.0_R_x86_64-pc-linux-gnu.tar.gz; fi',
+    '    exit 0',
+    'fi',
+    'stdin=$(cat)',
+    'echo "$stdin" >> %(log)s',
+    'for loc in $(echo "$stdin" | grep -o \'"[^"]*[.]tar[.]gz"\' | tr -d \'"\'); do install $loc; done',
+])
+
+
+def write_script(path, txt):
+    """Write executable script with specified contents."""
+    write_file(path, '#!/bin/bash\n' + txt)
+    os.chmod(path, stat.S_IRWXU)
+
+
+def init_config():
+    """Initialize configuration (required for e.g. default modules_tool setting)."""
+    eb_go = eboptions.parse_options(args=['--prefix=%s' % TMPDIR])
+    config.init(eb_go.options, eb_go.get_options_by_section('config'))
+    build_options = {
+        'silent': True,
+        'suffix_modules_path': GENERAL_CLASS,
+        'valid_module_classes': config.module_classes(),
+        'valid_stops': [x[0] for x in EasyBlock.get_steps()],
+    }
+    config.init_build_options(build_options=build_options)
+    set_tmpdir()
+
+
+class EasyblockTestCase(EnhancedTestCase):
+    """Base class for unit tests of specific easyblocks."""
+
+    def setUp(self):
+        """Test setup."""
+        super(EasyblockTestCase, self).setUp()
+
+        self.tmpdir = tempfile.mkdtemp()
+        self.orig_environ = copy.deepcopy(os.environ)
+        self.cwd = os.getcwd()
+
+        # use empty caches located in temporary directory
+        self.cache_dir = os.path.join(self.tmpdir, 'cache')
+        os.mkdir(self.cache_dir)
+        self.orig_det_cache_dir = {}
+        for mod in [configuremake, pythonpackage]:
+            self.orig_det_cache_dir[mod] = mod.det_cache_dir
+            mod.det_cache_dir = self.det_cache_dir
+        self.orig_config_guess_path = configuremake._config_guess_cache['path']
+        configuremake._config_guess_cache['triplets'].clear()
+        pythonpackage._python_probe_cache.clear()
+        pythonpackage._pip_version_cache.clear()
+
+    def tearDown(self):
+        """Test cleanup."""
+        super(EasyblockTestCase, self).tearDown()
+
+        for mod, orig_det_cache_dir in self.orig_det_cache_dir.items():
+            mod.det_cache_dir = orig_det_cache_dir
+        configuremake._config_guess_cache['path'] = self.orig_config_guess_path
+        os.environ = self.orig_environ
+        change_dir(self.cwd)
+        shutil.rmtree(self.tmpdir)
+
+    def det_cache_dir(self, *subdirs):
+        """Determine (and create) location of cache directory, in temporary directory for tests."""
+        path = os.path.join(self.cache_dir, *subdirs)
+        if not os.path.exists(path):
+            os.makedirs(path)
+        return path
+
+    def init_easyblock(self, easyblock, name='foo', version='1.0', extratxt=''):
+        """Create instance of specified easyblock, for easyconfig with specified (extra) contents."""
+        ec_file = os.path.join(self.tmpdir, '%s-%s.eb' % (name, version))
+        write_file(ec_file, '\n'.join([
+            'easyblock = "%s"' % easyblock,
+            'name = "%s"' % name,
+            'version = "%s"' % version,
+            'homepage = "http://example.com"',
+            'description = "Dummy easyconfig file."',
+            'toolchain = {"name": "dummy", "version": "dummy"}',
+            'sources = []',
+            extratxt,
+        ]))
+        app = get_easyblock_class(easyblock)(EasyConfig(ec_file))
+        app.builddir = os.path.join(self.tmpdir, 'build')
+        app.installdir = os.path.join(self.tmpdir, 'install')
+        mkdir(app.builddir, parents=True)
+        return app
+
+    def setup_fake_cmds(self, cmds):
+        """Put fake commands in place, which keep track of how they were called; return path to log file for them."""
+        bindir = os.path.join(self.tmpdir, 'fake_bin')
+        cmds_log = os.path.join(self.tmpdir, 'cmds.log')
+        mkdir(bindir, parents=True)
+        write_file(cmds_log, '')
+        for cmd in cmds:
+            txt = 'echo "HARNESS_OPTIONS=$HARNESS_OPTIONS TEST_JOBS=$TEST_JOBS $(basename $0) $@" >> %s' % cmds_log
+            write_script(os.path.join(bindir, cmd), txt)
+        os.environ['PATH'] = os.pathsep.join([bindir, os.getenv('PATH', '')])
+        return cmds_log
+
+    def setup_fake_configure(self, srcdir):
+        """
+        Put fake configure script generated by Autoconf in place in specified directory (and fake config.guess),
+        return path to log file for it.
+        """
+        configure_log = os.path.join(self.tmpdir, 'configure.log')
+        write_file(configure_log, '')
+        write_script(os.path.join(srcdir, 'configure'), FAKE_CONFIGURE % {'log': configure_log})
+        config_guess = os.path.join(self.tmpdir, 'fake_config_guess', 'config.guess')
+        write_script(config_guess, 'echo x86_64-pc-linux-gnu')
+        configuremake._config_guess_cache['path'] = config_guess
+        return configure_log
+
+    def setup_fake_pip(self):
+        """Put fake 'pip' command in place, return path to log file for it."""
+        bindir = os.path.join(self.tmpdir, 'fake_pip_bin')
+        pip_log = os.path.join(self.tmpdir, 'pip.log')
+        mkdir(bindir, parents=True)
+        write_file(pip_log, '')
+        pylibdir = det_python_facts(sys.executable)['purelib']
+        write_script(os.path.join(bindir, 'pip'), FAKE_PIP % {'log': pip_log, 'pylibdir': pylibdir})
+        os.environ['PATH'] = os.pathsep.join([bindir, os.getenv('PATH', '')])
+        return pip_log
+
+    def init_python_exts(self, master, names, options=None):
+        """
+        Create instances of PythonPackage for specified extensions of specified parent, as if they were prepared
+        for being installed in batch (see PythonPackage.run).
+        """
+        pylibdir = det_python_facts(sys.executable)['purelib']
+        exts = []
+        for name in names:
+            ext_options = {'use_pip': True}
+            ext_options.update((options or {}).get(name, {}))
+            ext = PythonPackage(master, {'name': name, 'version': '1.0', 'options': ext_options})
+            ext.python_cmd = sys.executable
+            ext.pylibdir, ext.all_pylibdirs = pylibdir, [pylibdir]
+            ext.batch_install_cwd = os.path.join(master.builddir, name)
+            ext.batch_install_loc = ext.batch_install_cwd
+            ext.ext_deps, ext.ext_setup_deps = [], []
+            mkdir(ext.batch_install_cwd, parents=True)
+            exts.append(ext)
+        return exts
+
+    def setup_fake_r(self):
+        """Put fake 'R' command in place, return path to log file for it."""
+        bindir = os.path.join(self.tmpdir, 'fake_r_bin')
+        r_log = os.path.join(self.tmpdir, 'R.log')
+        mkdir(bindir, parents=True)
+        write_file(r_log, '')
+        write_script(os.path.join(bindir, 'R'), FAKE_R % {'log': r_log})
+        os.environ['PATH'] = os.pathsep.join([bindir, os.getenv('PATH', '')])
+        return r_log
+
+    def write_r_tarball(self, name, description):
+        """Create source tarball for R package with specified name, that includes specified DESCRIPTION file."""
+        tarball = os.path.join(self.tmpdir, 'sources', '%s_1.0.tar.gz' % name)
+        write_file(os.path.join(self.tmpdir, 'unpacked', name, 'DESCRIPTION'), description)
+        mkdir(os.path.dirname(tarball), parents=True)
+        tar = tarfile.open(tarball, 'w:gz')
+        tar.add(os.path.join(self.tmpdir, 'unpacked', name), arcname=name)
+        tar.close()
+        return tarball
+
+    def init_r_exts(self, master, names, deps=None):
+        """
+        Create instances of RPackage for specified extensions of specified parent, as if they were prepared
+        for being installed in batch (see RPackage.run).
+        """
+        exts = []
+        for name in names:
+            ext_deps = ', '.join((deps or {}).get(name, []))
+            tarball = self.write_r_tarball(name, "Package: %s\nDepends: R (>= 3.0)\nImports: %s\n" % (name, ext_deps))
+            ext = RPackage(master, {'name': name, 'version': '1.0', 'src': tarball})
+            ext.lib_install_prefix = os.path.join(master.installdir, 'library')
+            ext.ext_src = tarball
+            exts.append(ext)
+        return exts